@@ -0,0 +1,6 @@
+""" Performance benchmarks, run as modules from the project directory, e.g.
+
+    python -m benchmarks.choose_new_exercise
+
+`benchmarks.suite` times the whole pipeline and compares stored results.
+"""
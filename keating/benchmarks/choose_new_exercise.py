@@ -0,0 +1,112 @@
+""" Compares the sequential and the indexed `choose_new_exercise` on generator catalogs."""
+
+import random
+import timeit
+from typing import Callable, List, Set
+
+from exercise.base import Exercise
+from exercise.difficulty_index import DifficultyIndex
+from exercise.generators.hand_coordination import HandCoordinationPieceGenerator
+from exercise.generators.melodies import MelodiesPieceGenerator
+from exercise.learning import (
+    choose_new_exercise,
+    choose_new_exercise_indexed,
+    get_new_exercise_pool,
+    get_new_exercise_pool_indexed,
+)
+
+NUM_FAMILIAR_SETS = 20
+NUM_REPEATS = 3
+
+
+def _familiar_sets(exercises: List[Exercise]) -> List[Set[Exercise]]:
+    """Familiar exercises the way a learner collects them: mostly the easy ones."""
+
+    rng = random.Random(0)
+    familiar_sets: List[Set[Exercise]] = []
+    for idx in range(NUM_FAMILIAR_SETS):
+        num_familiar = len(exercises) * idx // NUM_FAMILIAR_SETS
+        familiar_sets.append(
+            set(exercises[: num_familiar // 2])
+            | set(rng.sample(exercises, num_familiar // 2))
+        )
+    return familiar_sets
+
+
+def _time_per_call(
+    function: Callable[[Set[Exercise]], object],
+    familiar_sets: List[Set[Exercise]],
+) -> float:
+    """Best time of a single call in milliseconds."""
+
+    total_time = min(
+        timeit.repeat(
+            lambda: [
+                function(familiar_exercises) for familiar_exercises in familiar_sets
+            ],
+            number=1,
+            repeat=NUM_REPEATS,
+        )
+    )
+    return total_time / len(familiar_sets) * 1000
+
+
+def run(piece_generator) -> None:
+    exercises = [
+        Exercise(
+            exercise_id=f"{piece_generator.generator_id}_{piece.piece_id}", piece=piece
+        )
+        for piece in piece_generator.pieces()
+    ]
+    familiar_sets = _familiar_sets(exercises)
+
+    build_time = timeit.timeit(
+        lambda: DifficultyIndex.from_exercises(exercises), number=1
+    )
+    difficulty_index = DifficultyIndex.from_exercises(exercises)
+    for familiar_exercises in familiar_sets:
+        assert get_new_exercise_pool_indexed(
+            difficulty_index=difficulty_index,
+            familiar_exercises=familiar_exercises,
+        ) == get_new_exercise_pool(
+            exercises=iter(exercises), familiar_exercises=familiar_exercises
+        ), "Indexed selection differs from the sequential one"
+
+    print(
+        f"{piece_generator.generator_id}: {len(exercises)} exercises, "
+        f"index build {build_time * 1000:.1f}ms"
+    )
+    for name, function in (
+        (
+            "sequential pool",
+            lambda familiar_exercises: get_new_exercise_pool(
+                exercises=iter(exercises), familiar_exercises=familiar_exercises
+            ),
+        ),
+        (
+            "indexed pool",
+            lambda familiar_exercises: get_new_exercise_pool_indexed(
+                difficulty_index=difficulty_index,
+                familiar_exercises=familiar_exercises,
+            ),
+        ),
+        (
+            "sequential choice",
+            lambda familiar_exercises: choose_new_exercise(
+                exercises=iter(exercises), familiar_exercises=familiar_exercises
+            ),
+        ),
+        (
+            "indexed choice",
+            lambda familiar_exercises: choose_new_exercise_indexed(
+                difficulty_index=difficulty_index,
+                familiar_exercises=familiar_exercises,
+            ),
+        ),
+    ):
+        print(f"  {name}: {_time_per_call(function, familiar_sets):.2f}ms per call")
+
+
+if __name__ == "__main__":
+    run(HandCoordinationPieceGenerator())
+    run(MelodiesPieceGenerator())
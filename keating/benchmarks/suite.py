@@ -0,0 +1,332 @@
+""" Benchmark suite of exercise generation and score rendering.
+
+Run the suite and store the results as JSON, then compare two stored results:
+
+    python -m benchmarks.suite run --output results.json [--filter generate]
+    python -m benchmarks.suite compare base.json results.json [--threshold 0.2]
+
+`compare` fails when a benchmark got slower than the threshold.
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import timeit
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional
+
+import attrs
+
+from exercise.base import Exercise, ExercisePractice
+from exercise.difficulty_index import DifficultyIndex
+from exercise.generators.catalog import get_catalog
+from exercise.generators.exercise_generator import ExerciseGenerator
+from exercise.generators.registry import PIECE_GENERATORS
+from exercise.learning import choose_new_exercise_indexed
+from exercise.learning_state import LearningState
+from exercise.music_representation import pitch_progression, rhythm
+from exercise.music_representation.base import Key
+from exercise.music_representation.melody import Melody
+from exercise.music_representation.piece import Piece
+from exercise.musical_elements.pitch_progression import PITCH_PROGRESSIONS
+from exercise.musical_elements.rhythm import get_rhythms
+from exercise.notation_abcjs import create_score
+from exercise.practice_log import PracticeLog, PracticeResult
+
+# Timed runs of every benchmark, the best and the median run are stored.
+NUM_REPEATS = 5
+# Sizes of the synthetic practice histories.
+PRACTICE_LOG_SIZES = (10, 1_000, 100_000)
+# Practiced exercises of the synthetic practice histories.
+NUM_PRACTICED_EXERCISES = 200
+# Every n-th melodies piece is rendered, besides all hand coordination pieces.
+RENDERED_MELODIES_STEP = 100
+NUM_FAMILIAR_SETS = 20
+# Relative slowdown of the best time reported as a regression.
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+
+# Sets up a benchmark and returns the function to time.
+Benchmark = Callable[[], Callable[[], object]]
+
+
+def _fresh(element):
+    """Copy of the musical element without its cached values."""
+
+    return attrs.evolve(element)
+
+
+def _rendered_pieces() -> List[Piece]:
+    return [
+        *PIECE_GENERATORS["hand_coordination"].pieces(),
+        *list(PIECE_GENERATORS["melodies"].pieces())[::RENDERED_MELODIES_STEP],
+    ]
+
+
+def _synthetic_practice_log(num_practices: int) -> PracticeLog:
+    """Practices of the easiest melodies spread over the last year, seeded."""
+
+    rng = random.Random(num_practices)
+    exercises = get_catalog(PIECE_GENERATORS["melodies"]).exercises(by_difficulty=True)
+    practiced_exercises = [
+        exercise for exercise, _ in zip(exercises, range(NUM_PRACTICED_EXERCISES))
+    ]
+    first_date = date.today() - timedelta(days=365)
+    practice_log = PracticeLog(user_id="benchmark_user")
+    for idx in range(num_practices):
+        practice_log.log_practice(
+            exercise_practice=ExercisePractice(
+                exercise=rng.choice(practiced_exercises),
+                key=rng.choice(list(Key)),
+                tempo=rng.randrange(50, 120, 5),
+            ),
+            result=rng.choice(list(PracticeResult)),
+            practice_date=first_date + timedelta(days=365 * idx // num_practices),
+        )
+    return practice_log
+
+
+def _catalog_enumeration(generator_id: str) -> Benchmark:
+    def setup() -> Callable[[], object]:
+        piece_generator = PIECE_GENERATORS[generator_id]
+        return lambda: list(piece_generator.pieces())
+
+    return setup
+
+
+def _rhythm_difficulties() -> Callable[[], object]:
+    rhythms = get_rhythms()
+    return lambda: [_fresh(element).difficulty for element in rhythms]
+
+
+def _rhythm_batch_difficulties() -> Callable[[], object]:
+    rhythms = get_rhythms()
+    return lambda: rhythm.batch_difficulties(rhythms)
+
+
+def _pitch_progression_difficulties() -> Callable[[], object]:
+    return lambda: [_fresh(element).difficulty for element in PITCH_PROGRESSIONS]
+
+
+def _pitch_progression_batch_difficulties() -> Callable[[], object]:
+    return lambda: pitch_progression.batch_difficulties(PITCH_PROGRESSIONS)
+
+
+def _melody_difficulties() -> Callable[[], object]:
+    melody_parts = [
+        (melody_rhythm, melody_pitch_progression)
+        for melody_rhythm in get_rhythms()
+        for melody_pitch_progression in PITCH_PROGRESSIONS
+    ]
+    return lambda: [
+        Melody(
+            rhythm=_fresh(melody_rhythm),
+            pitch_progression=_fresh(melody_pitch_progression),
+        ).difficulty
+        for melody_rhythm, melody_pitch_progression in melody_parts
+    ]
+
+
+def _choose_new_exercise(generator_id: str) -> Benchmark:
+    def setup() -> Callable[[], object]:
+        catalog = get_catalog(PIECE_GENERATORS[generator_id])
+        exercises: List[Exercise] = list(catalog.exercises(by_difficulty=True))
+        difficulty_index = DifficultyIndex.from_catalog(catalog)
+        rng = random.Random(0)
+        familiar_sets = []
+        for idx in range(NUM_FAMILIAR_SETS):
+            num_familiar = len(exercises) * idx // NUM_FAMILIAR_SETS
+            familiar_sets.append(
+                set(exercises[: num_familiar // 2])
+                | set(rng.sample(exercises, num_familiar // 2))
+            )
+        return lambda: [
+            choose_new_exercise_indexed(
+                difficulty_index=difficulty_index,
+                familiar_exercises=familiar_exercises,
+            )
+            for familiar_exercises in familiar_sets
+        ]
+
+    return setup
+
+
+def _nearest_exercises(generator_id: str) -> Benchmark:
+    def setup() -> Callable[[], object]:
+        difficulty_index = DifficultyIndex.from_catalog(
+            get_catalog(PIECE_GENERATORS[generator_id])
+        )
+        # The tree is built once per catalog
+        difficulty_index.tree
+        points = difficulty_index.points[:: max(1, len(difficulty_index) // 100)]
+        return lambda: [
+            difficulty_index.tree.nearest(point=point, k=10) for point in points
+        ]
+
+    return setup
+
+
+def _learning_state(num_practices: int) -> Benchmark:
+    def setup() -> Callable[[], object]:
+        practice_logs = _synthetic_practice_log(num_practices).get_practice_logs()
+        return lambda: LearningState.from_practice_logs(practice_logs)
+
+    return setup
+
+
+def _generate(num_practices: int) -> Benchmark:
+    def setup() -> Callable[[], object]:
+        exercise_generator = ExerciseGenerator(
+            practice_log=_synthetic_practice_log(num_practices),
+            piece_generator=PIECE_GENERATORS["melodies"],
+        )
+        # The learning state and the difficulty index are built once per user
+        exercise_generator.generate()
+        return exercise_generator.generate
+
+    return setup
+
+
+def _get_notes() -> Callable[[], object]:
+    pieces = [_fresh(piece) for piece in _rendered_pieces()]
+    return lambda: [piece.get_notes(key=key) for piece in pieces for key in Key]
+
+
+def _create_score() -> Callable[[], object]:
+    scores = [
+        (key, piece.meter, *piece.get_notes(key=key))
+        for piece in _rendered_pieces()
+        for key in (Key.C, Key.Gb)
+    ]
+    return lambda: [
+        create_score(
+            key=key,
+            tempo=60,
+            meter=meter,
+            left_hand_notes=left_hand_notes,
+            right_hand_notes=right_hand_notes,
+        )
+        for key, meter, left_hand_notes, right_hand_notes in scores
+    ]
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    **{
+        f"catalog_enumeration/{generator_id}": _catalog_enumeration(generator_id)
+        for generator_id in PIECE_GENERATORS
+    },
+    "difficulty/rhythms": _rhythm_difficulties,
+    "difficulty/rhythms_batch": _rhythm_batch_difficulties,
+    "difficulty/pitch_progressions": _pitch_progression_difficulties,
+    "difficulty/pitch_progressions_batch": _pitch_progression_batch_difficulties,
+    "difficulty/melodies": _melody_difficulties,
+    "choose_new_exercise/hand_coordination": _choose_new_exercise("hand_coordination"),
+    "choose_new_exercise/melodies": _choose_new_exercise("melodies"),
+    "nearest_exercises/melodies": _nearest_exercises("melodies"),
+    **{
+        f"learning_state/{num_practices}_practices": _learning_state(num_practices)
+        for num_practices in PRACTICE_LOG_SIZES
+    },
+    **{
+        f"generate/{num_practices}_practices": _generate(num_practices)
+        for num_practices in PRACTICE_LOG_SIZES
+    },
+    "get_notes/every_key": _get_notes,
+    "create_score": _create_score,
+}
+
+
+def measure(benchmark: Benchmark) -> Dict[str, float]:
+    """Best and median time of a call in seconds."""
+
+    function = benchmark()
+    timer = timeit.Timer(function)
+    # Fast benchmarks are called repeatedly within a run, see `Timer.autorange`
+    number, _ = timer.autorange()
+    run_times = [
+        run_time / number
+        for run_time in timer.repeat(repeat=NUM_REPEATS, number=number)
+    ]
+    return {
+        "best": min(run_times),
+        "median": statistics.median(run_times),
+        "number": number,
+    }
+
+
+def run(name_filter: Optional[str] = None) -> Dict:
+    results = {}
+    for name, benchmark in BENCHMARKS.items():
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = measure(benchmark)
+        print(
+            f"{name}: {results[name]['best'] * 1000:.3f}ms "
+            f"(median {results[name]['median'] * 1000:.3f}ms)"
+        )
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "date": date.today().isoformat(),
+        "benchmarks": results,
+    }
+
+
+def compare(
+    base: Dict, new: Dict, threshold: float = DEFAULT_REGRESSION_THRESHOLD
+) -> List[str]:
+    """Print how the best times changed, return the regressed benchmarks."""
+
+    regressions = []
+    for name, new_result in new["benchmarks"].items():
+        base_result = base["benchmarks"].get(name)
+        if base_result is None:
+            print(f"{name}: new, {new_result['best'] * 1000:.3f}ms")
+            continue
+        ratio = new_result["best"] / base_result["best"]
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "REGRESSION"
+        elif ratio < 1 / (1 + threshold):
+            flag = "improvement"
+        else:
+            flag = ""
+        print(
+            f"{name}: {base_result['best'] * 1000:.3f}ms -> "
+            f"{new_result['best'] * 1000:.3f}ms ({ratio:.2f}x) {flag}".rstrip()
+        )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--output", help="JSON file for the results")
+    run_parser.add_argument("--filter", help="Run benchmarks with names containing it")
+    compare_parser = subparsers.add_parser("compare", help="Compare two results")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD
+    )
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run(name_filter=args.filter)
+        if args.output:
+            with open(args.output, "w") as output:
+                json.dump(results, output, indent=2)
+    else:
+        with open(args.base) as base, open(args.new) as new:
+            regressions = compare(
+                base=json.load(base), new=json.load(new), threshold=args.threshold
+            )
+        if regressions:
+            sys.exit(f"Regressions: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
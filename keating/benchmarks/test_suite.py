@@ -0,0 +1,17 @@
+from benchmarks.suite import compare
+
+
+def _results(**best_times):
+    return {
+        "benchmarks": {
+            name: {"best": best, "median": best, "number": 1}
+            for name, best in best_times.items()
+        }
+    }
+
+
+def test_compare_flags_regressions():
+    base = _results(fast=1.0, slow=1.0, same=1.0)
+    new = _results(fast=0.5, slow=1.5, same=1.1, added=1.0)
+    assert compare(base=base, new=new, threshold=0.2) == ["slow"]
+    assert compare(base=base, new=new, threshold=0.6) == []
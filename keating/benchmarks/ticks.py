@@ -0,0 +1,96 @@
+""" Compares Fraction and integer tick arithmetic of the note timing on all melodies."""
+
+import timeit
+from fractions import Fraction
+from typing import Callable, List, Tuple
+
+from exercise.music_representation.base import Spacement
+from exercise.music_representation.utils.spacements import (
+    extract_pulse_and_onset_ticks,
+    extract_pulse_length_and_onsets,
+    get_spacements_resolution,
+    to_tick_spacements,
+)
+from exercise.musical_elements.melody import get_melodies
+from exercise.notation_abcjs import ScoreLayout
+from exercise.utils import gcd
+
+NUM_REPEATS = 3
+
+
+def _fraction_pulse_length_and_onsets(
+    spacements: Tuple[Spacement, ...]
+) -> Tuple[Fraction, List[int]]:
+    """Reference implementation computing on Fractions only."""
+
+    events = sorted(
+        {spacement.position for spacement in spacements}
+        | {spacement.position + spacement.duration for spacement in spacements}
+    )
+    pulse_length = gcd(events)
+    return pulse_length, sorted([int(event / pulse_length) for event in events])
+
+
+def _time(function: Callable[[], object]) -> float:
+    """Best time of a run in milliseconds."""
+
+    return min(timeit.repeat(function, number=1, repeat=NUM_REPEATS)) * 1000
+
+
+def run() -> None:
+    melodies = list(get_melodies())
+    spacements = [tuple(note.spacement for note in melody.notes) for melody in melodies]
+    for melody_spacements in spacements:
+        assert extract_pulse_length_and_onsets(
+            melody_spacements
+        ) == _fraction_pulse_length_and_onsets(
+            melody_spacements
+        ), "Tick pulses differ from the Fraction ones"
+    tick_spacements = [
+        to_tick_spacements(
+            melody_spacements,
+            resolution=get_spacements_resolution(melody_spacements),
+        )
+        for melody_spacements in spacements
+    ]
+
+    print(f"melodies: {len(melodies)}")
+    for name, function in (
+        (
+            "pulse and onsets, Fraction",
+            lambda: [
+                _fraction_pulse_length_and_onsets(melody_spacements)
+                for melody_spacements in spacements
+            ],
+        ),
+        (
+            "pulse and onsets, ticks incl. conversion",
+            lambda: [
+                extract_pulse_length_and_onsets(melody_spacements)
+                for melody_spacements in spacements
+            ],
+        ),
+        (
+            "pulse and onsets, ticks",
+            lambda: [
+                extract_pulse_and_onset_ticks(melody_tick_spacements)
+                for melody_tick_spacements in tick_spacements
+            ],
+        ),
+        (
+            "score layouts",
+            lambda: [
+                ScoreLayout.from_notes(
+                    meter=melody.meter,
+                    left_hand_notes=None,
+                    right_hand_notes=melody.notes,
+                )
+                for melody in melodies
+            ],
+        ),
+    ):
+        print(f"  {name}: {_time(function):.1f}ms")
+
+
+if __name__ == "__main__":
+    run()
@@ -4,10 +4,15 @@ from attrs import frozen
 
 from exercise.music_representation.base import Difficulty, Key, MusicalElement
 from exercise.music_representation.piece import Piece
-from exercise.notation_abcjs import create_score
+from exercise.notation_abcjs import (
+    SCORE_RENDERER_VERSION,
+    add_header,
+    render_piece_body,
+)
+from exercise.score_cache import ScoreCache, get_score_cache
 
 
-@frozen
+@frozen(cache_hash=True)
 class Exercise:
     exercise_id: str
     piece: Piece
@@ -16,6 +21,11 @@ class Exercise:
     def musical_elements(self) -> Tuple[MusicalElement, ...]:
         return self.piece.related_musical_elements
 
+    @property
+    def musical_element_ids(self) -> int:
+        """Bitset of ids of `musical_elements`."""
+        return self.piece.related_element_ids
+
     @property
     def difficulty(self) -> Difficulty:
         return self.piece.difficulty
@@ -33,14 +43,23 @@ class ExercisePractice:
 
     @property
     def score(self) -> str:
-        left_hand_notes, right_hand_notes = self.exercise.piece.get_notes(key=self.key)
-        return create_score(
-            key=self.key,
-            tempo=self.tempo,
-            meter=self.exercise.piece.meter,
-            left_hand_notes=left_hand_notes,
-            right_hand_notes=right_hand_notes,
+        piece = self.exercise.piece
+        # The body of the score depends only on the hand parts, key and meter,
+        # practicing at another tempo only changes the header.
+        key = ScoreCache.make_key(
+            "body",
+            SCORE_RENDERER_VERSION,
+            piece.left_hand_part.part_id if piece.left_hand_part else None,
+            piece.right_hand_part.part_id if piece.right_hand_part else None,
+            self.key.name,
+            piece.meter.numerator,
+            piece.meter.denominator,
         )
+        body = get_score_cache().get_or_render(key=key, render=self._render_score_body)
+        return add_header(body=body, key=self.key, tempo=self.tempo, meter=piece.meter)
+
+    def _render_score_body(self) -> str:
+        return render_piece_body(piece=self.exercise.piece, key=self.key)
 
 
 class Hand(Enum):
@@ -1 +1,19 @@
+from pathlib import Path
+
 MAX_MEASURES = 8
+
+# SQLite database with generated exercise catalogs, rebuilt when definitions change.
+CATALOG_PATH = Path(__file__).resolve().parent.parent / "catalog.sqlite3"
+
+# Number of key independent score layouts of pieces kept in process memory.
+SCORE_LAYOUT_CACHE_SIZE = 4096
+# Number of rendered score bodies kept in process memory.
+SCORE_CACHE_SIZE = 4096
+# Django cache shared between processes for rendered score bodies, used if configured.
+SCORE_CACHE_ALIAS = "scores"
+
+# Practices logged by a stored practice log are written to the database in batches.
+PRACTICE_LOG_WRITE_BATCH_SIZE = 100
+
+# Users planned by a worker of the batch planner at once.
+PLANNER_CHUNK_SIZE = 50
@@ -0,0 +1,196 @@
+""" NumPy backed index over difficulties of an exercise catalog."""
+
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+
+from exercise.base import Exercise
+from exercise.difficulty_tree import DifficultyTree
+from exercise.generators.catalog import Catalog
+
+# Bounds the size of the (rows x others x dimensions) comparison tensors.
+MAX_COMPARISONS = 1 << 20
+
+
+class DifficultyIndex:
+    """Difficulty matrix of shape (exercises x dimensions) built from `Difficulty.point`.
+
+    Rows follow the order of the exercises the index was built from. The batched
+    queries mirror the comparisons of `Difficulty`:
+    - `a <= b` when a is strictly easier in every dimension or equal to b,
+    - `a > b` when neither of the above holds.
+    """
+
+    def __init__(
+        self,
+        exercise_ids: Sequence[str],
+        points: np.ndarray,
+        levels: np.ndarray,
+        get_exercise: Callable[[int], Exercise],
+    ) -> None:
+        """
+        Args:
+            levels: `Difficulty.level` of the exercises, as computed by `Difficulty`
+                rather than from the points, so comparisons with levels agree.
+        """
+
+        self._exercise_id_to_row: Dict[str, int] = {
+            exercise_id: row for row, exercise_id in enumerate(exercise_ids)
+        }
+        self._points = points.reshape(len(exercise_ids), -1)
+        self._get_exercise = get_exercise
+        self._levels = levels.reshape(len(exercise_ids))
+        self._tree: Optional[DifficultyTree] = None
+
+    @classmethod
+    def from_exercises(cls, exercises: Iterable[Exercise]) -> "DifficultyIndex":
+        exercises = tuple(exercises)
+        return cls(
+            exercise_ids=[exercise.exercise_id for exercise in exercises],
+            points=np.array(
+                [exercise.difficulty.point for exercise in exercises],
+                dtype=np.float64,
+            ),
+            levels=np.array(
+                [exercise.difficulty.level for exercise in exercises],
+                dtype=np.float64,
+            ),
+            get_exercise=exercises.__getitem__,
+        )
+
+    @classmethod
+    def from_catalog(cls, catalog: Catalog) -> "DifficultyIndex":
+        """Index built from stored difficulty points, exercises are loaded on demand."""
+
+        return cls(
+            exercise_ids=catalog.exercise_ids(),
+            points=catalog.difficulty_points(),
+            levels=catalog.difficulty_levels(),
+            get_exercise=catalog.get_by_position,
+        )
+
+    def __len__(self) -> int:
+        return len(self._exercise_id_to_row)
+
+    @property
+    def points(self) -> np.ndarray:
+        return self._points
+
+    def exercise(self, row: int) -> Exercise:
+        return self._get_exercise(row)
+
+    def row(self, exercise: Exercise) -> Optional[int]:
+        return self._exercise_id_to_row.get(exercise.exercise_id)
+
+    @property
+    def tree(self) -> DifficultyTree:
+        """Spatial index of the points, built on first use."""
+
+        if self._tree is None:
+            self._tree = DifficultyTree(self._points)
+        return self._tree
+
+    def nearest(
+        self, exercise: Exercise, k: int, harder: Optional[bool] = None
+    ) -> List[Exercise]:
+        """Other exercises with the k nearest difficulty points, nearest first.
+
+        With `harder` only exercises of a higher (or with False, lower) difficulty
+        level are considered, e.g. for slightly harder variations of the exercise.
+        """
+
+        rows, _ = self.tree.nearest(
+            point=exercise.difficulty.point,
+            k=k,
+            mask=self._variations_mask(exercise=exercise, harder=harder),
+        )
+        return [self.exercise(row) for row in rows]
+
+    def within(
+        self, exercise: Exercise, radius: float, harder: Optional[bool] = None
+    ) -> List[Exercise]:
+        """Other exercises with difficulty points within the radius, nearest first.
+        See `nearest` for `harder`."""
+
+        rows, _ = self.tree.within(
+            point=exercise.difficulty.point,
+            radius=radius,
+            mask=self._variations_mask(exercise=exercise, harder=harder),
+        )
+        return [self.exercise(row) for row in rows]
+
+    def _variations_mask(
+        self, exercise: Exercise, harder: Optional[bool]
+    ) -> np.ndarray:
+        level = exercise.difficulty.level
+        if harder is None:
+            mask = np.ones(len(self), dtype=bool)
+        elif harder:
+            mask = self._levels > level
+        else:
+            mask = self._levels < level
+        row = self.row(exercise)
+        if row is not None:
+            mask[row] = False
+        return mask
+
+    def mask(self, exercises: Set[Exercise]) -> np.ndarray:
+        """Boolean mask of rows belonging to given exercises."""
+
+        mask = np.zeros(len(self), dtype=bool)
+        for exercise in exercises:
+            row = self.row(exercise)
+            if row is not None:
+                mask[row] = True
+        return mask
+
+    def is_dominated_by_any(
+        self,
+        rows: Sequence[int],
+        others: Sequence[int],
+        preceding_only: bool = False,
+    ) -> np.ndarray:
+        """For each row, whether its difficulty is `<=` the difficulty of any other row.
+
+        With `preceding_only` only other rows placed before the row are considered.
+        """
+
+        return self._any(
+            rows=rows, others=others, preceding_only=preceding_only, dominates=False
+        )
+
+    def dominates_any(self, rows: Sequence[int], others: Sequence[int]) -> np.ndarray:
+        """For each row, whether its difficulty is `>` the difficulty of any other row."""
+
+        return self._any(rows=rows, others=others, preceding_only=False, dominates=True)
+
+    def _any(
+        self,
+        rows: Sequence[int],
+        others: Sequence[int],
+        preceding_only: bool,
+        dominates: bool,
+    ) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.intp)
+        others = np.asarray(others, dtype=np.intp)
+        result = np.zeros(len(rows), dtype=bool)
+        if preceding_only and len(rows):
+            others = others[others < rows.max()]
+        if len(rows) == 0 or len(others) == 0:
+            return result
+
+        other_points = self._points[others][np.newaxis, :, :]
+        chunk_size = max(
+            1, MAX_COMPARISONS // max(1, len(others) * self._points.shape[1])
+        )
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start : start + chunk_size]
+            points = self._points[chunk][:, np.newaxis, :]
+            not_harder = (points < other_points).all(axis=2) | (
+                points == other_points
+            ).all(axis=2)
+            matches = ~not_harder if dominates else not_harder
+            if preceding_only:
+                matches &= others[np.newaxis, :] < chunk[:, np.newaxis]
+            result[start : start + chunk_size] = matches.any(axis=1)
+        return result
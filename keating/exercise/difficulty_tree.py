@@ -0,0 +1,175 @@
+""" KD-tree over difficulty points for nearest neighbour and radius queries."""
+
+import heapq
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+# Points of a leaf, distances to them are computed in one batch.
+LEAF_SIZE = 64
+
+# Nodes as a slice of consecutive nodes or an array of them
+Nodes = Union[slice, np.ndarray]
+
+
+class DifficultyTree:
+    """KD-tree over points of shape (points x dimensions), e.g. `Difficulty.point`s.
+
+    Nodes split their points at the median of the dimension they spread the most
+    in, and keep the bounding box of their points, so queries skip nodes farther
+    than the neighbours found so far. Points are stored in tree order, every node
+    covers a contiguous range of them.
+
+    Queries return rows of the points the tree was built from and their euclidean
+    distances, nearest first. An optional boolean mask over the rows restricts
+    the points considered.
+    """
+
+    def __init__(self, points: np.ndarray, leaf_size: int = LEAF_SIZE) -> None:
+        points = np.asarray(points, dtype=np.float64)
+        self._order = np.arange(len(points))
+        self._ranges: List[Tuple[int, int]] = []
+        # First of the two (consecutive) children of the nodes, -1 for leaves
+        self._first_children: List[int] = []
+        lower: List[np.ndarray] = []
+        upper: List[np.ndarray] = []
+
+        def _add_node(start: int, end: int) -> int:
+            node_points = points[self._order[start:end]]
+            self._ranges.append((start, end))
+            self._first_children.append(-1)
+            lower.append(node_points.min(axis=0))
+            upper.append(node_points.max(axis=0))
+            return len(self._ranges) - 1
+
+        stack = [_add_node(0, len(points))] if len(points) else []
+        while stack:
+            node = stack.pop()
+            start, end = self._ranges[node]
+            spread = upper[node] - lower[node]
+            dimension = int(np.argmax(spread))
+            if end - start <= leaf_size or spread[dimension] == 0:
+                continue
+            middle = (start + end) // 2
+            rows = self._order[start:end]
+            self._order[start:end] = rows[
+                np.argpartition(points[rows, dimension], middle - start)
+            ]
+            first_child = self._first_children[node] = _add_node(start, middle)
+            stack.extend((_add_node(middle, end), first_child))
+
+        self._points = points[self._order]
+        self._lower = np.array(lower).reshape(len(lower), points.shape[1])
+        self._upper = np.array(upper).reshape(len(upper), points.shape[1])
+        # Arrays of the node lists, for queries over many nodes at once
+        ranges = np.array(self._ranges, dtype=np.intp).reshape(len(self._ranges), 2)
+        self._starts, self._ends = ranges[:, 0], ranges[:, 1]
+        self._first_children_array = np.array(self._first_children, dtype=np.intp)
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def nearest(
+        self, point: Tuple[float, ...], k: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows of the k nearest points and their distances.
+
+        Nodes are visited nearest first until k points are found, the k nearest
+        points are then within the distance of the farthest of them.
+        """
+
+        point = np.asarray(point, dtype=np.float64)
+        rows = np.empty(0, dtype=np.intp)
+        distances = np.empty(0, dtype=np.float64)
+        heap = [(0.0, 0)] if len(self) and k > 0 else []
+        while heap and len(rows) < k:
+            _, node = heapq.heappop(heap)
+            first_child = self._first_children[node]
+            if first_child >= 0:
+                nearest_distances, _ = self._box_distances(
+                    slice(first_child, first_child + 2), point
+                )
+                for child, child_distance in enumerate(
+                    nearest_distances.tolist(), start=first_child
+                ):
+                    heapq.heappush(heap, (child_distance, child))
+                continue
+
+            start, end = self._ranges[node]
+            leaf_rows = self._order[start:end]
+            leaf_distances = np.square(self._points[start:end] - point).sum(axis=1)
+            candidates = np.ones(len(leaf_rows), dtype=bool)
+            if mask is not None:
+                candidates &= mask[leaf_rows]
+            rows = np.concatenate((rows, leaf_rows[candidates]))
+            distances = np.concatenate((distances, leaf_distances[candidates]))
+
+        if len(rows) < k:
+            nearest = np.argsort(distances, kind="stable")
+            return rows[nearest], np.sqrt(distances[nearest])
+        rows, distances = self._within(
+            point=point, max_distance=np.partition(distances, k - 1)[k - 1], mask=mask
+        )
+        return rows[:k], np.sqrt(distances[:k])
+
+    def within(
+        self, point: Tuple[float, ...], radius: float, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows of the points within the radius and their distances."""
+
+        if radius < 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+        rows, distances = self._within(
+            point=np.asarray(point, dtype=np.float64),
+            max_distance=radius**2,
+            mask=mask,
+        )
+        return rows, np.sqrt(distances)
+
+    def _within(
+        self, point: np.ndarray, max_distance: float, mask: Optional[np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows of the points within the squared distance and the squared distances.
+
+        The tree is descended a level at a time, for all nodes of the level at once.
+        Leaves and nodes with the whole bounding box within the distance are taken.
+        """
+
+        taken_nodes: List[np.ndarray] = [np.empty(0, dtype=np.intp)]
+        nodes = np.zeros(1 if len(self) else 0, dtype=np.intp)
+        while len(nodes):
+            nearest_distances, farthest_distances = self._box_distances(nodes, point)
+            reached = nearest_distances <= max_distance
+            nodes, farthest_distances = nodes[reached], farthest_distances[reached]
+            first_children = self._first_children_array[nodes]
+            taken = (farthest_distances <= max_distance) | (first_children < 0)
+            taken_nodes.append(nodes[taken])
+            first_children = first_children[~taken]
+            nodes = np.concatenate((first_children, first_children + 1))
+
+        taken = np.concatenate(taken_nodes)
+        starts, lengths = self._starts[taken], self._ends[taken] - self._starts[taken]
+        # Positions of all points of the taken nodes
+        positions = np.arange(lengths.sum()) + np.repeat(
+            starts - (np.cumsum(lengths) - lengths), lengths
+        )
+        rows = self._order[positions]
+        distances = np.square(self._points[positions] - point).sum(axis=1)
+        selected = distances <= max_distance
+        if mask is not None:
+            selected &= mask[rows]
+        rows, distances = rows[selected], distances[selected]
+        nearest = np.argsort(distances, kind="stable")
+        return rows[nearest], distances[nearest]
+
+    def _box_distances(
+        self, nodes: Nodes, point: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Squared distances from the point to the nearest and the farthest point of
+        the bounding boxes of the nodes."""
+
+        lower_gaps = self._lower[nodes] - point
+        upper_gaps = point - self._upper[nodes]
+        nearest = np.square(np.maximum(np.maximum(lower_gaps, upper_gaps), 0))
+        farthest = np.square(np.minimum(lower_gaps, upper_gaps))
+        return nearest.sum(axis=1), farthest.sum(axis=1)
@@ -35,12 +35,6 @@ class Familiarity:
             for practice_log in practice_logs
         ), "Can't determine familiarity with practice logs for different exercises."
 
-        if all(
-            practice_log.result == PracticeResult.TOO_HARD
-            for practice_log in practice_logs
-        ):
-            return cls(exercise=exercise, key_to_tempo={}, level=Level.ZERO)
-
         key_to_tempo = cls._get_key_to_tempo(
             completed_exercise_practices=[
                 practice_log.exercise_practice
@@ -53,26 +47,49 @@ class Familiarity:
             ]
         )
 
+        return cls.from_summary(
+            exercise=exercise,
+            key_to_tempo=key_to_tempo,
+            num_practices=len(practice_logs),
+            is_too_hard=all(
+                practice_log.result == PracticeResult.TOO_HARD
+                for practice_log in practice_logs
+            ),
+        )
+
+    @classmethod
+    def from_summary(
+        cls,
+        exercise: Exercise,
+        key_to_tempo: Dict[Key, int],
+        num_practices: int,
+        is_too_hard: bool,
+    ) -> "Familiarity":
+        """Determine familiarity with exercise based on a summary of its practices.
+
+        Args:
+            key_to_tempo: The highest tempo the exercise was completed at in each key.
+            num_practices: Number of practices of the exercise.
+            is_too_hard: Whether all the practices were too hard.
+        """
+
+        if is_too_hard:
+            return cls(exercise=exercise, key_to_tempo={}, level=Level.ZERO)
+
         return cls(
             exercise=exercise,
             key_to_tempo=key_to_tempo,
             level=cls._determine_level(
-                exercise=exercise,
-                key_to_tempo=key_to_tempo,
-                practice_logs=practice_logs,
+                key_to_tempo=key_to_tempo, num_practices=num_practices
             ),
         )
 
     @staticmethod
-    def _determine_level(
-        exercise: Exercise,
-        key_to_tempo: Dict[Key, int],
-        practice_logs: List[ExercisePracticeLog],
-    ) -> Level:
+    def _determine_level(key_to_tempo: Dict[Key, int], num_practices: int) -> Level:
 
         if len(key_to_tempo) == 1:
             return Level.BEGINNER
-        if len(key_to_tempo) > 1 and len(practice_logs) > 1:
+        if len(key_to_tempo) > 1 and num_practices > 1:
             return Level.ADVANCED
         return Level.EXPERT
 
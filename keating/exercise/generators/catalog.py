@@ -0,0 +1,350 @@
+""" Persistent catalog of exercises generated by piece generators."""
+
+import copyreg
+import hashlib
+import io
+import json
+import pickle
+import sqlite3
+from contextlib import closing
+from fractions import Fraction
+from functools import lru_cache
+from pathlib import Path
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+
+from exercise import config
+from exercise.base import Exercise
+from exercise.music_representation.base import intern, meter
+from exercise.music_representation.piece import Piece
+
+# Bump when the stored data changes its format or meaning.
+CATALOG_VERSION = 3
+
+# Stays below the SQLite limit of parameters of a query.
+MAX_QUERY_PARAMETERS = 900
+
+# Sources of everything a generated catalog depends on, packages or modules of the
+# exercise app; any change rebuilds catalogs.
+_DEFINITION_SOURCES = (
+    "config.py",
+    "generators",
+    "music_representation",
+    "musical_elements",
+    "product_catalog.py",
+    "utils.py",
+)
+
+_TABLES = ("catalogs", "exercises")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalogs (
+    generator_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS exercises (
+    generator_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    exercise_id TEXT NOT NULL,
+    piece_id TEXT NOT NULL,
+    level REAL NOT NULL,
+    difficulty_point TEXT NOT NULL,
+    piece BLOB NOT NULL,
+    PRIMARY KEY (generator_id, position)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS exercises_exercise_id
+    ON exercises (generator_id, exercise_id);
+CREATE INDEX IF NOT EXISTS exercises_level
+    ON exercises (generator_id, level, position);
+"""
+
+
+class PieceGeneratorLike(Protocol):
+    """Generator of the pieces of a catalog.
+
+    Generators can also have a `piece_catalog`, a sequence of the pieces in the
+    order of `pieces` building them when accessed, to look pieces up by position
+    without reading them from the database.
+    """
+
+    generator_id: str
+
+    def pieces(self) -> Iterator[Piece]:
+        ...
+
+    def pieces_by_difficulty(self) -> Iterator[Piece]:
+        ...
+
+
+def get_exercise_id(generator_id: str, piece: Piece) -> str:
+    return f"{generator_id}_{piece.piece_id}"
+
+
+def _reduce_fraction(fraction: Fraction) -> Tuple:
+    return meter, (fraction.numerator, fraction.denominator)
+
+
+def _dump_piece(piece: Piece) -> bytes:
+    # Fractions pickle through their normalized string, which would turn
+    # meters like 4/4 into 1/1, so they are stored as numerator and denominator.
+    buffer = io.BytesIO()
+    pickler = pickle.Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = {**copyreg.dispatch_table, Fraction: _reduce_fraction}
+    pickler.dump(piece)
+    return buffer.getvalue()
+
+
+def _order(by_difficulty: bool) -> str:
+    return "level, position" if by_difficulty else "position"
+
+
+@lru_cache(maxsize=None)
+def _definitions_fingerprint() -> str:
+    digest = hashlib.sha256(f"version_{CATALOG_VERSION}".encode())
+    exercise_dir = Path(__file__).resolve().parent.parent
+    for source in _DEFINITION_SOURCES:
+        source_path = exercise_dir / source
+        paths = [source_path] if source_path.is_file() else source_path.rglob("*.py")
+        for path in sorted(paths):
+            if path.name.startswith("test_"):
+                continue
+            digest.update(str(path.relative_to(exercise_dir)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class Catalog:
+    """Exercises of a piece generator stored in a SQLite database.
+
+    The catalog keeps generation order (`position`) and the difficulty point and
+    level of every exercise, so that lookups and difficulty ordered iteration don't
+    need to enumerate the generator again. It is rebuilt only when the generator
+    definitions change.
+    """
+
+    def __init__(
+        self,
+        piece_generator: PieceGeneratorLike,
+        path: Optional[Path] = None,
+    ) -> None:
+        self._piece_generator = piece_generator
+        self._path = path or config.CATALOG_PATH
+        self._is_fresh = False
+
+    @property
+    def generator_id(self) -> str:
+        return self._piece_generator.generator_id
+
+    @property
+    def fingerprint(self) -> str:
+        return hashlib.sha256(
+            f"{_definitions_fingerprint()}_{self.generator_id}".encode()
+        ).hexdigest()
+
+    def __len__(self) -> int:
+        (size,) = self._fetch_one(
+            "SELECT size FROM catalogs WHERE generator_id = ?", (self.generator_id,)
+        )
+        return size
+
+    def exercise_ids(
+        self,
+        by_difficulty: bool = False,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Tuple[str, ...]:
+        """Ids of exercises in generation order or by increasing difficulty level."""
+
+        return tuple(
+            exercise_id
+            for (exercise_id,) in self._fetch_all(
+                "SELECT exercise_id FROM exercises WHERE generator_id = ? "
+                f"ORDER BY {_order(by_difficulty)} LIMIT ? OFFSET ?",
+                (self.generator_id, -1 if limit is None else limit, offset),
+            )
+        )
+
+    def difficulty_points(self) -> np.ndarray:
+        """Difficulty points of all exercises, in generation order."""
+
+        rows = self._fetch_all(
+            "SELECT difficulty_point FROM exercises WHERE generator_id = ? "
+            "ORDER BY position",
+            (self.generator_id,),
+        )
+        return np.array(
+            [json.loads(point) for (point,) in rows], dtype=np.float64
+        ).reshape(len(rows), -1)
+
+    def difficulty_levels(self) -> np.ndarray:
+        """Difficulty levels of all exercises, in generation order."""
+
+        rows = self._fetch_all(
+            "SELECT level FROM exercises WHERE generator_id = ? ORDER BY position",
+            (self.generator_id,),
+        )
+        return np.array([level for (level,) in rows], dtype=np.float64)
+
+    def get(self, exercise_id: str) -> Optional[Exercise]:
+        row = self._fetch_one(
+            "SELECT exercise_id, piece FROM exercises "
+            "WHERE generator_id = ? AND exercise_id = ?",
+            (self.generator_id, exercise_id),
+        )
+        return None if row is None else self._to_exercise(row)
+
+    def get_many(self, exercise_ids: Iterable[str]) -> Dict[str, Exercise]:
+        """Exercises by id, ids missing in the catalog are left out."""
+
+        exercise_ids = list(set(exercise_ids))
+        exercises: Dict[str, Exercise] = {}
+        for start in range(0, len(exercise_ids), MAX_QUERY_PARAMETERS):
+            chunk = exercise_ids[start : start + MAX_QUERY_PARAMETERS]
+            for row in self._fetch_all(
+                "SELECT exercise_id, piece FROM exercises WHERE generator_id = ? "
+                f"AND exercise_id IN ({', '.join('?' * len(chunk))})",
+                (self.generator_id, *chunk),
+            ):
+                exercise = self._to_exercise(row)
+                exercises[exercise.exercise_id] = exercise
+        return exercises
+
+    def get_by_position(self, position: int) -> Exercise:
+        piece_catalog: Optional[Sequence[Piece]] = getattr(
+            self._piece_generator, "piece_catalog", None
+        )
+        if piece_catalog is not None:
+            # Positions are the same, the catalog is built from the same pieces
+            if not 0 <= position < len(piece_catalog):
+                raise IndexError(f"No exercise at position {position}")
+            piece = piece_catalog[position]
+            return Exercise(
+                exercise_id=get_exercise_id(
+                    generator_id=self.generator_id, piece=piece
+                ),
+                piece=piece,
+            )
+
+        row = self._fetch_one(
+            "SELECT exercise_id, piece FROM exercises "
+            "WHERE generator_id = ? AND position = ?",
+            (self.generator_id, position),
+        )
+        if row is None:
+            raise IndexError(f"No exercise at position {position}")
+        return self._to_exercise(row)
+
+    def exercises(self, by_difficulty: bool = False) -> Iterator[Exercise]:
+        """Iterate exercises in generation order or by increasing difficulty level."""
+
+        self.build()
+        with closing(sqlite3.connect(self._path)) as connection:
+            yield from map(
+                self._to_exercise,
+                connection.execute(
+                    "SELECT exercise_id, piece FROM exercises WHERE generator_id = ? "
+                    f"ORDER BY {_order(by_difficulty)}",
+                    (self.generator_id,),
+                ),
+            )
+
+    def build(self, force: bool = False) -> None:
+        """(Re)build the catalog if it is missing or outdated."""
+
+        if self._is_fresh and not force:
+            return
+
+        fingerprint = self.fingerprint
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(sqlite3.connect(self._path)) as connection:
+            # Take the write lock before checking, so concurrent builders wait
+            connection.execute("BEGIN IMMEDIATE")
+            self._create_schema(connection)
+            row = connection.execute(
+                "SELECT fingerprint FROM catalogs WHERE generator_id = ?",
+                (self.generator_id,),
+            ).fetchone()
+            if row is not None and row[0] == fingerprint and not force:
+                connection.rollback()
+            else:
+                self._write(connection=connection, fingerprint=fingerprint)
+                connection.commit()
+        self._is_fresh = True
+
+    @staticmethod
+    def _create_schema(connection: sqlite3.Connection) -> None:
+        """Create the tables, dropping those of other catalog versions first, as
+        their columns may differ."""
+
+        (version,) = connection.execute("PRAGMA user_version").fetchone()
+        if version != CATALOG_VERSION:
+            for table in _TABLES:
+                connection.execute(f"DROP TABLE IF EXISTS {table}")
+            connection.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+        for statement in _SCHEMA.split(";"):
+            if statement.strip():
+                connection.execute(statement)
+
+    def _write(self, connection: sqlite3.Connection, fingerprint: str) -> None:
+        connection.execute(
+            "DELETE FROM exercises WHERE generator_id = ?", (self.generator_id,)
+        )
+        rows: List[Tuple] = []
+        for position, piece in enumerate(self._piece_generator.pieces()):
+            difficulty = piece.difficulty
+            rows.append(
+                (
+                    self.generator_id,
+                    position,
+                    get_exercise_id(generator_id=self.generator_id, piece=piece),
+                    piece.piece_id,
+                    difficulty.level,
+                    json.dumps(difficulty.point),
+                    _dump_piece(piece),
+                )
+            )
+        connection.executemany(
+            "INSERT INTO exercises VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+        )
+        connection.execute(
+            "INSERT OR REPLACE INTO catalogs VALUES (?, ?, ?)",
+            (self.generator_id, fingerprint, len(rows)),
+        )
+
+    def _fetch_one(self, query: str, parameters: Tuple) -> Optional[Tuple]:
+        self.build()
+        with closing(sqlite3.connect(self._path)) as connection:
+            return connection.execute(query, parameters).fetchone()
+
+    def _fetch_all(self, query: str, parameters: Tuple) -> List[Tuple]:
+        self.build()
+        with closing(sqlite3.connect(self._path)) as connection:
+            return connection.execute(query, parameters).fetchall()
+
+    @staticmethod
+    def _to_exercise(row: Tuple[str, bytes]) -> Exercise:
+        exercise_id, piece = row
+        return Exercise(exercise_id=exercise_id, piece=intern(pickle.loads(piece)))
+
+
+# Catalogs by generator id, shared within the process.
+_CATALOGS: Dict[str, Catalog] = {}
+
+
+def get_catalog(piece_generator: PieceGeneratorLike) -> Catalog:
+    if piece_generator.generator_id not in _CATALOGS:
+        _CATALOGS[piece_generator.generator_id] = Catalog(
+            piece_generator=piece_generator
+        )
+    return _CATALOGS[piece_generator.generator_id]
@@ -1,22 +1,43 @@
 """ Exercise generators. """
 
-from typing import Iterator
+from datetime import date
+from logging import warning
+from typing import Iterator, Optional
 
 from exercise.base import ExercisePractice
 from exercise.generators.exercise_generator import ExerciseGenerator
+from exercise.generators.registry import PIECE_GENERATORS
 from exercise.practice_log import PracticeLog
 
 
 class ExerciseFactory:
     """Generates exercises for user."""
 
-    def __init__(self, user_id: str) -> None:
-        self._practice_log = PracticeLog.get_for_user(user_id=user_id)
+    def __init__(
+        self, user_id: str, practice_log: Optional[PracticeLog] = None
+    ) -> None:
+        self._practice_log = practice_log or PracticeLog.get_for_user(user_id=user_id)
+
+    def generate_exercises(
+        self, today: Optional[date] = None
+    ) -> Iterator[ExercisePractice]:
+        """Exercise practices for the day, the current day by default.
+
+        Generators without an exercise for the user are logged and skipped.
+        """
 
-    def generate_exercises(self) -> Iterator[ExercisePractice]:
         for exercise_generator in self._iterate_exercise_generators():
-            yield exercise_generator.generate()
+            try:
+                yield exercise_generator.generate(today=today)
+            except ValueError as error:
+                warning(
+                    f"Skipping generator {exercise_generator.generator_id}: {error}"
+                )
 
     def _iterate_exercise_generators(self) -> Iterator[ExerciseGenerator]:
-        """Pick exercise generators for user."""
-        raise NotImplementedError
+        """Pick exercise generators for user, one of every generator."""
+
+        for piece_generator in PIECE_GENERATORS.values():
+            yield ExerciseGenerator(
+                practice_log=self._practice_log, piece_generator=piece_generator
+            )
@@ -1,29 +1,41 @@
 """ Exercise generators. """
 
 from abc import ABC
-from typing import Iterator, Optional, Protocol
+from datetime import date
+from typing import Dict, Iterator, Optional
 
 from logging import warning
 
 from exercise.base import Exercise, ExercisePractice
+from exercise.difficulty_index import DifficultyIndex
+from exercise.generators.catalog import Catalog, PieceGeneratorLike, get_catalog
 from exercise.learning import (
     START_TEMPO,
-    get_key_practice_order,
-    choose_new_exercise,
-    get_exercise_to_improve,
-    is_ready_for_new_exercise,
+    choose_new_exercise_indexed,
+    improve_familiarity,
 )
-from exercise.music_representation.piece import Piece
 from exercise.practice_log import PracticeLog
-from exercise.utils import group_by
-from exercise.familiarity import Familiarity, Level
 
 
-class PieceGeneratorLike(Protocol):
-    generator_id: str
+# Difficulty indexes of generator catalogs, shared by all exercise generators.
+_DIFFICULTY_INDEXES: Dict[str, DifficultyIndex] = {}
 
-    def pieces(self) -> Iterator[Piece]:
-        ...
+
+def get_difficulty_index(piece_generator: PieceGeneratorLike) -> DifficultyIndex:
+    if piece_generator.generator_id not in _DIFFICULTY_INDEXES:
+        _DIFFICULTY_INDEXES[
+            piece_generator.generator_id
+        ] = DifficultyIndex.from_catalog(get_catalog(piece_generator))
+    return _DIFFICULTY_INDEXES[piece_generator.generator_id]
+
+
+def preload_difficulty_index(piece_generator: PieceGeneratorLike) -> None:
+    """Keep all exercises of the difficulty index in memory instead of loading them
+    from the catalog, for processes choosing exercises for many users."""
+
+    _DIFFICULTY_INDEXES[piece_generator.generator_id] = DifficultyIndex.from_exercises(
+        get_catalog(piece_generator).exercises()
+    )
 
 
 class ExerciseGenerator(ABC):
@@ -34,59 +46,60 @@ class ExerciseGenerator(ABC):
     ) -> None:
         self._practice_log = practice_log
         self._piece_generator = piece_generator
-        all_exercise_ids = {exercise.exercise_id for exercise in self.exercises()}
-        self._generator_practice_logs = [
-            practice_log
-            for practice_log in self._practice_log.get_practice_logs()
-            if practice_log.exercise_practice.exercise.exercise_id in all_exercise_ids
-        ]
-        self._exercise_to_familiarity = {
-            exercise: Familiarity.from_practice_logs(practice_logs=practice_logs)
-            for exercise, practice_logs in group_by(
-                self._generator_practice_logs,
-                key=lambda log: log.exercise_practice.exercise,
-            )
-        }
-        self._key_practice_order = get_key_practice_order(
-            practice_logs=practice_log.get_practice_logs()
-        )
 
     @property
     def generator_id(self) -> str:
         return self._piece_generator.generator_id
 
+    @property
+    def catalog(self) -> Catalog:
+        return get_catalog(self._piece_generator)
+
     def exercises(self) -> Iterator[Exercise]:
-        yield from (
-            Exercise(exercise_id=f"{self.generator_id}_{piece.piece_id}", piece=piece)
-            for piece in self._piece_generator.pieces()
-        )
+        yield from self.catalog.exercises()
+
+    @property
+    def difficulty_index(self) -> DifficultyIndex:
+        return get_difficulty_index(self._piece_generator)
 
-    def generate(self) -> ExercisePractice:
-        if is_ready_for_new_exercise(practice_logs=self._generator_practice_logs):
-            new_exercise = self._get_new_exercise()
+    def generate(self, today: Optional[date] = None) -> ExercisePractice:
+        """Exercise practice for the day, the current day by default."""
+
+        learning_state = self._practice_log.learning_state
+        if learning_state.is_ready_for_new_exercise(generator_id=self.generator_id):
+            new_exercise = self._get_new_exercise(today=today)
             if new_exercise is not None:
                 return new_exercise
             else:
                 warning(f"No new exercises for generator {self.generator_id}")
 
-        return get_exercise_to_improve(
-            exercise_to_familiarity=self._exercise_to_familiarity,
-            key_practice_order=self._key_practice_order,
+        familiarity = learning_state.familiarity_to_improve(
+            generator_id=self.generator_id
+        )
+        if familiarity is None:
+            raise ValueError(
+                f"No exercises of generator {self.generator_id} to improve"
+            )
+        return improve_familiarity(
+            familiarity=familiarity,
+            key_practice_order=learning_state.key_practice_order(today=today),
+            parameters=learning_state.parameters,
         )
 
-    def _get_new_exercise(self) -> Optional[ExercisePractice]:
-        exercise = choose_new_exercise(
-            exercises=self.exercises(),
-            familiar_exercises=set(
-                exercise
-                for exercise, familiarity in self._exercise_to_familiarity.items()
-                if familiarity.level.value >= Level.ADVANCED.value
+    def _get_new_exercise(
+        self, today: Optional[date] = None
+    ) -> Optional[ExercisePractice]:
+        learning_state = self._practice_log.learning_state
+        exercise = choose_new_exercise_indexed(
+            difficulty_index=self.difficulty_index,
+            familiar_exercises=learning_state.familiar_exercises(
+                generator_id=self.generator_id
             ),
         )
         if exercise is None:
             return None
         return ExercisePractice(
             exercise=exercise,
-            key=self._key_practice_order[0],
+            key=learning_state.key_practice_order(today=today)[0],
             tempo=START_TEMPO,
         )
@@ -1,5 +1,10 @@
-from typing import Iterable, Iterator, Optional, Tuple
+import heapq
+from fractions import Fraction
+from functools import cached_property, lru_cache
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
+from exercise.music_representation.base import MusicalElement, intern
 from exercise.music_representation.melody import Melody
 from exercise.music_representation.piece import Piece
 from exercise.music_representation.pitch_progression import PitchProgression
@@ -8,45 +13,122 @@ from exercise.musical_elements.pitch_progression import (
     BASIC_PITCH_PROGRESSIONS,
     PITCH_PROGRESSIONS,
 )
-from exercise.musical_elements.rhythm import RHYTHMS
+from exercise.musical_elements.rhythm import get_rhythms
+from exercise.product_catalog import ChainedCatalog, ProductCatalog
+from exercise.utils import group_by, merge_sorted
 
 MAX_PITCH_GAP = 4
 
 
+class PitchProgressionIndex:
+    """Pitch progressions within `MAX_PITCH_GAP`, grouped by their number of notes.
+
+    Pitch progressions matching a rhythm are merged from the groups with a number
+    of notes dividing, or divisible by, the number of notes of the rhythm. They
+    keep the order of the indexed pitch progressions.
+    """
+
+    def __init__(self, pitch_progressions: Iterable[PitchProgression]) -> None:
+        self._groups: Dict[int, List[Tuple[int, PitchProgression]]] = group_by(
+            (
+                (position, pitch_progression)
+                for position, pitch_progression in enumerate(pitch_progressions)
+                if pitch_progression.gap <= MAX_PITCH_GAP
+            ),
+            key=lambda item: item[1].num_notes,
+        )
+        self._matching: Dict[int, Tuple[PitchProgression, ...]] = {}
+
+    def matching(self, num_notes: int) -> Tuple[PitchProgression, ...]:
+        """Pitch progressions matching rhythms with the number of notes."""
+
+        if num_notes not in self._matching:
+            self._matching[num_notes] = tuple(
+                pitch_progression
+                for _, pitch_progression in heapq.merge(
+                    *(
+                        group
+                        for group_num_notes, group in self._groups.items()
+                        if group_num_notes % num_notes == 0
+                        or num_notes % group_num_notes == 0
+                    ),
+                    key=itemgetter(0),
+                )
+            )
+        return self._matching[num_notes]
+
+
+@lru_cache(maxsize=None)
+def _difficulty_ranks() -> Dict[MusicalElement, int]:
+    """Ranks of the catalog rhythms and pitch progressions by difficulty.
+
+    Difficulty is a partial order, so sorting by it depends on the order of the
+    sorted elements. Elements are ranked once, from the fixed order of their
+    catalog, and indexes sort by the rank, a total key.
+    """
+
+    ranks: Dict[MusicalElement, int] = {}
+    for elements in (get_rhythms(), PITCH_PROGRESSIONS):
+        ranks.update(
+            (element, rank)
+            for rank, element in enumerate(
+                sorted(elements, key=lambda element: element.difficulty)
+            )
+        )
+    return ranks
+
+
+def _difficulty_rank(element: MusicalElement) -> int:
+    return _difficulty_ranks()[element]
+
+
+@lru_cache(maxsize=None)
+def _rhythms_by_difficulty() -> Tuple[Rhythm, ...]:
+    return tuple(sorted(get_rhythms(), key=_difficulty_rank))
+
+
+@lru_cache(maxsize=None)
+def _rhythms_by_meter() -> Dict[Fraction, List[Rhythm]]:
+    return group_by(_rhythms_by_difficulty(), key=lambda rhythm: rhythm.meter)
+
+
+@lru_cache(maxsize=None)
+def _pitch_progression_index(
+    pitch_progressions: Optional[Tuple[PitchProgression, ...]] = None
+) -> PitchProgressionIndex:
+    """Index of the pitch progressions, all of them by difficulty by default."""
+
+    if pitch_progressions is None:
+        pitch_progressions = tuple(sorted(PITCH_PROGRESSIONS, key=_difficulty_rank))
+    return PitchProgressionIndex(pitch_progressions)
+
+
 def iterate_matching_rhythms(rhythm: Rhythm) -> Iterator[Rhythm]:
-    """Return rhythms in the same meter as given rhythm."""
+    """Return rhythms in the same meter as given rhythm, by difficulty."""
 
-    for other_rhythm in sorted(RHYTHMS, key=lambda rhythm: rhythm.difficulty):
-        if rhythm.meter == other_rhythm.meter:
-            yield other_rhythm
+    yield from _rhythms_by_meter().get(rhythm.meter, ())
 
 
 def iterate_matching_pitch_progressions(
     rhythm: Rhythm,
     pitch_progressions: Optional[Iterable[PitchProgression]] = None,
 ) -> Iterator[PitchProgression]:
-    """Return pitch progressions matching given rhythm."""
-
-    if pitch_progressions is None:
-        pitch_progressions = sorted(
-            PITCH_PROGRESSIONS,
-            key=lambda pitch_progression: pitch_progression.difficulty,
-        )
+    """Return pitch progressions matching given rhythm, all of them by difficulty
+    if not given. Indices of the pitch progressions are built once."""
 
-    pitch_progressions = filter(
-        lambda pitch_progression: (
-            pitch_progression.num_notes % rhythm.num_notes == 0
-            or rhythm.num_notes % pitch_progression.num_notes == 0
-        ),
-        pitch_progressions,
+    if pitch_progressions is not None:
+        pitch_progressions = tuple(pitch_progressions)
+    yield from _pitch_progression_index(pitch_progressions).matching(
+        num_notes=rhythm.num_notes
     )
 
-    pitch_progressions = filter(
-        lambda pitch_progression: pitch_progression.gap <= MAX_PITCH_GAP,
-        pitch_progressions,
-    )
 
-    yield from pitch_progressions
+def _piece(left_hand_part: Melody, right_hand_part: Melody) -> Piece:
+    return intern(Piece(left_hand_part=left_hand_part, right_hand_part=right_hand_part))
+
+
+def _piece_parts(piece: Piece) -> Tuple[Melody, Melody]:
+    return piece.left_hand_part, piece.right_hand_part
 
 
 class HandCoordinationPieceGenerator:
@@ -60,7 +142,7 @@ class HandCoordinationPieceGenerator:
     def _iterate_left_melodies(self) -> Iterator[Tuple[Rhythm, PitchProgression]]:
         """Iterate over melodies for the left hand."""
 
-        for rhythm in sorted(RHYTHMS, key=lambda rhythm: rhythm.difficulty):
+        for rhythm in _rhythms_by_difficulty():
             for pitch_progression in iterate_matching_pitch_progressions(rhythm=rhythm):
                 yield rhythm, pitch_progression
 
@@ -80,25 +162,77 @@ class HandCoordinationPieceGenerator:
             ):
                 yield rhythm, pitch_progression
 
-    def pieces(self) -> Iterator[Piece]:
+    @cached_property
+    def piece_catalog(self) -> ChainedCatalog[Piece]:
+        """Pieces in the order of `pieces`, with random access and lookup.
+
+        Pieces of a left hand melody are its product with the right hand melodies
+        matching its rhythm, which are listed once per rhythm.
+        """
+
+        left_melody_positions: Dict[Melody, int] = {}
+        right_melodies: Dict[Rhythm, Tuple[Melody, ...]] = {}
+        left_melody_catalogs: List[ProductCatalog[Piece]] = []
         for left_hand_rhythm, left_hand_progression in self._iterate_left_melodies():
-            for (
-                right_hand_rhythm,
-                right_hand_progression,
-            ) in self._iterate_right_melodies(
-                left_hand_rhythm=left_hand_rhythm,
-                left_hand_progression=left_hand_progression,
-            ):
-                yield Piece(
-                    left_hand_part=Melody(
-                        rhythm=left_hand_rhythm,
-                        pitch_progression=left_hand_progression,
-                    ),
-                    right_hand_part=Melody(
-                        rhythm=right_hand_rhythm,
-                        pitch_progression=right_hand_progression,
-                    ),
+            left_melody = intern(
+                Melody(rhythm=left_hand_rhythm, pitch_progression=left_hand_progression)
+            )
+            if left_hand_rhythm not in right_melodies:
+                right_melodies[left_hand_rhythm] = tuple(
+                    intern(Melody(rhythm=rhythm, pitch_progression=pitch_progression))
+                    for rhythm, pitch_progression in self._iterate_right_melodies(
+                        left_hand_rhythm=left_hand_rhythm,
+                        left_hand_progression=left_hand_progression,
+                    )
                 )
+            left_melody_positions[left_melody] = len(left_melody_catalogs)
+            left_melody_catalogs.append(
+                ProductCatalog(
+                    factors=((left_melody,), right_melodies[left_hand_rhythm]),
+                    combine=_piece,
+                    decompose=_piece_parts,
+                )
+            )
+        return ChainedCatalog(
+            catalogs=left_melody_catalogs,
+            locate=lambda piece: left_melody_positions[piece.left_hand_part],
+        )
 
-
-print(len(list(HandCoordinationPieceGenerator().pieces())))
+    def pieces(self) -> Iterator[Piece]:
+        yield from self.piece_catalog
+
+    def pieces_by_difficulty(self) -> Iterator[Piece]:
+        """Pieces by increasing difficulty level, merged from one stream per left
+        hand melody. A piece is never easier than its left hand melody."""
+
+        def _left_melody_pieces(left_melody: Melody) -> Iterator[Piece]:
+            yield from sorted(
+                (
+                    _piece(
+                        left_hand_part=left_melody,
+                        right_hand_part=intern(
+                            Melody(rhythm=rhythm, pitch_progression=pitch_progression)
+                        ),
+                    )
+                    for rhythm, pitch_progression in self._iterate_right_melodies(
+                        left_hand_rhythm=left_melody.rhythm,
+                        left_hand_progression=left_melody.pitch_progression,
+                    )
+                ),
+                key=lambda piece: piece.difficulty.level,
+            )
+
+        left_melodies = sorted(
+            (
+                intern(Melody(rhythm=rhythm, pitch_progression=pitch_progression))
+                for rhythm, pitch_progression in self._iterate_left_melodies()
+            ),
+            key=lambda melody: melody.difficulty.level,
+        )
+        yield from merge_sorted(
+            (
+                (melody.difficulty.level, _left_melody_pieces(melody))
+                for melody in left_melodies
+            ),
+            key=lambda piece: piece.difficulty.level,
+        )
@@ -1,19 +1,63 @@
 """Generates pieces with melodies."""
 
-from typing import Iterator
+from functools import cached_property
+from typing import Iterator, Tuple
 
+from exercise.music_representation.base import intern
+from exercise.music_representation.melody import Melody
 from exercise.music_representation.piece import Piece
-from exercise.musical_elements.melody import MELODIES
+from exercise.music_representation.rhythm import Rhythm
+from exercise.musical_elements.melody import get_melodies
+from exercise.musical_elements.pitch_progression import PITCH_PROGRESSIONS
+from exercise.musical_elements.rhythm import get_rhythms
+from exercise.product_catalog import ProductCatalog
+from exercise.utils import merge_sorted
+
+
+def _piece(melody: Melody) -> Piece:
+    return intern(Piece(left_hand_part=None, right_hand_part=melody))
+
+
+def _piece_parts(piece: Piece) -> Tuple[Melody]:
+    return (piece.right_hand_part,)
 
 
 class MelodiesPieceGenerator:
     generator_id = "melodies"
 
+    @cached_property
+    def piece_catalog(self) -> ProductCatalog[Piece]:
+        """Pieces in the order of `pieces`, with random access and lookup."""
+
+        return ProductCatalog(
+            factors=(get_melodies(),), combine=_piece, decompose=_piece_parts
+        )
+
     def pieces(self) -> Iterator[Piece]:
-        yield from (
-            Piece(
-                left_hand_part=None,
-                right_hand_part=melody,
+        yield from self.piece_catalog
+
+    def pieces_by_difficulty(self) -> Iterator[Piece]:
+        """Pieces by increasing difficulty level, merged from one stream per rhythm."""
+
+        def _rhythm_pieces(rhythm: Rhythm) -> Iterator[Piece]:
+            yield from sorted(
+                (
+                    _piece(
+                        intern(
+                            Melody(rhythm=rhythm, pitch_progression=pitch_progression)
+                        )
+                    )
+                    for pitch_progression in PITCH_PROGRESSIONS
+                ),
+                key=lambda piece: piece.difficulty.level,
             )
-            for melody in MELODIES
+
+        yield from merge_sorted(
+            (
+                (rhythm.difficulty.level, _rhythm_pieces(rhythm))
+                for rhythm in sorted(
+                    get_rhythms(), key=lambda rhythm: rhythm.difficulty.level
+                )
+            ),
+            key=lambda piece: piece.difficulty.level,
         )
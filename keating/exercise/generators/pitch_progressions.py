@@ -1,5 +1,6 @@
 from typing import Iterator
 
+from exercise.music_representation.base import intern
 from exercise.music_representation.melody import Melody
 from exercise.music_representation.piece import Piece
 from exercise.musical_elements.pitch_progression import PITCH_PROGRESSIONS
@@ -11,12 +12,19 @@ class PitchProgressionsPieceGenerator:
 
     def pieces(self) -> Iterator[Piece]:
         yield from (
-            Piece(
-                left_hand_part=None,
-                right_hand_part=Melody(
-                    rhythm=QUARTER_RHYTHM,
-                    pitch_progression=pitch_progression,
-                ),
+            intern(
+                Piece(
+                    left_hand_part=None,
+                    right_hand_part=intern(
+                        Melody(
+                            rhythm=QUARTER_RHYTHM,
+                            pitch_progression=pitch_progression,
+                        )
+                    ),
+                )
             )
             for pitch_progression in PITCH_PROGRESSIONS
         )
+
+    def pieces_by_difficulty(self) -> Iterator[Piece]:
+        yield from sorted(self.pieces(), key=lambda piece: piece.difficulty.level)
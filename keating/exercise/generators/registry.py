@@ -0,0 +1,32 @@
+""" Piece generators of the app by their id."""
+
+from functools import lru_cache
+from typing import Dict, Optional
+
+from exercise.generators.catalog import PieceGeneratorLike
+from exercise.generators.hand_coordination import HandCoordinationPieceGenerator
+from exercise.generators.melodies import MelodiesPieceGenerator
+from exercise.generators.pitch_progressions import PitchProgressionsPieceGenerator
+from exercise.generators.rhythms import RhythmsPieceGenerator
+
+PIECE_GENERATORS: Dict[str, PieceGeneratorLike] = {
+    piece_generator.generator_id: piece_generator
+    for piece_generator in (
+        HandCoordinationPieceGenerator(),
+        MelodiesPieceGenerator(),
+        PitchProgressionsPieceGenerator(),
+        RhythmsPieceGenerator(),
+    )
+}
+
+
+@lru_cache(maxsize=None)
+def get_generator_id(exercise_id: str) -> Optional[str]:
+    """Id of the generator of the exercise, exercise ids start with it."""
+
+    generator_ids = [
+        generator_id
+        for generator_id in PIECE_GENERATORS
+        if exercise_id.startswith(f"{generator_id}_")
+    ]
+    return max(generator_ids, key=len, default=None)
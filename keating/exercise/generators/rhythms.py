@@ -1,11 +1,12 @@
 from typing import Iterator
 
+from exercise.music_representation.base import intern
 from exercise.music_representation.melody import Melody
 from exercise.music_representation.piece import Piece
 from exercise.musical_elements.pitch_progression import (
     ONE_NOTE_PITCH_PROGRESSION,
 )
-from exercise.musical_elements.rhythm import RHYTHMS
+from exercise.musical_elements.rhythm import get_rhythms
 
 
 class RhythmsPieceGenerator:
@@ -14,12 +15,19 @@ class RhythmsPieceGenerator:
 
     def pieces(self) -> Iterator[Piece]:
         yield from (
-            Piece(
-                left_hand_part=Melody(
-                    rhythm=rhythm,
-                    pitch_progression=ONE_NOTE_PITCH_PROGRESSION,
-                ),
-                right_hand_part=None,
+            intern(
+                Piece(
+                    left_hand_part=intern(
+                        Melody(
+                            rhythm=rhythm,
+                            pitch_progression=ONE_NOTE_PITCH_PROGRESSION,
+                        )
+                    ),
+                    right_hand_part=None,
+                )
             )
-            for rhythm in RHYTHMS
+            for rhythm in get_rhythms()
         )
+
+    def pieces_by_difficulty(self) -> Iterator[Piece]:
+        yield from sorted(self.pieces(), key=lambda piece: piece.difficulty.level)
@@ -0,0 +1,92 @@
+import pickle
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from exercise.generators import catalog as catalog_module
+from exercise.generators.catalog import Catalog
+from exercise.generators.melodies import MelodiesPieceGenerator
+from exercise.generators.rhythms import RhythmsPieceGenerator
+
+
+class _CountingPieceGenerator(RhythmsPieceGenerator):
+    def __init__(self) -> None:
+        self.num_enumerations = 0
+
+    def pieces(self):
+        self.num_enumerations += 1
+        yield from super().pieces()
+
+
+def test_catalog(tmp_path, monkeypatch):
+    """Catalog stores the generated exercises and rebuilds only on definition changes."""
+
+    piece_generator = _CountingPieceGenerator()
+    pieces = list(RhythmsPieceGenerator().pieces())
+    catalog = Catalog(piece_generator=piece_generator, path=tmp_path / "catalog.db")
+
+    exercises = list(catalog.exercises())
+    assert [exercise.piece for exercise in exercises] == pieces
+    assert [exercise.piece.meter.denominator for exercise in exercises] == [
+        piece.meter.denominator for piece in pieces
+    ]
+    assert len(catalog) == len(pieces)
+    assert catalog.get(exercises[3].exercise_id) == exercises[3]
+    assert catalog.get("missing") is None
+    levels = [exercise.difficulty.level for exercise in catalog.exercises(True)]
+    assert levels == sorted(piece.difficulty.level for piece in pieces)
+    assert catalog.difficulty_levels().tolist() == [
+        piece.difficulty.level for piece in pieces
+    ]
+
+    # A new catalog object over the same database reuses the stored exercises
+    catalog = Catalog(piece_generator=piece_generator, path=tmp_path / "catalog.db")
+    assert catalog.exercise_ids() == tuple(
+        exercise.exercise_id for exercise in exercises
+    )
+    assert piece_generator.num_enumerations == 1
+
+    monkeypatch.setattr(catalog_module, "_definitions_fingerprint", lambda: "changed")
+    catalog = Catalog(piece_generator=piece_generator, path=tmp_path / "catalog.db")
+    assert len(catalog) == len(pieces)
+    assert piece_generator.num_enumerations == 2
+
+
+def test_catalog_looks_up_positions_in_piece_catalogs(tmp_path):
+    piece_generator = MelodiesPieceGenerator()
+    catalog = Catalog(piece_generator=piece_generator, path=tmp_path / "catalog.db")
+    exercises = list(catalog.exercises())
+
+    for position in (0, 1, len(exercises) // 2, len(exercises) - 1):
+        assert catalog.get_by_position(position) == exercises[position]
+    with pytest.raises(IndexError):
+        catalog.get_by_position(len(exercises))
+    with pytest.raises(IndexError):
+        catalog.get_by_position(-1)
+
+
+def test_pieces_are_stored_without_cached_values():
+    piece = next(MelodiesPieceGenerator().pieces())
+    piece.related_element_ids
+    assert piece._cache
+
+    stored_piece = pickle.loads(catalog_module._dump_piece(piece))
+    assert stored_piece == piece
+    assert hash(stored_piece) == hash(piece)
+    assert not stored_piece._cache
+    assert not stored_piece.right_hand_part._cache
+    assert stored_piece.related_element_ids == piece.related_element_ids
+
+
+def test_catalog_replaces_tables_of_other_versions(tmp_path):
+    path = tmp_path / "catalog.db"
+    with closing(sqlite3.connect(path)) as connection:
+        connection.executescript(
+            "CREATE TABLE catalogs (generator_id TEXT PRIMARY KEY);"
+            "CREATE TABLE exercises (generator_id TEXT, old_column TEXT);"
+            "PRAGMA user_version = 1;"
+        )
+
+    catalog = Catalog(piece_generator=RhythmsPieceGenerator(), path=path)
+    assert len(catalog) == len(list(RhythmsPieceGenerator().pieces()))
@@ -0,0 +1,97 @@
+import gc
+import weakref
+
+from exercise.generators.hand_coordination import (
+    MAX_PITCH_GAP,
+    HandCoordinationPieceGenerator,
+    PitchProgressionIndex,
+    _difficulty_rank,
+    _rhythms_by_difficulty,
+    iterate_matching_pitch_progressions,
+)
+from exercise.generators.melodies import MelodiesPieceGenerator
+from exercise.generators.pitch_progressions import PitchProgressionsPieceGenerator
+from exercise.generators.rhythms import RhythmsPieceGenerator
+from exercise.music_representation.base import intern
+from exercise.music_representation.piece import Piece
+from exercise.musical_elements.melody import get_melodies
+from exercise.musical_elements.pitch_progression import PITCH_PROGRESSIONS
+
+
+def test_pieces_by_difficulty():
+    """Pieces by difficulty are all the generated pieces, by increasing level."""
+
+    for piece_generator in (
+        HandCoordinationPieceGenerator(),
+        MelodiesPieceGenerator(),
+        PitchProgressionsPieceGenerator(),
+        RhythmsPieceGenerator(),
+    ):
+        pieces = list(piece_generator.pieces_by_difficulty())
+        levels = [piece.difficulty.level for piece in pieces]
+        assert levels == sorted(levels)
+        assert sorted(piece.piece_id for piece in pieces) == sorted(
+            piece.piece_id for piece in piece_generator.pieces()
+        )
+
+
+def test_pieces_are_interned():
+    """Generators share one instance of equal pieces and melodies."""
+
+    piece_generator = HandCoordinationPieceGenerator()
+    pieces = list(piece_generator.pieces())
+    for piece, other_piece in zip(
+        pieces, HandCoordinationPieceGenerator().pieces(), strict=True
+    ):
+        assert piece is other_piece
+    left_hand_parts = {id(piece.left_hand_part) for piece in pieces}
+    assert len(left_hand_parts) == len({piece.left_hand_part for piece in pieces})
+
+
+def test_interned_pieces_are_dropped_when_unused():
+    melody = get_melodies()[0]
+    piece = intern(Piece(left_hand_part=melody, right_hand_part=melody))
+    assert intern(Piece(left_hand_part=melody, right_hand_part=melody)) is piece
+
+    piece_ref = weakref.ref(piece)
+    del piece
+    gc.collect()
+    assert piece_ref() is None
+
+
+def test_piece_catalogs_give_random_access_to_pieces():
+    for piece_generator in (HandCoordinationPieceGenerator(), MelodiesPieceGenerator()):
+        pieces = list(piece_generator.pieces())
+        piece_catalog = piece_generator.piece_catalog
+        assert len(piece_catalog) == len(pieces)
+        for position in (0, 1, len(pieces) // 2, len(pieces) - 1):
+            assert piece_catalog[position] is pieces[position]
+        assert list(piece_catalog[10:20]) == pieces[10:20]
+        assert [piece_catalog.index(piece) for piece in pieces] == list(
+            range(len(pieces))
+        )
+
+
+def test_pitch_progression_index_keeps_order_of_matching_pitch_progressions():
+    pitch_progression_index = PitchProgressionIndex(PITCH_PROGRESSIONS)
+    for num_notes in range(1, 13):
+        assert list(pitch_progression_index.matching(num_notes=num_notes)) == [
+            pitch_progression
+            for pitch_progression in PITCH_PROGRESSIONS
+            if (
+                pitch_progression.num_notes % num_notes == 0
+                or num_notes % pitch_progression.num_notes == 0
+            )
+            and pitch_progression.gap <= MAX_PITCH_GAP
+        ]
+
+
+def test_indexes_are_ordered_by_difficulty_rank():
+    rhythms = _rhythms_by_difficulty()
+    assert list(map(_difficulty_rank, rhythms)) == list(range(len(rhythms)))
+    for rhythm in rhythms:
+        ranks = [
+            _difficulty_rank(pitch_progression)
+            for pitch_progression in iterate_matching_pitch_progressions(rhythm)
+        ]
+        assert ranks == sorted(ranks)
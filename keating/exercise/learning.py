@@ -1,8 +1,15 @@
-from datetime import date
-from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import math
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+from attrs import field, frozen
 
 from exercise.base import Exercise, ExercisePractice
+from exercise.difficulty_index import DifficultyIndex
 from exercise.music_representation.base import Difficulty, Key
+from exercise.music_representation.element_ids import count_elements
 from exercise.practice_log import ExercisePracticeLog, PracticeResult
 from exercise.familiarity import Familiarity, Level
 
@@ -11,69 +18,166 @@ START_TEMPO = 50
 TEMPO_STEP = 5
 KEY_FORGET_FACTOR = 1 / 30
 NUM_EXERCISES_TO_IMPROVE = 3
+# Number of candidate exercises compared at once by the indexed selection,
+# it doubles from the min to the max size as long as no candidate is chosen.
+MIN_CANDIDATES_CHUNK_SIZE = 8
+MAX_CANDIDATES_CHUNK_SIZE = 1024
+
+
+@frozen
+class LearningParameters:
+    """Parameters of choosing and improving exercises, e.g. tuned by simulations."""
+
+    tempo_step: int = field(default=TEMPO_STEP, converter=int)
+    key_forget_factor: float = field(default=KEY_FORGET_FACTOR, converter=float)
+    num_exercises_to_improve: int = field(
+        default=NUM_EXERCISES_TO_IMPROVE, converter=int
+    )
+
+    @property
+    def key_practice_window(self) -> timedelta:
+        """Older practices are forgotten and don't affect the key practice order."""
+
+        return timedelta(days=math.ceil(1 / self.key_forget_factor))
+
+
+DEFAULT_LEARNING_PARAMETERS = LearningParameters()
 
 
 def get_key_practice_order(
     practice_logs: Iterable[ExercisePracticeLog],
+    today: Optional[date] = None,
+    parameters: LearningParameters = DEFAULT_LEARNING_PARAMETERS,
+) -> Tuple[Key, ...]:
+    key_to_practice_dates: Dict[Key, Dict[date, int]] = {}
+    for practice_log in practice_logs:
+        date_to_num_practices = key_to_practice_dates.setdefault(
+            practice_log.exercise_practice.key, {}
+        )
+        date_to_num_practices[practice_log.practice_date] = (
+            date_to_num_practices.get(practice_log.practice_date, 0) + 1
+        )
+    return order_keys_by_practice(
+        key_to_practice_dates=key_to_practice_dates, today=today, parameters=parameters
+    )
+
+
+def order_keys_by_practice(
+    key_to_practice_dates: Mapping[Key, Mapping[date, int]],
+    today: Optional[date] = None,
+    parameters: LearningParameters = DEFAULT_LEARNING_PARAMETERS,
 ) -> Tuple[Key, ...]:
-    today = date.today()
+    """Order keys from the least to the most familiar, recent practices count more.
+
+    Args:
+        key_to_practice_dates: Number of practices in the key by practice date.
+        today: Day the practices are counted back from, the current day by default.
+    """
+
+    today = today or date.today()
     key_familiarity_score: Dict[Key, float] = {key: 0.0 for key in Key}
-    for practice_log in sorted(
-        practice_logs, key=lambda log: log.practice_date, reverse=True
-    ):
-        score = 1.0 - (today - practice_log.practice_date).days * KEY_FORGET_FACTOR
-        if score <= 0:
-            break
-        key_familiarity_score[practice_log.exercise_practice.key] += score
+    for key, date_to_num_practices in key_to_practice_dates.items():
+        for practice_date in sorted(date_to_num_practices, reverse=True):
+            score = 1.0 - (today - practice_date).days * parameters.key_forget_factor
+            if score <= 0:
+                break
+            for _ in range(date_to_num_practices[practice_date]):
+                key_familiarity_score[key] += score
     return tuple(
         (key for key, _ in sorted(key_familiarity_score.items(), key=lambda x: x[1]))
     )
 
 
-def is_ready_for_new_exercise(practice_logs: Iterable[ExercisePracticeLog]) -> bool:
-    exercise_to_last_result: Dict[Exercise, PracticeResult] = {}
-    num_almost_completed = 0
-    for practice_log in sorted(
-        practice_logs, key=lambda log: log.practice_date, reverse=True
-    ):
-        if practice_log.exercise_practice.exercise in exercise_to_last_result:
-            continue
-        if practice_log.result == PracticeResult.HARD:
-            return False
-        if practice_log.result == PracticeResult.ALMOST_COMPLETED:
-            num_almost_completed += 1
-        exercise_to_last_result[
-            practice_log.exercise_practice.exercise
-        ] = practice_log.result
-    return num_almost_completed < NUM_EXERCISES_TO_IMPROVE
+def get_last_results(
+    practice_logs: Iterable[ExercisePracticeLog],
+) -> Dict[Exercise, PracticeResult]:
+    """Result of the last practice day of each exercise, the first one of the day."""
+
+    exercise_to_last_log: Dict[Exercise, ExercisePracticeLog] = {}
+    for practice_log in practice_logs:
+        exercise = practice_log.exercise_practice.exercise
+        if (
+            exercise not in exercise_to_last_log
+            or practice_log.practice_date > exercise_to_last_log[exercise].practice_date
+        ):
+            exercise_to_last_log[exercise] = practice_log
+    return {
+        exercise: practice_log.result
+        for exercise, practice_log in exercise_to_last_log.items()
+    }
+
+
+def is_ready_for_new_exercise(
+    practice_logs: Iterable[ExercisePracticeLog],
+    parameters: LearningParameters = DEFAULT_LEARNING_PARAMETERS,
+) -> bool:
+    return is_ready_given_last_results(
+        num_last_results=Counter(get_last_results(practice_logs).values()),
+        parameters=parameters,
+    )
+
+
+def is_ready_given_last_results(
+    num_last_results: Mapping[PracticeResult, int],
+    parameters: LearningParameters = DEFAULT_LEARNING_PARAMETERS,
+) -> bool:
+    """Whether practiced exercises leave room for a new one.
+
+    Args:
+        num_last_results: Number of exercises by the result of their last practice.
+    """
+
+    return (
+        num_last_results.get(PracticeResult.HARD, 0) == 0
+        and num_last_results.get(PracticeResult.ALMOST_COMPLETED, 0)
+        < parameters.num_exercises_to_improve
+    )
+
+
+# Levels of exercises to improve, by priority.
+LEVELS_TO_IMPROVE = (Level.BEGINNER, Level.ZERO, Level.ADVANCED)
 
 
 def get_exercise_to_improve(
     exercise_to_familiarity: Dict[Exercise, Familiarity],
     key_practice_order: Tuple[Key, ...],
+    parameters: LearningParameters = DEFAULT_LEARNING_PARAMETERS,
 ) -> ExercisePractice:
     """Get exercise to improve."""
 
     exercise_to_improve = next(
         exercise
-        for level in [Level.BEGINNER, Level.ZERO, Level.ADVANCED]
+        for level in LEVELS_TO_IMPROVE
         for exercise, familiarity in exercise_to_familiarity.items()
         if familiarity.level == level
     )
-    current_familiarity = exercise_to_familiarity[exercise_to_improve]
+    return improve_familiarity(
+        familiarity=exercise_to_familiarity[exercise_to_improve],
+        key_practice_order=key_practice_order,
+        parameters=parameters,
+    )
+
+
+def improve_familiarity(
+    familiarity: Familiarity,
+    key_practice_order: Tuple[Key, ...],
+    parameters: LearningParameters = DEFAULT_LEARNING_PARAMETERS,
+) -> ExercisePractice:
+    """Practice of the exercise in a new key, or faster in the least familiar key."""
+
     for key in key_practice_order:
-        if key not in current_familiarity.key_to_tempo:
+        if key not in familiarity.key_to_tempo:
             return ExercisePractice(
-                exercise=exercise_to_improve,
+                exercise=familiarity.exercise,
                 key=key,
                 tempo=START_TEMPO,
             )
 
     key_to_practice = key_practice_order[0]
     return ExercisePractice(
-        exercise=exercise_to_improve,
+        exercise=familiarity.exercise,
         key=key_to_practice,
-        tempo=current_familiarity.key_to_tempo[key_to_practice] + TEMPO_STEP,
+        tempo=familiarity.key_to_tempo[key_to_practice] + parameters.tempo_step,
     )
 
 
@@ -81,6 +185,34 @@ def choose_new_exercise(
     exercises: Iterator[Exercise],
     familiar_exercises: Set[Exercise],
 ) -> Optional[Exercise]:
+    return _choose_most_novel(
+        exercise_pool=get_new_exercise_pool(
+            exercises=exercises, familiar_exercises=familiar_exercises
+        ),
+        familiar_exercises=familiar_exercises,
+    )
+
+
+def choose_new_exercise_indexed(
+    difficulty_index: DifficultyIndex,
+    familiar_exercises: Set[Exercise],
+) -> Optional[Exercise]:
+    """Same selection as `choose_new_exercise` over the indexed exercises."""
+
+    return _choose_most_novel(
+        exercise_pool=get_new_exercise_pool_indexed(
+            difficulty_index=difficulty_index, familiar_exercises=familiar_exercises
+        ),
+        familiar_exercises=familiar_exercises,
+    )
+
+
+def get_new_exercise_pool(
+    exercises: Iterator[Exercise],
+    familiar_exercises: Set[Exercise],
+) -> List[Exercise]:
+    """Get the easiest exercises that are not easier than the familiar ones."""
+
     familiar_difficulties: Set[Difficulty] = set()
     pool_difficulties: Set[Difficulty] = set()
     exercise_pool: List[Exercise] = []
@@ -106,13 +238,60 @@ def choose_new_exercise(
             exercise_pool.append(exercise)
             pool_difficulties.add(difficulty)
 
+    return exercise_pool
+
+
+def get_new_exercise_pool_indexed(
+    difficulty_index: DifficultyIndex,
+    familiar_exercises: Set[Exercise],
+) -> List[Exercise]:
+    """Same pool as `get_new_exercise_pool` over the indexed exercises,
+    with the difficulty comparisons done in batches."""
+
+    familiar = difficulty_index.mask(familiar_exercises)
+    familiar_rows = np.flatnonzero(familiar)
+    candidate_rows = np.flatnonzero(~familiar)
+    pool_rows: List[int] = []
+    start = 0
+    chunk_size = MIN_CANDIDATES_CHUNK_SIZE
+    while start < len(candidate_rows):
+        rows = candidate_rows[start : start + chunk_size]
+        chunk_size = min(2 * chunk_size, MAX_CANDIDATES_CHUNK_SIZE)
+
+        # Candidates harder than what we already have in the pool, we stop at the first
+        harder = np.flatnonzero(difficulty_index.dominates_any(rows, pool_rows))
+        end = harder[0] if len(harder) else len(rows)
+
+        # Candidates not easier than what is known before them, the first joins the pool
+        new = np.flatnonzero(
+            ~difficulty_index.is_dominated_by_any(
+                rows[:end], familiar_rows, preceding_only=True
+            )
+        )
+        if len(new):
+            pool_rows.append(int(rows[new[0]]))
+            start += int(new[0]) + 1
+        elif end < len(rows):
+            break
+        else:
+            start += len(rows)
+
+    return [difficulty_index.exercise(row) for row in pool_rows]
+
+
+def _choose_most_novel(
+    exercise_pool: List[Exercise],
+    familiar_exercises: Set[Exercise],
+) -> Optional[Exercise]:
+    """Choose the exercise bringing the most unfamiliar musical elements."""
+
     if not exercise_pool:
         return None
 
-    familiar_musical_elements = set().union(
-        *(exercise.musical_elements for exercise in familiar_exercises)
-    )
+    familiar_element_ids = 0
+    for exercise in familiar_exercises:
+        familiar_element_ids |= exercise.musical_element_ids
     return max(
         exercise_pool,
-        key=lambda exc: len(set(exc.musical_elements) - familiar_musical_elements),
+        key=lambda exc: count_elements(exc.musical_element_ids & ~familiar_element_ids),
     )
@@ -0,0 +1,287 @@
+""" Learning state of a user, kept up to date with every logged practice."""
+
+import heapq
+from collections import Counter
+from datetime import date
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from exercise.base import Exercise
+from exercise.familiarity import Familiarity, Level
+from exercise.generators.registry import get_generator_id
+from exercise.learning import (
+    DEFAULT_LEARNING_PARAMETERS,
+    LEVELS_TO_IMPROVE,
+    LearningParameters,
+    is_ready_given_last_results,
+    order_keys_by_practice,
+)
+from exercise.music_representation.base import Key
+from exercise.practice_log import ExercisePracticeLog, PracticeResult
+
+
+class _ExerciseState:
+    """Summary of practices of an exercise, see `Familiarity.from_summary`."""
+
+    def __init__(self, exercise: Exercise, order: int) -> None:
+        self.exercise = exercise
+        # Exercises are ordered by their first practice
+        self.order = order
+        self.key_to_tempo: Dict[Key, int] = {}
+        self.num_practices = 0
+        self.is_too_hard = True
+        self.last_result: Optional[PracticeResult] = None
+        self.last_practice_date: Optional[date] = None
+
+    @property
+    def familiarity(self) -> Familiarity:
+        return Familiarity.from_summary(
+            exercise=self.exercise,
+            key_to_tempo=dict(self.key_to_tempo),
+            num_practices=self.num_practices,
+            is_too_hard=self.is_too_hard,
+        )
+
+    def log_practice(self, practice_log: ExercisePracticeLog) -> None:
+        self.num_practices += 1
+        self.is_too_hard &= practice_log.result == PracticeResult.TOO_HARD
+        if practice_log.result in (PracticeResult.COMPLETED, PracticeResult.TOO_EASY):
+            key = practice_log.exercise_practice.key
+            self.key_to_tempo[key] = max(
+                self.key_to_tempo.get(key, 0), practice_log.exercise_practice.tempo
+            )
+        # Like `get_last_results`, the first result of the last practice day counts
+        if (
+            self.last_practice_date is None
+            or practice_log.practice_date > self.last_practice_date
+        ):
+            self.last_result = practice_log.result
+            self.last_practice_date = practice_log.practice_date
+
+    def to_json(self) -> Dict[str, Any]:
+        assert self.last_result is not None and self.last_practice_date is not None
+        return {
+            "exercise_id": self.exercise.exercise_id,
+            "key_to_tempo": {
+                key.name: tempo for key, tempo in self.key_to_tempo.items()
+            },
+            "num_practices": self.num_practices,
+            "is_too_hard": self.is_too_hard,
+            "last_result": self.last_result.value,
+            "last_practice_date": self.last_practice_date.isoformat(),
+        }
+
+    @classmethod
+    def from_json(
+        cls, data: Dict[str, Any], exercise: Exercise, order: int
+    ) -> "_ExerciseState":
+        exercise_state = cls(exercise=exercise, order=order)
+        exercise_state.key_to_tempo = {
+            Key[key]: tempo for key, tempo in data["key_to_tempo"].items()
+        }
+        exercise_state.num_practices = data["num_practices"]
+        exercise_state.is_too_hard = data["is_too_hard"]
+        exercise_state.last_result = PracticeResult(data["last_result"])
+        exercise_state.last_practice_date = date.fromisoformat(
+            data["last_practice_date"]
+        )
+        return exercise_state
+
+
+class _GeneratorState:
+    """Learning state of exercises of one generator."""
+
+    def __init__(self) -> None:
+        self.num_last_results: Counter = Counter()
+        # Exercises with level at least advanced
+        self.familiar_exercises: Set[Exercise] = set()
+        # Heaps of (order, exercise id) of exercises by level. Entries of exercises
+        # that changed their level since are skipped when the heap is read.
+        self.level_to_exercises: Dict[Level, List[Tuple[int, str]]] = {
+            level: [] for level in Level
+        }
+
+
+class LearningState:
+    """What a user learned, updated with every practice instead of from the whole
+    practice log.
+
+    It keeps familiarity and the last result of every practiced exercise, grouped by
+    generator, and the number of recent practices in each key, so choosing the next
+    exercise takes the same time regardless of the length of the practice history.
+    """
+
+    def __init__(
+        self, parameters: LearningParameters = DEFAULT_LEARNING_PARAMETERS
+    ) -> None:
+        self._parameters = parameters
+        self._exercise_states: Dict[str, _ExerciseState] = {}
+        self._exercise_levels: Dict[str, Level] = {}
+        self._generator_states: Dict[Optional[str], _GeneratorState] = {}
+        self._key_to_practice_dates: Dict[Key, Dict[date, int]] = {}
+
+    @property
+    def parameters(self) -> LearningParameters:
+        return self._parameters
+
+    @classmethod
+    def from_practice_logs(
+        cls,
+        practice_logs: List[ExercisePracticeLog],
+        parameters: LearningParameters = DEFAULT_LEARNING_PARAMETERS,
+    ) -> "LearningState":
+        learning_state = cls(parameters=parameters)
+        for practice_log in practice_logs:
+            learning_state.log_practice(practice_log)
+        return learning_state
+
+    def log_practice(self, practice_log: ExercisePracticeLog) -> None:
+        exercise = practice_log.exercise_practice.exercise
+        exercise_state = self._exercise_states.get(exercise.exercise_id)
+        if exercise_state is None:
+            exercise_state = _ExerciseState(
+                exercise=exercise, order=len(self._exercise_states)
+            )
+            self._exercise_states[exercise.exercise_id] = exercise_state
+        else:
+            self._forget_exercise_state(exercise_state)
+        exercise_state.log_practice(practice_log)
+        self._add_exercise_state(exercise_state)
+
+        date_to_num_practices = self._key_to_practice_dates.setdefault(
+            practice_log.exercise_practice.key, {}
+        )
+        date_to_num_practices[practice_log.practice_date] = (
+            date_to_num_practices.get(practice_log.practice_date, 0) + 1
+        )
+        self._forget_old_key_practices(
+            date_to_num_practices, last_practice_date=practice_log.practice_date
+        )
+
+    def key_practice_order(self, today: Optional[date] = None) -> Tuple[Key, ...]:
+        """Same order as `get_key_practice_order` of all logged practices."""
+
+        return order_keys_by_practice(
+            key_to_practice_dates=self._key_to_practice_dates,
+            today=today,
+            parameters=self._parameters,
+        )
+
+    def exercise_level(self, exercise_id: str) -> Optional[Level]:
+        """Level of the exercise, None if it wasn't practiced."""
+
+        return self._exercise_levels.get(exercise_id)
+
+    def is_ready_for_new_exercise(self, generator_id: str) -> bool:
+        """Same as `is_ready_for_new_exercise` of practices of the generator."""
+
+        return is_ready_given_last_results(
+            num_last_results=self._get_generator_state(generator_id).num_last_results,
+            parameters=self._parameters,
+        )
+
+    def familiar_exercises(self, generator_id: str) -> Set[Exercise]:
+        """Exercises of the generator with level at least advanced."""
+
+        return set(self._get_generator_state(generator_id).familiar_exercises)
+
+    def familiarity_to_improve(self, generator_id: str) -> Optional[Familiarity]:
+        """Familiarity with the exercise `get_exercise_to_improve` would choose."""
+
+        generator_state = self._get_generator_state(generator_id)
+        for level in LEVELS_TO_IMPROVE:
+            exercises = generator_state.level_to_exercises[level]
+            while exercises and self._exercise_levels[exercises[0][1]] != level:
+                heapq.heappop(exercises)
+            if exercises:
+                return self._exercise_states[exercises[0][1]].familiarity
+        return None
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "exercises": [
+                exercise_state.to_json()
+                for exercise_state in self._exercise_states.values()
+            ],
+            "key_to_practice_dates": {
+                key.name: {
+                    practice_date.isoformat(): num_practices
+                    for practice_date, num_practices in date_to_num_practices.items()
+                }
+                for key, date_to_num_practices in self._key_to_practice_dates.items()
+            },
+        }
+
+    @classmethod
+    def from_json(
+        cls,
+        data: Dict[str, Any],
+        exercises: Dict[str, Exercise],
+        parameters: LearningParameters = DEFAULT_LEARNING_PARAMETERS,
+    ) -> "LearningState":
+        """Learning state saved by `to_json`.
+
+        Args:
+            exercises: Practiced exercises by id, the state of missing ones is dropped.
+        """
+
+        learning_state = cls(parameters=parameters)
+        for exercise_data in data["exercises"]:
+            exercise = exercises.get(exercise_data["exercise_id"])
+            if exercise is None:
+                continue
+            exercise_state = _ExerciseState.from_json(
+                exercise_data,
+                exercise=exercise,
+                order=len(learning_state._exercise_states),
+            )
+            learning_state._exercise_states[exercise.exercise_id] = exercise_state
+            learning_state._add_exercise_state(exercise_state)
+        for key, date_to_num_practices in data["key_to_practice_dates"].items():
+            learning_state._key_to_practice_dates[Key[key]] = {
+                date.fromisoformat(practice_date): num_practices
+                for practice_date, num_practices in date_to_num_practices.items()
+            }
+        return learning_state
+
+    def _get_generator_state(self, generator_id: Optional[str]) -> _GeneratorState:
+        if generator_id not in self._generator_states:
+            self._generator_states[generator_id] = _GeneratorState()
+        return self._generator_states[generator_id]
+
+    def _forget_exercise_state(self, exercise_state: _ExerciseState) -> None:
+        generator_state = self._get_generator_state(
+            get_generator_id(exercise_state.exercise.exercise_id)
+        )
+        generator_state.num_last_results[exercise_state.last_result] -= 1
+        generator_state.familiar_exercises.discard(exercise_state.exercise)
+
+    def _add_exercise_state(self, exercise_state: _ExerciseState) -> None:
+        generator_state = self._get_generator_state(
+            get_generator_id(exercise_state.exercise.exercise_id)
+        )
+        generator_state.num_last_results[exercise_state.last_result] += 1
+
+        exercise_id = exercise_state.exercise.exercise_id
+        level = exercise_state.familiarity.level
+        if level.value >= Level.ADVANCED.value:
+            generator_state.familiar_exercises.add(exercise_state.exercise)
+        if self._exercise_levels.get(exercise_id) != level:
+            self._exercise_levels[exercise_id] = level
+            heapq.heappush(
+                generator_state.level_to_exercises[level],
+                (exercise_state.order, exercise_id),
+            )
+
+    def _forget_old_key_practices(
+        self, date_to_num_practices: Dict[date, int], last_practice_date: date
+    ) -> None:
+        """Forget practices that no longer count on the day of the last practice,
+        nor on any later day keys are ordered on."""
+
+        since = last_practice_date - self._parameters.key_practice_window
+        for practice_date in [
+            practice_date
+            for practice_date in date_to_num_practices
+            if practice_date < since
+        ]:
+            del date_to_num_practices[practice_date]
@@ -0,0 +1,43 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from exercise import config
+from exercise.models import PracticeLogEntry
+from exercise.planner import plan_users
+
+
+class Command(BaseCommand):
+    help = "Plans exercises of all users who practiced, with rendered scores."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date", type=date.fromisoformat, help="Day to plan, tomorrow by default"
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Worker processes, one per CPU by default, 0 plans in this process",
+        )
+        parser.add_argument("--chunk-size", type=int, default=config.PLANNER_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        user_ids = list(
+            PracticeLogEntry.objects.order_by()
+            .values_list("user_id", flat=True)
+            .distinct()
+        )
+        report = plan_users(
+            user_ids,
+            plan_date=options["date"],
+            max_workers=options["workers"],
+            chunk_size=options["chunk_size"],
+        )
+        self.stdout.write(
+            f"Planned {report.num_practices} exercises of {report.num_users} users "
+            f"in {report.seconds:.1f}s ({report.users_per_second:.1f} users/s)"
+        )
+        if report.num_failed_users:
+            self.stderr.write(
+                f"Planning failed for {report.num_failed_users} users, see the log"
+            )
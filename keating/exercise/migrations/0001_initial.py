@@ -0,0 +1,54 @@
+# Generated by Django 3.2.16 on 2026-10-17 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="PracticeLogEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("user_id", models.CharField(max_length=255)),
+                ("generator_id", models.CharField(max_length=255)),
+                ("exercise_id", models.CharField(max_length=1024)),
+                ("key", models.CharField(max_length=8)),
+                ("tempo", models.PositiveIntegerField()),
+                ("practice_date", models.DateField()),
+                ("result", models.PositiveSmallIntegerField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="practicelogentry",
+            index=models.Index(
+                fields=["user_id", "exercise_id", "practice_date"],
+                name="practice_log_exercise_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="practicelogentry",
+            index=models.Index(
+                fields=["user_id", "generator_id", "practice_date"],
+                name="practice_log_generator_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="practicelogentry",
+            index=models.Index(
+                fields=["user_id", "practice_date"], name="practice_log_date_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.16 on 2026-10-17 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exercise", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LearningStateEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("user_id", models.CharField(max_length=255, unique=True)),
+                ("state", models.JSONField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2.16 on 2026-10-17 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exercise", "0002_learning_state"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExercisePlanEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("user_id", models.CharField(max_length=255)),
+                ("plan_date", models.DateField()),
+                ("position", models.PositiveSmallIntegerField()),
+                ("generator_id", models.CharField(max_length=255)),
+                ("exercise_id", models.CharField(max_length=1024)),
+                ("key", models.CharField(max_length=8)),
+                ("tempo", models.PositiveIntegerField()),
+                ("score", models.TextField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="exerciseplanentry",
+            constraint=models.UniqueConstraint(
+                fields=("user_id", "plan_date", "position"),
+                name="exercise_plan_unique_position",
+            ),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 3.2.16 on 2026-10-17 19:40
+
+from django.db import migrations, models
+
+
+def split_exercise_states(apps, schema_editor):
+    LearningStateEntry = apps.get_model("exercise", "LearningStateEntry")
+    ExerciseStateEntry = apps.get_model("exercise", "ExerciseStateEntry")
+    for entry in LearningStateEntry.objects.all():
+        exercise_states = entry.state.pop("exercises")
+        ExerciseStateEntry.objects.bulk_create(
+            ExerciseStateEntry(
+                user_id=entry.user_id,
+                exercise_id=exercise_state["exercise_id"],
+                order=order,
+                state=exercise_state,
+            )
+            for order, exercise_state in enumerate(exercise_states)
+        )
+        entry.state["num_exercises"] = len(exercise_states)
+        entry.save(update_fields=["state"])
+
+
+def join_exercise_states(apps, schema_editor):
+    LearningStateEntry = apps.get_model("exercise", "LearningStateEntry")
+    ExerciseStateEntry = apps.get_model("exercise", "ExerciseStateEntry")
+    for entry in LearningStateEntry.objects.all():
+        del entry.state["num_exercises"]
+        entry.state["exercises"] = list(
+            ExerciseStateEntry.objects.filter(user_id=entry.user_id)
+            .order_by("order")
+            .values_list("state", flat=True)
+        )
+        entry.save(update_fields=["state"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exercise", "0003_exercise_plan"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExerciseStateEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("user_id", models.CharField(max_length=255)),
+                ("exercise_id", models.CharField(max_length=1024)),
+                ("order", models.PositiveIntegerField()),
+                ("state", models.JSONField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="exercisestateentry",
+            index=models.Index(
+                fields=["user_id", "order"], name="exercise_state_order_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="exercisestateentry",
+            constraint=models.UniqueConstraint(
+                fields=("user_id", "exercise_id"), name="exercise_state_unique_exercise"
+            ),
+        ),
+        migrations.RunPython(split_exercise_states, join_exercise_states),
+    ]
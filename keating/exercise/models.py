@@ -1,3 +1,82 @@
 from django.db import models
 
-# Create your models here.
+
+class PracticeLogEntry(models.Model):
+    """A single practice of an exercise by a user."""
+
+    user_id = models.CharField(max_length=255)
+    generator_id = models.CharField(max_length=255)
+    exercise_id = models.CharField(max_length=1024)
+    key = models.CharField(max_length=8)
+    tempo = models.PositiveIntegerField()
+    practice_date = models.DateField()
+    result = models.PositiveSmallIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user_id", "exercise_id", "practice_date"],
+                name="practice_log_exercise_idx",
+            ),
+            models.Index(
+                fields=["user_id", "generator_id", "practice_date"],
+                name="practice_log_generator_idx",
+            ),
+            models.Index(
+                fields=["user_id", "practice_date"],
+                name="practice_log_date_idx",
+            ),
+        ]
+
+
+class LearningStateEntry(models.Model):
+    """Learning state of a user, as of the stored practice log entries.
+
+    States of the practiced exercises are `ExerciseStateEntry` rows, so that a
+    practice reads and writes only the state of its exercise.
+    """
+
+    user_id = models.CharField(max_length=255, unique=True)
+    state = models.JSONField()
+
+
+class ExerciseStateEntry(models.Model):
+    """Learning state of an exercise practiced by a user."""
+
+    user_id = models.CharField(max_length=255)
+    exercise_id = models.CharField(max_length=1024)
+    # Exercises are ordered by their first practice
+    order = models.PositiveIntegerField()
+    state = models.JSONField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user_id", "exercise_id"],
+                name="exercise_state_unique_exercise",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user_id", "order"], name="exercise_state_order_idx"),
+        ]
+
+
+class ExercisePlanEntry(models.Model):
+    """An exercise practice planned for a user on a day, with its rendered score."""
+
+    user_id = models.CharField(max_length=255)
+    plan_date = models.DateField()
+    position = models.PositiveSmallIntegerField()
+    generator_id = models.CharField(max_length=255)
+    exercise_id = models.CharField(max_length=1024)
+    key = models.CharField(max_length=8)
+    tempo = models.PositiveIntegerField()
+    score = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user_id", "plan_date", "position"],
+                name="exercise_plan_unique_position",
+            ),
+        ]
@@ -1,12 +1,31 @@
 """ Core musical structures"""
 
+import copyreg
+import weakref
 from abc import abstractmethod
-from functools import total_ordering
-from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, NamedTuple, Union
+from functools import total_ordering, wraps
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    NamedTuple,
+    TypeVar,
+    Union,
+)
 from fractions import Fraction
 from enum import Enum
 
 from attrs import frozen, field
+from attrs.converters import optional
+
+from exercise.music_representation.element_ids import get_element_id
 
 from exercise.music_representation.pitch import (
     A3,
@@ -17,6 +36,8 @@ from exercise.music_representation.pitch import (
     E4,
     F4,
     G3,
+    PIANO_HIGHEST_PITCH,
+    PIANO_LOWEST_PITCH,
     PITCH_LETTERS,
     Ais3,
     Cis4,
@@ -56,6 +77,28 @@ class _Key(NamedTuple):
 
 KEY_RELATIVE_PITCHES = {0, 2, 4, 5, 7, 9, 11}
 
+# Note letter, octave and accidental id, see `Key.get_note`.
+SpelledNote = Tuple[str, int, Optional[int]]
+
+
+@frozen
+class SpellingTable:
+    """Spelled notes of a key for relative pitches of the piano keyboard."""
+
+    # Relative pitch of the lowest piano key, spelled by the first note
+    lowest_relative_pitch: int
+    notes: Tuple[SpelledNote, ...]
+
+    def get(self, relative_pitch: int) -> Optional[SpelledNote]:
+        index = relative_pitch - self.lowest_relative_pitch
+        if 0 <= index < len(self.notes):
+            return self.notes[index]
+        return None
+
+
+# Spelling tables of keys, built at first use.
+_SPELLING_TABLES: Dict["Key", SpellingTable] = {}
+
 
 class Key(Enum):
     Gb = _Key(center=Fis4, mode=Mode.MAJOR, accidentals_id=-6)
@@ -83,7 +126,28 @@ class Key(Enum):
     def mode(self) -> Mode:
         return self.value.mode
 
-    def get_note(self, relative_pitch: int) -> Tuple[str, int, Optional[int]]:
+    @property
+    def spelling_table(self) -> SpellingTable:
+        if self not in _SPELLING_TABLES:
+            lowest_relative_pitch = PIANO_LOWEST_PITCH - self.center
+            _SPELLING_TABLES[self] = SpellingTable(
+                lowest_relative_pitch=lowest_relative_pitch,
+                notes=tuple(
+                    self.get_note(relative_pitch=pitch - self.center)
+                    for pitch in range(PIANO_LOWEST_PITCH, PIANO_HIGHEST_PITCH + 1)
+                ),
+            )
+        return _SPELLING_TABLES[self]
+
+    def spell(self, relative_pitch: int) -> SpelledNote:
+        """Same as `get_note`, looked up in the spelling table for piano pitches."""
+
+        spelled_note = self.spelling_table.get(relative_pitch)
+        if spelled_note is None:
+            return self.get_note(relative_pitch=relative_pitch)
+        return spelled_note
+
+    def get_note(self, relative_pitch: int) -> SpelledNote:
         """Returns the note name, octave, and accidental id for a given relative pitch
         - accidental id is None if the note is in the key signature
         - accidental id is 0 if the note is natural
@@ -171,9 +235,12 @@ class NoteHarmony(NamedTuple):
 @frozen
 class Difficulty:
     sub_difficulties: Dict[str, Union[int, float, "Difficulty"]]
+    # Flattened sub difficulties (sorted by key) and their euclidean norm,
+    # precomputed once so that comparisons and sorting are tuple operations.
+    _point: Tuple[float, ...] = field(init=False, repr=False, eq=False)
+    _level: float = field(init=False, repr=False, eq=False)
 
-    @property
-    def point(self) -> Tuple[float, ...]:
+    def __attrs_post_init__(self) -> None:
         point: List[float] = []
         for _, difficulty in sorted(self.sub_difficulties.items()):
             if isinstance(difficulty, self.__class__):
@@ -182,11 +249,16 @@ class Difficulty:
                 point.append(difficulty)
             else:
                 raise ValueError(f"Unknown difficulty type: {type(difficulty)}")
-        return tuple(point)
+        object.__setattr__(self, "_point", tuple(point))
+        object.__setattr__(self, "_level", sum(x**2 for x in point) ** 0.5)
+
+    @property
+    def point(self) -> Tuple[float, ...]:
+        return self._point
 
     @property
     def level(self) -> float:
-        return sum(x**2 for x in self.point) ** 0.5
+        return self._level
 
     def __repr__(self) -> str:
         def _add_indent(text: str) -> str:
@@ -215,24 +287,75 @@ class Difficulty:
 
     def __eq__(self, other: Any) -> bool:
         self._assert_is_comparable(other=other)
-        for key, value in self.sub_difficulties.items():
-            if value != other.sub_difficulties[key]:
-                return False
-
-        return True
+        return self._point == other._point
 
     def __lt__(self, other: Any) -> bool:
         self._assert_is_comparable(other=other)
-        for key, value in self.sub_difficulties.items():
-            if value >= other.sub_difficulties[key]:
-                return False
-        return True
+        return all(
+            value < other_value for value, other_value in zip(self._point, other._point)
+        )
+
+
+ElementT = TypeVar("ElementT", bound="MusicalElement")
+ValueT = TypeVar("ValueT")
+
+
+def cached(method: Callable[[ElementT], ValueT]) -> Callable[[ElementT], ValueT]:
+    """Memoizes a no-argument method of a musical element.
+
+    The value is stored in the element's own cache, so it lives as long as the
+    element and is never shared between distinct (even if equal) elements.
+    """
+
+    @wraps(method)
+    def wrapper(self: ElementT) -> ValueT:
+        try:
+            return self._cache[method.__name__]
+        except KeyError:
+            value = self._cache[method.__name__] = method(self)
+            return value
+
+    return wrapper
+
+
+# Weak references to interned values by the values, see `intern`. Values are
+# dropped once nothing else refers to them.
+_INTERNED: "weakref.WeakKeyDictionary[Any, weakref.ref]" = weakref.WeakKeyDictionary()
+
+
+def intern(value: ValueT) -> ValueT:
+    """The shared instance of values equal to the value.
+
+    Interned musical elements share their cached values, and dicts and sets compare
+    them by identity before falling back to equality. Values are only held weakly,
+    they must support weak references (attrs classes do by default).
+    """
+
+    interned_ref = _INTERNED.get(value)
+    interned = interned_ref() if interned_ref is not None else None
+    if interned is None:
+        _INTERNED[value] = weakref.ref(value)
+        return value
+    return interned
 
 
 @frozen
 class MusicalElement:
     _name: Optional[str] = field(default=None, kw_only=True)
-    _related: Optional[Set["MusicalElement"]] = field(default=None, kw_only=True)
+    _related: Optional[FrozenSet["MusicalElement"]] = field(
+        default=None, kw_only=True, converter=optional(frozenset)
+    )
+    _cache: Dict[str, Any] = field(
+        factory=dict, init=False, repr=False, eq=False, kw_only=True
+    )
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Cached values are left out, they are recomputed when needed and some of
+        # them, like element ids, only hold within a process.
+        uncached = object.__new__(self.__class__)
+        uncached.__setstate__(self.__getstate__())
+        object.__setattr__(uncached, "_cache", {})
+        return copyreg.__newobj__, (self.__class__,), uncached.__getstate__()
 
     @property
     def difficulty(self) -> Difficulty:
@@ -252,24 +375,44 @@ class MusicalElement:
     def key(self) -> Tuple[str, str]:
         return self.__class__.__name__, self.name
 
-    # TODO(refactor)
     @property
+    @cached
     def related_musical_elements(self) -> Tuple["MusicalElement", ...]:
+        """The element and the elements it is made of, each once.
+
+        Every element keeps its own tuple, so the elements form a DAG walked once.
+        """
+
         related: List["MusicalElement"] = [self]
+        for element in self._component_elements():
+            related.extend(element.related_musical_elements)
+
+        # deduplicate
+        return tuple({element.key: element for element in related}.values())
+
+    @property
+    @cached
+    def related_element_ids(self) -> int:
+        """Bitset of ids of `related_musical_elements`, see `element_ids`."""
+
+        bitset = 1 << get_element_id(self.key)
+        for element in self._component_elements():
+            bitset |= element.related_element_ids
+        return bitset
+
+    def _component_elements(self) -> Iterator["MusicalElement"]:
+        """Musical elements directly related to or contained in the element."""
+
         if self._related:
-            for related_element in self._related:
-                related.extend(related_element.related_musical_elements)
+            yield from self._related
         for attr in self.__attrs_attrs__:
             attr_value = getattr(self, attr.name)  # type: ignore
             if isinstance(attr_value, MusicalElement):
-                related.extend(attr_value.related_musical_elements)
+                yield attr_value
             elif isinstance(attr_value, Iterable):
                 for element in attr_value:
                     if isinstance(element, MusicalElement):
-                        related.extend(element.related_musical_elements)
-
-        # deduplicate
-        return tuple({element.key: element for element in related}.values())
+                        yield element
 
     @abstractmethod
     def _default_name(self) -> str:
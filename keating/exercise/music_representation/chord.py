@@ -10,6 +10,7 @@ from attrs import frozen, field
 
 from exercise.music_representation.base import (
     IntervalSet,
+    cached,
     RelativePitch,
     MusicalElement,
     OCTAVE,
@@ -46,6 +47,7 @@ class Chord(MusicalElement):
             set(interval % OCTAVE for interval in self.intervals)
         ), f"Chord {self.name} has duplicate intervals"
 
+    @cached
     def __hash__(self) -> int:
         return hash((self.relative_root,) + tuple(sorted(list(self.intervals))))
 
@@ -78,6 +80,7 @@ class Voicing(MusicalElement):
             for octave_shift in self.interval_shifts[interval_idx]
         }
 
+    @cached
     def __hash__(self) -> int:
         return hash(
             tuple(
@@ -87,7 +90,7 @@ class Voicing(MusicalElement):
         )
 
 
-@frozen
+@frozen(cache_hash=True)
 class ChordVoicing(MusicalElement):
     chord: Chord
     voicing: Voicing
@@ -107,7 +110,7 @@ class ChordVoicing(MusicalElement):
         yield from sorted(self.intervals)
 
 
-@frozen
+@frozen(cache_hash=True)
 class ChordProgression(MusicalElement):
     chords: Tuple[Chord, ...]
 
@@ -0,0 +1,33 @@
+""" Interned ids of musical elements, sets of elements are bitsets of their ids."""
+
+from typing import Dict, List, Tuple
+
+ElementKey = Tuple[str, str]
+
+# Ids are given in the order elements are first seen, so they differ between
+# processes. Pickled elements leave their cached bitsets out.
+_KEY_TO_ID: Dict[ElementKey, int] = {}
+_KEYS: List[ElementKey] = []
+
+
+def get_element_id(key: ElementKey) -> int:
+    """Id of the musical element with the key, elements with equal keys share it."""
+
+    try:
+        return _KEY_TO_ID[key]
+    except KeyError:
+        element_id = _KEY_TO_ID[key] = len(_KEYS)
+        _KEYS.append(key)
+        return element_id
+
+
+def get_element_keys(bitset: int) -> Tuple[ElementKey, ...]:
+    """Keys of the elements in the bitset, by increasing id."""
+
+    return tuple(
+        key for element_id, key in enumerate(_KEYS) if bitset >> element_id & 1
+    )
+
+
+def count_elements(bitset: int) -> int:
+    return bin(bitset).count("1")
@@ -6,7 +6,7 @@ from exercise.music_representation.chord import ChordProgression
 from exercise.music_representation.pitch_progression import PitchProgression
 
 
-@frozen
+@frozen(cache_hash=True)
 class HarmonyProgression(MusicalElement):
     relative_harmonies: Tuple[IntervalSet, ...]
 
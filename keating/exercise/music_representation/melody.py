@@ -8,14 +8,17 @@ from typing import (
     Tuple,
 )
 
+import numpy as np
 from attrs import frozen
 
 from exercise.music_representation.base import (
     Difficulty,
+    cached,
     RelativeNote,
     MusicalElement,
 )
 from exercise.music_representation.harmony import HarmonyProgression
+from exercise.music_representation.note_buffer import NoteBuffer
 from exercise.music_representation.pitch_progression import PitchProgression
 from exercise.music_representation.rhythm import Rhythm
 from exercise.music_representation.utils.spacements import (
@@ -24,7 +27,7 @@ from exercise.music_representation.utils.spacements import (
 from exercise.music_representation.chord import ChordProgression
 
 
-@frozen
+@frozen(cache_hash=True)
 class Melody(MusicalElement):
     pitch_progression: PitchProgression
     rhythm: Rhythm
@@ -47,6 +50,29 @@ class Melody(MusicalElement):
         return tuple(self)
 
     @property
+    @cached
+    def note_buffer(self) -> NoteBuffer:
+        """The notes of the melody, see `__iter__`."""
+
+        num_notes = self.pitch_progression.num_notes * math.ceil(
+            self.rhythm.num_notes / self.pitch_progression.num_notes
+        )
+        notes = self.rhythm.note_buffer.repeat(
+            math.ceil(num_notes / self.rhythm.num_notes)
+        )[:num_notes]
+        return NoteBuffer(
+            relative_pitches=np.resize(
+                np.array(self.pitch_progression.relative_pitches, dtype=np.int64),
+                num_notes,
+            ),
+            positions=notes.positions,
+            durations=notes.durations,
+            flags=notes.flags,
+            resolution=notes.resolution,
+        )
+
+    @property
+    @cached
     def difficulty(self) -> Difficulty:
         return Difficulty(
             sub_difficulties={
@@ -72,7 +98,7 @@ class Melody(MusicalElement):
         )
 
 
-@frozen
+@frozen(cache_hash=True)
 class HarmonyLine(MusicalElement):
     harmony_progression: HarmonyProgression
     rhythm: Rhythm
@@ -0,0 +1,209 @@
+""" Array backed container of notes."""
+
+import math
+from typing import Iterable, Iterator, Tuple, Union
+
+import numpy as np
+from attrs import frozen
+
+from exercise.music_representation.base import RelativeNote, Spacement
+from exercise.music_representation.utils.spacements import (
+    TICKS_PER_WHOLE,
+    from_ticks,
+    get_spacements_resolution,
+    to_tick_spacements,
+)
+
+# Bits of note flags
+STACCATO = 1
+REST = 2
+
+
+@frozen(eq=False)
+class NoteBuffer:
+    """Notes stored as parallel arrays, timed in ticks (`resolution` per whole note).
+
+    Operations on the buffer are vectorized and return new buffers, so shifting or
+    repeating notes doesn't create an object per note. Note modifiers are not kept.
+    """
+
+    # int64 arrays
+    relative_pitches: np.ndarray
+    positions: np.ndarray
+    durations: np.ndarray
+    # uint8 array of STACCATO and REST bits
+    flags: np.ndarray
+    resolution: int = TICKS_PER_WHOLE
+
+    @classmethod
+    def from_spacements(
+        cls,
+        spacements: Tuple[Spacement, ...],
+        relative_pitches: Union[int, Iterable[int]] = 0,
+    ) -> "NoteBuffer":
+        resolution = get_spacements_resolution(spacements)
+        tick_spacements = np.array(
+            to_tick_spacements(spacements, resolution=resolution), dtype=np.int64
+        ).reshape(len(spacements), 2)
+        return cls(
+            relative_pitches=np.broadcast_to(
+                np.asarray(relative_pitches, dtype=np.int64), len(spacements)
+            ).copy(),
+            positions=tick_spacements[:, 0].copy(),
+            durations=tick_spacements[:, 1].copy(),
+            flags=np.array(
+                [
+                    STACCATO * spacement.is_staccato | REST * spacement.is_rest
+                    for spacement in spacements
+                ],
+                dtype=np.uint8,
+            ),
+            resolution=resolution,
+        )
+
+    @classmethod
+    def from_notes(cls, notes: Iterable[RelativeNote]) -> "NoteBuffer":
+        notes = tuple(notes)
+        return cls.from_spacements(
+            spacements=tuple(note.spacement for note in notes),
+            relative_pitches=[note.relative_pitch for note in notes],
+        )
+
+    def to_notes(self) -> Tuple[RelativeNote, ...]:
+        return tuple(self)
+
+    def __len__(self) -> int:
+        return len(self.relative_pitches)
+
+    def __iter__(self) -> Iterator[RelativeNote]:
+        for relative_pitch, position, duration, flags in zip(
+            self.relative_pitches.tolist(),
+            self.positions.tolist(),
+            self.durations.tolist(),
+            self.flags.tolist(),
+        ):
+            yield RelativeNote(
+                relative_pitch=relative_pitch,
+                spacement=Spacement(
+                    position=from_ticks(position, resolution=self.resolution),
+                    duration=from_ticks(duration, resolution=self.resolution),
+                    is_staccato=bool(flags & STACCATO),
+                    is_rest=bool(flags & REST),
+                ),
+            )
+
+    def __getitem__(self, index: Union[slice, np.ndarray]) -> "NoteBuffer":
+        """Notes selected by a slice, a boolean mask or an array of indices."""
+
+        return NoteBuffer(
+            relative_pitches=self.relative_pitches[index],
+            positions=self.positions[index],
+            durations=self.durations[index],
+            flags=self.flags[index],
+            resolution=self.resolution,
+        )
+
+    @property
+    def is_staccato(self) -> np.ndarray:
+        return (self.flags & STACCATO).astype(bool)
+
+    @property
+    def is_rest(self) -> np.ndarray:
+        return (self.flags & REST).astype(bool)
+
+    @property
+    def duration(self) -> int:
+        """End of the last note in ticks."""
+
+        if not len(self):
+            return 0
+        return int((self.positions + self.durations).max())
+
+    @property
+    def min_pitch(self) -> int:
+        return int(self.relative_pitches.min())
+
+    @property
+    def max_pitch(self) -> int:
+        return int(self.relative_pitches.max())
+
+    def transpose(self, interval: int) -> "NoteBuffer":
+        return NoteBuffer(
+            relative_pitches=self.relative_pitches + interval,
+            positions=self.positions,
+            durations=self.durations,
+            flags=self.flags,
+            resolution=self.resolution,
+        )
+
+    def shift_in_time(self, ticks: int) -> "NoteBuffer":
+        return NoteBuffer(
+            relative_pitches=self.relative_pitches,
+            positions=self.positions + ticks,
+            durations=self.durations,
+            flags=self.flags,
+            resolution=self.resolution,
+        )
+
+    def repeat(self, num_repetitions: int) -> "NoteBuffer":
+        """Notes played `num_repetitions` times, one repetition after another."""
+
+        if not len(self):
+            return self
+        repetitions, indices = np.divmod(
+            np.arange(num_repetitions * len(self), dtype=np.int64), len(self)
+        )
+        notes = self[indices]
+        return NoteBuffer(
+            relative_pitches=notes.relative_pitches,
+            positions=notes.positions + repetitions * self.duration,
+            durations=notes.durations,
+            flags=notes.flags,
+            resolution=self.resolution,
+        )
+
+    def with_resolution(self, resolution: int) -> "NoteBuffer":
+        """The same notes timed in a finer resolution."""
+
+        if resolution == self.resolution:
+            return self
+        if resolution % self.resolution:
+            raise ValueError(
+                f"Resolution {resolution} is not a multiple of {self.resolution}"
+            )
+        factor = resolution // self.resolution
+        return NoteBuffer(
+            relative_pitches=self.relative_pitches,
+            positions=self.positions * factor,
+            durations=self.durations * factor,
+            flags=self.flags,
+            resolution=resolution,
+        )
+
+    def bars(self, meter: int) -> Iterator["NoteBuffer"]:
+        """Notes grouped by the bar they start in, with positions relative to the bar.
+
+        Bars are `meter` ticks long, every bar up to the last note is yielded.
+        """
+
+        if not len(self):
+            return
+        bar_numbers = self.positions // meter
+        order = np.argsort(bar_numbers, kind="stable")
+        bar_notes = self[order]
+        bar_notes = NoteBuffer(
+            relative_pitches=bar_notes.relative_pitches,
+            positions=bar_notes.positions - bar_numbers[order] * meter,
+            durations=bar_notes.durations,
+            flags=bar_notes.flags,
+            resolution=self.resolution,
+        )
+        bounds = np.searchsorted(
+            bar_numbers[order], np.arange(int(bar_numbers.max()) + 2)
+        ).tolist()
+        for start, end in zip(bounds, bounds[1:]):
+            yield bar_notes[start:end]
+
+
+def common_resolution(*buffers: NoteBuffer) -> int:
+    return math.lcm(*(buffer.resolution for buffer in buffers))
@@ -1,16 +1,20 @@
 from fractions import Fraction
-import math
 from typing import Dict, Optional, Protocol, Tuple
 from attrs import frozen
 
 from exercise.music_representation.base import (
     Difficulty,
+    cached,
     Key,
     MusicalElement,
     RelativeNote,
 )
-from exercise.music_representation.utils.notes import get_notes_duration, repeat_notes
-from exercise.note_positioning import shift_notes_if_needed
+from exercise.music_representation.note_buffer import NoteBuffer, common_resolution
+from exercise.note_positioning import (
+    get_octave_shifts,
+    get_pitch_range,
+    shift_notes_if_needed,
+)
 
 
 class PartLike(Protocol):
@@ -26,6 +30,10 @@ class PartLike(Protocol):
     def notes(self) -> Tuple[RelativeNote, ...]:
         ...
 
+    @property
+    def note_buffer(self) -> NoteBuffer:
+        ...
+
     @property
     def part_id(self) -> str:
         ...
@@ -35,7 +43,7 @@ class PartLike(Protocol):
         ...
 
 
-@frozen
+@frozen(cache_hash=True)
 class Piece(MusicalElement):
     left_hand_part: Optional[PartLike] = None
     right_hand_part: Optional[PartLike] = None
@@ -57,8 +65,29 @@ class Piece(MusicalElement):
         repeat_hand_if_needed: bool = True,
     ) -> Tuple[Optional[Tuple[RelativeNote, ...]], Optional[Tuple[RelativeNote, ...]]]:
 
-        left_hand_notes = self.left_hand_part.notes if self.left_hand_part else None
-        right_hand_notes = self.right_hand_part.notes if self.right_hand_part else None
+        left_hand_notes, right_hand_notes = self.get_note_buffers(
+            key=key,
+            shift_if_needed=shift_if_needed,
+            repeat_hand_if_needed=repeat_hand_if_needed,
+        )
+        return (
+            left_hand_notes.to_notes() if left_hand_notes is not None else None,
+            right_hand_notes.to_notes() if right_hand_notes is not None else None,
+        )
+
+    def get_note_buffers(
+        self,
+        key: Key,
+        shift_if_needed: bool = True,
+        repeat_hand_if_needed: bool = True,
+    ) -> Tuple[Optional[NoteBuffer], Optional[NoteBuffer]]:
+
+        left_hand_notes = (
+            self.left_hand_part.note_buffer if self.left_hand_part else None
+        )
+        right_hand_notes = (
+            self.right_hand_part.note_buffer if self.right_hand_part else None
+        )
 
         if shift_if_needed:
             left_hand_notes, right_hand_notes = shift_notes_if_needed(
@@ -74,17 +103,35 @@ class Piece(MusicalElement):
         ):
             return left_hand_notes, right_hand_notes
 
-        left_duration = get_notes_duration(notes=left_hand_notes)
-        right_duration = get_notes_duration(notes=right_hand_notes)
-        return repeat_notes(
-            notes=left_hand_notes,
-            num_repetitions=math.ceil(right_duration / left_duration),
-        ), repeat_notes(
-            notes=right_hand_notes,
-            num_repetitions=math.ceil(left_duration / right_duration),
+        resolution = common_resolution(left_hand_notes, right_hand_notes)
+        left_hand_notes = left_hand_notes.with_resolution(resolution)
+        right_hand_notes = right_hand_notes.with_resolution(resolution)
+        left_duration = left_hand_notes.duration
+        right_duration = right_hand_notes.duration
+        return left_hand_notes.repeat(
+            num_repetitions=-(-right_duration // left_duration)
+        ), right_hand_notes.repeat(num_repetitions=-(-left_duration // right_duration))
+
+    @property
+    @cached
+    def _pitch_ranges(
+        self,
+    ) -> Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]]]:
+        def _pitch_range(part: Optional[PartLike]) -> Optional[Tuple[int, int]]:
+            return None if part is None else get_pitch_range(part.note_buffer)
+
+        return _pitch_range(self.left_hand_part), _pitch_range(self.right_hand_part)
+
+    def get_octave_shifts(self, key: Key) -> Tuple[int, int]:
+        """Pitch shifts of left and right hand notes placing the piece in the key."""
+
+        left_hand_range, right_hand_range = self._pitch_ranges
+        return get_octave_shifts(
+            key=key, left_hand_range=left_hand_range, right_hand_range=right_hand_range
         )
 
     @property
+    @cached
     def difficulty(self) -> Difficulty:
         sub_difficulties: Dict = {}
         if self.left_hand_part is not None:
@@ -2,6 +2,7 @@
 
 
 C0 = -8
+A0 = 1
 E3 = 32
 G3 = 35
 Gis3 = 36
@@ -18,6 +19,9 @@ Fis4 = 46
 G4 = 47
 C8 = 88
 
+PIANO_LOWEST_PITCH = A0
+PIANO_HIGHEST_PITCH = C8
+
 PITCH_LETTERS = (
     "C",
     None,
@@ -1,21 +1,26 @@
 from typing import (
+    Dict,
     Protocol,
+    Sequence,
     Tuple,
     Iterator,
 )
 
+import numpy as np
 from attrs import frozen
 
 import exercise.music_representation.utils.pitch_progression_complexity as pp_complexity
 from exercise.music_representation.base import (
     Difficulty,
+    cached,
     RelativePitch,
     MusicalElement,
     OCTAVE,
 )
+from exercise.utils import pad
 
 
-@frozen
+@frozen(cache_hash=True)
 class PitchProgression(MusicalElement):
     relative_pitches: Tuple[RelativePitch, ...]
 
@@ -48,6 +53,7 @@ class PitchProgression(MusicalElement):
         return "-".join(map(str, self.relative_pitches))
 
     @property
+    @cached
     def difficulty(self) -> Difficulty:
         # TODO: add more difficulty metrics
         return Difficulty(
@@ -72,7 +78,7 @@ class PitchProgression(MusicalElement):
         )
 
 
-@frozen
+@frozen(cache_hash=True)
 class Scale(PitchProgression):
     def __attrs_post_init__(self) -> None:
         assert list(self.relative_pitches) == sorted(
@@ -94,3 +100,19 @@ class PitchProgressionLike(Protocol):
     @property
     def name(self) -> str:
         ...
+
+
+def batch_difficulties(
+    pitch_progressions: Sequence[PitchProgression],
+) -> Dict[str, np.ndarray]:
+    """Sub difficulties of all the pitch progressions computed at once, equal to
+    their `difficulty`."""
+
+    relative_pitches, lengths = pad(
+        [pitch_progression.relative_pitches for pitch_progression in pitch_progressions]
+    )
+    complexities = pp_complexity.batch_complexities(
+        relative_pitches=relative_pitches, lengths=lengths
+    )
+    complexities["pitch_variety"] = complexities.pop("variety")
+    return complexities
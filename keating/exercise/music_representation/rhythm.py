@@ -1,30 +1,40 @@
 from typing import (
+    Dict,
+    List,
+    Sequence,
     Tuple,
     Iterator,
 )
 from fractions import Fraction
 
+import numpy as np
 from attrs import frozen, field
 
 from exercise.music_representation.base import (
     Difficulty,
+    cached,
     Spacement,
     MusicalElement,
 )
+from exercise.music_representation.note_buffer import NoteBuffer
 from exercise.music_representation.utils.rhythm_complexity import (
+    batch_complexities,
     interonset,
     unpredictability,
     syncopation,
 )
 from exercise.music_representation.utils.spacements import (
-    extract_pulse_length_and_onsets,
+    extract_pulse_and_onset_ticks,
+    get_spacements_resolution,
+    to_tick_spacements,
 )
+from exercise.utils import pad
 
 METER_4_4 = Fraction(4, 4, _normalize=False)
 METER_3_4 = Fraction(3, 4, _normalize=False)
 
 
-@frozen
+@frozen(cache_hash=True)
 class Rhythm(MusicalElement):
     meter: Fraction
     spacements: Tuple[Spacement, ...] = field()
@@ -50,17 +60,33 @@ class Rhythm(MusicalElement):
         return len(self.spacements)
 
     @property
-    def difficulty(self) -> Difficulty:
-        pulse_length, onsets = extract_pulse_length_and_onsets(
-            spacements=self.spacements
-        )
-        num_pulses: int = int(self.duration / pulse_length)
+    @cached
+    def note_buffer(self) -> NoteBuffer:
+        """Spacements of the rhythm as notes of pitch 0."""
+
+        return NoteBuffer.from_spacements(spacements=self.spacements)
+
+    @property
+    def pulse_grid(self) -> Tuple[float, int, List[int]]:
+        """Pulse complexity, number of pulses of the rhythm and its distinct onsets
+        (in pulses) when played in a loop."""
+
+        resolution = get_spacements_resolution(self.spacements)
+        tick_spacements = to_tick_spacements(self.spacements, resolution=resolution)
+        pulse, onsets = extract_pulse_and_onset_ticks(tick_spacements)
+        num_pulses: int = sum(duration for _, duration in tick_spacements) // pulse
         onsets = sorted(list({onset % num_pulses for onset in onsets}))
+        return (resolution - pulse) / resolution, num_pulses, onsets
+
+    @property
+    @cached
+    def difficulty(self) -> Difficulty:
+        pulse_complexity, num_pulses, onsets = self.pulse_grid
 
         # TODO: add more difficulty metrics
         return Difficulty(
             sub_difficulties={
-                "pulse_complexity": float(1 - pulse_length),
+                "pulse_complexity": pulse_complexity,
                 "syncopation": syncopation(num_pulses=num_pulses, onsets=onsets),
                 "interonset": interonset(num_pulses=num_pulses, onsets=onsets),
                 "unpredictability": unpredictability(
@@ -68,3 +94,19 @@ class Rhythm(MusicalElement):
                 ),
             }
         )
+
+
+def batch_difficulties(rhythms: Sequence[Rhythm]) -> Dict[str, np.ndarray]:
+    """Sub difficulties of all the rhythms computed at once, equal to their
+    `difficulty`."""
+
+    pulse_complexities, num_pulses, onsets = zip(
+        *(rhythm.pulse_grid for rhythm in rhythms)
+    )
+    onsets_matrix, _ = pad(onsets, fill_value=-1)
+    return {
+        "pulse_complexity": np.array(pulse_complexities),
+        **batch_complexities(
+            num_pulses=np.array(num_pulses, dtype=np.int64), onsets=onsets_matrix
+        ),
+    }
@@ -0,0 +1,16 @@
+from exercise.music_representation import pitch_progression, rhythm
+from exercise.musical_elements.pitch_progression import PITCH_PROGRESSIONS
+from exercise.musical_elements.rhythm import get_rhythms
+
+
+def test_batch_difficulties():
+    """Batched difficulties of shipped catalogs equal difficulties of elements."""
+    for elements, batch_difficulties in (
+        (get_rhythms(), rhythm.batch_difficulties),
+        (PITCH_PROGRESSIONS, pitch_progression.batch_difficulties),
+    ):
+        sub_difficulties = batch_difficulties(elements)
+        for idx, element in enumerate(elements):
+            assert {
+                key: values[idx] for key, values in sub_difficulties.items()
+            } == element.difficulty.sub_difficulties
@@ -0,0 +1,31 @@
+from exercise.music_representation.base import Key
+from exercise.music_representation.pitch import (
+    PIANO_HIGHEST_PITCH,
+    PIANO_LOWEST_PITCH,
+    PITCH_LETTERS,
+    C0,
+    pitch_to_str,
+)
+
+
+def test_spelling_tables_match_get_note_and_pitch_to_str():
+    for key in Key:
+        spelling_table = key.spelling_table
+        assert len(spelling_table.notes) == PIANO_HIGHEST_PITCH - PIANO_LOWEST_PITCH + 1
+        for pitch in range(PIANO_LOWEST_PITCH, PIANO_HIGHEST_PITCH + 1):
+            relative_pitch = pitch - key.center
+            spelled_note = key.get_note(relative_pitch=relative_pitch)
+            assert spelling_table.get(relative_pitch) == spelled_note
+            assert key.spell(relative_pitch) == spelled_note
+
+            letter, octave, _ = spelled_note
+            is_natural = PITCH_LETTERS[(pitch - C0) % 12] is not None
+            sign = "" if is_natural else "#" if key.accidentals_id >= 0 else "b"
+            assert (
+                pitch_to_str(positive_key=key.accidentals_id >= 0, pitch=pitch)
+                == f"{letter}{sign}{octave}"
+            )
+
+        # Pitches off the keyboard are spelled without the table
+        assert spelling_table.get(spelling_table.lowest_relative_pitch - 1) is None
+        assert key.spell(-100) == key.get_note(relative_pitch=-100)
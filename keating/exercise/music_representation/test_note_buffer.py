@@ -0,0 +1,56 @@
+from fractions import Fraction
+
+from exercise.music_representation.base import RelativeNote, Spacement
+from exercise.music_representation.note_buffer import NoteBuffer
+from exercise.music_representation.utils.notes import get_notes_duration, repeat_notes
+from exercise.musical_elements.melody import get_melodies
+
+
+def test_melody_note_buffer():
+    """Note buffers of melodies hold the same notes as melodies."""
+    for melody in get_melodies():
+        assert melody.note_buffer.to_notes() == melody.notes
+
+
+def test_note_buffer():
+    """Test vectorized operations of the note buffer."""
+    notes = (
+        RelativeNote(0, Spacement(position=Fraction(0), duration=Fraction(1, 4))),
+        RelativeNote(
+            7,
+            Spacement(
+                position=Fraction(1, 4), duration=Fraction(1, 5), is_staccato=True
+            ),
+        ),
+        RelativeNote(-3, Spacement(position=Fraction(9, 10), duration=Fraction(1, 2))),
+        RelativeNote(
+            2,
+            Spacement(position=Fraction(3, 2), duration=Fraction(1, 4), is_rest=True),
+        ),
+    )
+    buffer = NoteBuffer.from_notes(notes)
+    assert buffer.resolution == 240
+    assert buffer.to_notes() == notes
+    assert len(buffer) == 4
+    assert (buffer.min_pitch, buffer.max_pitch) == (-3, 7)
+    assert buffer.duration == 420
+    assert buffer.is_staccato.tolist() == [False, True, False, False]
+    assert buffer.is_rest.tolist() == [False, False, False, True]
+
+    assert buffer.transpose(12).to_notes() == tuple(
+        note.shift_by(pitch_interval=12) for note in notes
+    )
+    assert buffer.shift_in_time(60).to_notes() == tuple(
+        note.shift_by(duration=Fraction(1, 4)) for note in notes
+    )
+    assert get_notes_duration(notes) == Fraction(buffer.duration, buffer.resolution)
+    assert buffer.repeat(3).to_notes() == repeat_notes(notes, num_repetitions=3)
+    assert buffer.with_resolution(480).to_notes() == notes
+    assert buffer[1:3].to_notes() == notes[1:3]
+
+    assert [bar.to_notes() for bar in buffer.bars(meter=120)] == [
+        notes[:2],
+        (notes[2].shift_by(duration=-Fraction(1, 2)),),
+        (),
+        (notes[3].shift_by(duration=-Fraction(3, 2)),),
+    ]
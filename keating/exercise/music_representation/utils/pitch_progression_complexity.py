@@ -1,4 +1,6 @@
-from typing import Tuple
+from typing import Dict, Tuple
+
+import numpy as np
 
 from exercise.music_representation.base import RelativePitch
 
@@ -87,6 +89,69 @@ def unpredictability(relative_pitches: Tuple[RelativePitch, ...]) -> float:
     ) / (PITCH_SPREAD * len(intervals))
 
 
+def _num_distinct(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Number of distinct values in the first `lengths` columns of every row."""
+
+    columns = np.arange(values.shape[1])
+    values = np.sort(
+        np.where(columns < lengths[:, np.newaxis], values, np.iinfo(np.int64).max),
+        axis=1,
+    )
+    changes = (values[:, 1:] != values[:, :-1]) & (columns[1:] < lengths[:, np.newaxis])
+    return (lengths > 0) + changes.sum(axis=1)
+
+
+def batch_complexities(
+    relative_pitches: np.ndarray, lengths: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Complexities of many pitch progressions at once, equal to the scalar functions.
+
+    Args:
+        relative_pitches (np.ndarray): (progressions x pitches) matrix of relative
+            pitches of every progression, padded by any value.
+        lengths (np.ndarray): Number of pitches of every progression.
+
+    Returns:
+        dict: Arrays of "spread", "avg_gap", "max_gap", "variety", "variability"
+            and "unpredictability" of the progressions.
+    """
+
+    columns = np.arange(relative_pitches.shape[1])
+    is_pitch = columns < lengths[:, np.newaxis]
+    int_limits = np.iinfo(np.int64)
+    intervals = relative_pitches[:, 1:] - relative_pitches[:, :-1]
+    gaps = np.where(columns[1:] < lengths[:, np.newaxis], np.abs(intervals), 0)
+    interval_changes = np.where(
+        columns[2:] < lengths[:, np.newaxis],
+        np.abs(intervals[:, 1:] - intervals[:, :-1]),
+        0,
+    )
+    return {
+        "spread": (
+            np.where(is_pitch, relative_pitches, int_limits.min).max(axis=1)
+            - np.where(is_pitch, relative_pitches, int_limits.max).min(axis=1)
+        )
+        / PITCH_SPREAD,
+        "avg_gap": np.where(
+            lengths > 1, gaps.sum(axis=1) / (lengths * PITCH_SPREAD), 0.0
+        ),
+        "max_gap": np.where(
+            lengths > 1, gaps.max(axis=1, initial=0) / PITCH_SPREAD, 0.0
+        ),
+        "variety": _num_distinct(relative_pitches, lengths) / PITCH_SPREAD,
+        "variability": np.where(
+            lengths > 1,
+            _num_distinct(intervals, lengths - 1) / PITCH_SPREAD,
+            0.0,
+        ),
+        "unpredictability": np.where(
+            lengths > 2,
+            interval_changes.sum(axis=1) / (PITCH_SPREAD * np.maximum(lengths - 1, 1)),
+            0.0,
+        ),
+    }
+
+
 """
 spread: 0.09
 avg_gap: 0.02
@@ -1,32 +1,36 @@
 from collections import Counter
+from functools import lru_cache
 import heapq
+import math
 import numpy as np
-from typing import List
+from typing import Dict, List, Tuple
 
 
 def normalize(x: float) -> float:
     return 2 / (1 + np.exp(-x)) - 1
 
 
-def _divisors(num: int) -> List[int]:
+@lru_cache(maxsize=None)
+def _divisors(num: int) -> Tuple[int, ...]:
     """Get all integer divisors of a number."""
-    return [i for i in range(1, num + 1) if num % i == 0]
+    return tuple(i for i in range(1, num + 1) if num % i == 0)
+
+
+@lru_cache(maxsize=None)
+def get_pulse_weights(num_pulses: int) -> Tuple[int, ...]:
+    """Metrical weight of every pulse, the number of divisors of `num_pulses`
+    (i.e. metrical levels) the pulse falls on."""
+
+    return tuple(
+        len(_divisors(math.gcd(pulse, num_pulses))) for pulse in range(num_pulses)
+    )
 
 
 def syncopation(num_pulses: int, onsets: List[int]) -> float:
     if len(onsets) == 0:
         return 0.0
 
-    pulse_weights = [
-        len(
-            [
-                divisor
-                for divisor in _divisors(pulse + num_pulses)
-                if num_pulses % divisor == 0
-            ]
-        )
-        for pulse in range(num_pulses)
-    ]
+    pulse_weights = get_pulse_weights(num_pulses)
 
     max_weight = sum(heapq.nlargest(len(onsets), pulse_weights))
     onset_weight = sum(pulse_weights[onset] for onset in onsets)
@@ -84,3 +88,77 @@ def interonset(num_pulses: int, onsets: List[int]) -> float:
     )
     return np.std([val / num_pulses for val in histogram.values()])
     # return normalize(np.std(list(histogram.values())))
+
+
+def _batch_syncopation(num_pulses: int, onsets: np.ndarray) -> np.ndarray:
+    num_onsets = (onsets >= 0).sum(axis=1)
+    pulse_weights = np.array(get_pulse_weights(num_pulses) + (0,), dtype=np.int64)
+    # Padding (-1) picks the zero weight appended at the end
+    onset_weights = pulse_weights[onsets].sum(axis=1)
+    max_weights = np.concatenate(
+        ([0], np.cumsum(np.sort(pulse_weights)[::-1][:num_pulses]))
+    )[num_onsets]
+    return np.where(num_onsets > 0, 1 - onset_weights / np.maximum(max_weights, 1), 0.0)
+
+
+def _batch_unpredictability(num_pulses: int, onsets: np.ndarray) -> np.ndarray:
+    if num_pulses <= 1:
+        return np.zeros(len(onsets))
+    pulses = np.zeros((len(onsets), num_pulses + 1), dtype=np.int64)
+    np.put_along_axis(pulses, np.where(onsets >= 0, onsets, num_pulses), 1, axis=1)
+    pulses = pulses[:, :num_pulses]
+
+    complexity = np.zeros(len(onsets))
+    for divisor in _divisors(num_pulses):
+        if divisor == num_pulses:
+            continue
+        # Differences between consecutive parts of `divisor` pulses, circularly
+        complexity += (pulses != np.roll(pulses, -divisor, axis=1)).sum(
+            axis=1
+        ) / num_pulses
+    return normalize(complexity)
+
+
+def _batch_interonset(num_pulses: int, onsets: np.ndarray) -> np.ndarray:
+    num_onsets = (onsets >= 0).sum(axis=1)
+    safe_num_onsets = np.maximum(num_onsets, 1)
+    avg_dist = num_pulses / safe_num_onsets
+    rows = np.arange(len(onsets))
+    deviation = np.zeros(len(onsets))
+    # Columns are added one by one, in the order of the scalar sum
+    for column in range(onsets.shape[1]):
+        next_onsets = onsets[rows, (column + 1) % safe_num_onsets]
+        dist = np.abs(onsets[:, column] - next_onsets)
+        dist = np.minimum(dist, num_pulses - dist)
+        deviation += np.where(column < num_onsets, np.abs(dist - avg_dist), 0.0)
+    return np.where(num_onsets > 1, normalize(deviation), 0.0)
+
+
+def batch_complexities(
+    num_pulses: np.ndarray, onsets: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Complexities of many rhythms at once, equal to the scalar functions.
+
+    Args:
+        num_pulses (np.ndarray): Number of pulses of every rhythm.
+        onsets (np.ndarray): (rhythms x onsets) matrix of sorted distinct onsets
+            of every rhythm, padded by -1.
+
+    Returns:
+        dict: Arrays of "syncopation", "interonset" and "unpredictability"
+            of the rhythms.
+    """
+
+    complexities = {
+        name: np.zeros(len(num_pulses))
+        for name in ("syncopation", "interonset", "unpredictability")
+    }
+    for _num_pulses in np.unique(num_pulses).tolist():
+        rows = np.flatnonzero(num_pulses == _num_pulses)
+        for name, function in (
+            ("syncopation", _batch_syncopation),
+            ("interonset", _batch_interonset),
+            ("unpredictability", _batch_unpredictability),
+        ):
+            complexities[name][rows] = function(_num_pulses, onsets[rows])
+    return complexities
@@ -1,8 +1,8 @@
+import math
 from fractions import Fraction
-from typing import List, Tuple
+from typing import Iterable, List, Tuple
 
 from exercise.music_representation.base import Spacement
-from exercise.utils import gcd
 
 
 def dot(duration: Fraction) -> Fraction:
@@ -26,6 +26,67 @@ SIXTEENTH = Fraction(1, 16)
 QUARTER_TRIPLET = triplet(SEMI)
 EIGHTH_TRIPLET = triplet(QUARTER)
 
+# Ticks per whole note, the least common multiple of denominators of the durations
+# rhythms are built of, so that their positions and durations are whole ticks.
+TICKS_PER_WHOLE = math.lcm(
+    *(
+        duration.denominator
+        for duration in (
+            WHOLE,
+            SEMI,
+            QUARTER,
+            EIGHTH,
+            SIXTEENTH,
+            QUARTER_TRIPLET,
+            EIGHTH_TRIPLET,
+            dot(QUARTER),
+            dot(EIGHTH),
+        )
+    )
+)
+# Ticks per quarter note
+PPQ = TICKS_PER_WHOLE // 4
+
+# Position and duration in ticks
+TickSpacement = Tuple[int, int]
+
+
+def get_resolution(times: Iterable[Fraction]) -> int:
+    """Ticks per whole note in which all the times are whole numbers of ticks."""
+
+    return math.lcm(TICKS_PER_WHOLE, *{time.denominator for time in times})
+
+
+def to_ticks(time: Fraction, resolution: int = TICKS_PER_WHOLE) -> int:
+    ticks, remainder = divmod(time.numerator * resolution, time.denominator)
+    if remainder:
+        raise ValueError(f"{time} is not a whole number of 1/{resolution} ticks")
+    return ticks
+
+
+def from_ticks(ticks: int, resolution: int = TICKS_PER_WHOLE) -> Fraction:
+    return Fraction(ticks, resolution)
+
+
+def get_spacements_resolution(spacements: Iterable[Spacement]) -> int:
+    return get_resolution(
+        time
+        for spacement in spacements
+        for time in (spacement.position, spacement.duration)
+    )
+
+
+def to_tick_spacements(
+    spacements: Iterable[Spacement], resolution: int = TICKS_PER_WHOLE
+) -> Tuple[TickSpacement, ...]:
+    return tuple(
+        (
+            to_ticks(spacement.position, resolution=resolution),
+            to_ticks(spacement.duration, resolution=resolution),
+        )
+        for spacement in spacements
+    )
+
 
 def rhytmic_line(durations: Tuple[Fraction, ...]) -> Tuple[Spacement, ...]:
     position = Fraction(0)
@@ -54,18 +115,26 @@ def multiply_spacements(
     )
 
 
+def extract_pulse_and_onset_ticks(
+    tick_spacements: Iterable[TickSpacement],
+) -> Tuple[int, List[int]]:
+    """Longest pulse (in ticks) all starts and ends of spacements fall on,
+    and the sorted distinct onsets in pulses."""
+
+    events = {
+        event
+        for position, duration in tick_spacements
+        for event in (position, position + duration)
+    }
+    pulse = math.gcd(*events)
+    return pulse, sorted(event // pulse for event in events)
+
+
 def extract_pulse_length_and_onsets(
     spacements: Tuple[Spacement, ...]
 ) -> Tuple[Fraction, List[int]]:
-    events = sorted(
-        list(
-            set(
-                [spacement.position for spacement in spacements]
-                + [spacement.position + spacement.duration for spacement in spacements]
-            )
-        )
+    resolution = get_spacements_resolution(spacements)
+    pulse, onsets = extract_pulse_and_onset_ticks(
+        to_tick_spacements(spacements, resolution=resolution)
     )
-
-    pulse_length = gcd(events)
-
-    return pulse_length, sorted([int(event / pulse_length) for event in events])
+    return from_ticks(pulse, resolution=resolution), onsets
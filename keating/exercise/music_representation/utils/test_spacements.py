@@ -0,0 +1,26 @@
+from fractions import Fraction
+
+import pytest
+
+from exercise.music_representation.utils.spacements import (
+    TICKS_PER_WHOLE,
+    from_ticks,
+    get_spacements_resolution,
+    to_ticks,
+)
+from exercise.musical_elements.rhythm import get_rhythms
+
+
+def test_ticks():
+    """Test conversion between Fractions and ticks."""
+    assert TICKS_PER_WHOLE == 48
+    assert to_ticks(Fraction(3, 8)) == 18
+    assert to_ticks(Fraction(1, 12)) == 4
+    assert from_ticks(to_ticks(Fraction(5, 16))) == Fraction(5, 16)
+    with pytest.raises(ValueError):
+        to_ticks(Fraction(1, 5))
+    assert to_ticks(Fraction(1, 5), resolution=240) == 48
+
+    # All rhythms are timed in whole ticks
+    for rhythm in get_rhythms():
+        assert get_spacements_resolution(rhythm.spacements) == TICKS_PER_WHOLE
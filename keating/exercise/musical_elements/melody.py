@@ -1,11 +1,31 @@
 """ This module contains all the melodies """
+from functools import lru_cache
+from typing import Tuple
+
+from exercise.music_representation.base import intern
 from exercise.music_representation.melody import Melody
+from exercise.music_representation.pitch_progression import PitchProgression
+from exercise.music_representation.rhythm import Rhythm
 from exercise.musical_elements.pitch_progression import PITCH_PROGRESSIONS
-from exercise.musical_elements.rhythm import RHYTHMS
+from exercise.musical_elements.rhythm import get_rhythms
+from exercise.product_catalog import ProductCatalog
+
+
+def _melody(rhythm: Rhythm, pitch_progression: PitchProgression) -> Melody:
+    return intern(Melody(rhythm=rhythm, pitch_progression=pitch_progression))
+
+
+def _melody_parts(melody: Melody) -> Tuple[Rhythm, PitchProgression]:
+    return melody.rhythm, melody.pitch_progression
+
 
+@lru_cache(maxsize=None)
+def get_melodies() -> ProductCatalog[Melody]:
+    """All melodies, every rhythm with every pitch progression. Melodies are built
+    when accessed, rhythms are enumerated on the first call."""
 
-MELODIES = [
-    Melody(rhythm=rhythm, pitch_progression=pitch_progression)
-    for rhythm in RHYTHMS
-    for pitch_progression in PITCH_PROGRESSIONS
-]
+    return ProductCatalog(
+        factors=(get_rhythms(), PITCH_PROGRESSIONS),
+        combine=_melody,
+        decompose=_melody_parts,
+    )
@@ -1,4 +1,5 @@
 from typing import List
+from exercise.music_representation.base import intern
 from exercise.music_representation.pitch_progression import (
     PitchProgression,
     PitchProgressionLike,
@@ -28,7 +29,7 @@ PITCH_PROGRESSION_LIKES: List[PitchProgressionLike] = [
 PITCH_PROGRESSIONS = [
     ONE_NOTE_PITCH_PROGRESSION,
     *[
-        pitch_progression
+        intern(pitch_progression)
         for traversal in TRAVERSALS
         for pitch_progression_like in PITCH_PROGRESSION_LIKES
         for pitch_progression in [traversal(pitch_progression_like)]
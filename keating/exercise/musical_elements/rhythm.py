@@ -1,7 +1,12 @@
 from fractions import Fraction
+from functools import lru_cache
 from itertools import permutations
-from typing import Tuple
-from exercise.music_representation.rhythm import Rhythm, METER_4_4
+from typing import Iterator, List, Set, Tuple
+
+from attrs import frozen
+
+from exercise.music_representation.base import intern, meter
+from exercise.music_representation.rhythm import Rhythm, METER_3_4, METER_4_4
 from exercise.music_representation.utils.spacements import (
     EIGHTH_TRIPLET,
     QUARTER_TRIPLET,
@@ -15,36 +20,61 @@ from exercise.music_representation.utils.spacements import (
 )
 
 MAX_NUM_SPACEMENTS = 5
+# Note values bars are divided into.
+NOTE_VALUES = (WHOLE, SEMI, QUARTER, EIGHTH, SIXTEENTH)
 
+Durations = Tuple[Fraction, ...]
 
-DURATIONS_4_4 = {
-    (WHOLE,),
-    (SEMI,),
-    (QUARTER,),
-    (EIGHTH,),
-    (SIXTEENTH,),
-    (EIGHTH_TRIPLET,),
-    *set(permutations((QUARTER, QUARTER, SEMI))),
-    # swing
-    (QUARTER_TRIPLET, EIGHTH_TRIPLET),
-    # bossa nova
-    (QUARTER, dot(QUARTER), dot(QUARTER)),
-}
 
 QUARTER_RHYTHM = Rhythm(meter=METER_4_4, spacements=rhytmic_line(durations=(QUARTER,)))
 
 
-def all_durations(length: Fraction):
-    if length == 0:
-        yield ()
-    elif length < 0:
-        return
-    for duration in [WHOLE, SEMI, QUARTER, EIGHTH, SIXTEENTH]:
-        for durations in all_durations(length - duration):
-            yield (duration, *durations)
-
-
-DURATIONS_4_4.update(all_durations(Fraction(4, 4)))
+@lru_cache(maxsize=None)
+def _compositions(
+    length: Fraction, num_parts: int, note_values: Durations
+) -> Tuple[Durations, ...]:
+    """Divisions of the length into exactly `num_parts` note values.
+
+    Divisions of the rest of a bar are shared by all divisions of its beginning.
+    Lengths that can't be divided into that many parts are pruned right away.
+    """
+
+    if num_parts == 0:
+        return ((),) if length == 0 else ()
+    if not num_parts * min(note_values) <= length <= num_parts * max(note_values):
+        return ()
+    return tuple(
+        (note_value, *rest)
+        for note_value in note_values
+        for rest in _compositions(length - note_value, num_parts - 1, note_values)
+    )
+
+
+@lru_cache(maxsize=None)
+def _num_compositions(length: Fraction, num_parts: int, note_values: Durations) -> int:
+    """Number of `_compositions`, counted without building them."""
+
+    if num_parts == 0:
+        return int(length == 0)
+    if not num_parts * min(note_values) <= length <= num_parts * max(note_values):
+        return 0
+    return sum(
+        _num_compositions(length - note_value, num_parts - 1, note_values)
+        for note_value in note_values
+    )
+
+
+def _mobius(number: int) -> int:
+    result = 1
+    factor = 2
+    while factor * factor <= number:
+        if number % factor == 0:
+            number //= factor
+            if number % factor == 0:
+                return 0
+            result = -result
+        factor += 1
+    return -result if number > 1 else result
 
 
 def _is_canonical(durations: Tuple[Fraction, ...]) -> bool:
@@ -68,11 +98,133 @@ def _is_canonical(durations: Tuple[Fraction, ...]) -> bool:
     return True
 
 
-RHYTHMS_4_4 = tuple(
-    Rhythm(meter=METER_4_4, spacements=rhytmic_line(durations=durations))
-    for durations in DURATIONS_4_4
-    if _is_canonical(durations=durations) and len(durations) <= MAX_NUM_SPACEMENTS
+@frozen
+class RhythmSpace:
+    """Rhythms of a meter: bars divided into note values with at most
+    `max_num_spacements` notes, that don't repeat a shorter pattern.
+
+    Divisions are enumerated by increasing number of notes, so the work is bounded
+    by the number of rhythms with few notes rather than all divisions of the bar.
+    """
+
+    meter: Fraction
+    note_values: Durations = NOTE_VALUES
+    max_num_spacements: int = MAX_NUM_SPACEMENTS
+    # Patterns added to the divisions, e.g. pulses or tuplets
+    extra_durations: Tuple[Durations, ...] = ()
+
+    def durations(self) -> Iterator[Durations]:
+        """Durations of the rhythms, in the order they are enumerated."""
+
+        seen: Set[Durations] = set()
+        for durations in self._all_durations():
+            if (
+                len(durations) <= self.max_num_spacements
+                and durations not in seen
+                and _is_canonical(durations=durations)
+            ):
+                seen.add(durations)
+                yield durations
+
+    def rhythms(self) -> Iterator[Rhythm]:
+        for durations in self.durations():
+            yield self.rhythm(durations)
+
+    def rhythm(self, durations: Durations) -> Rhythm:
+        return intern(
+            Rhythm(meter=self.meter, spacements=rhytmic_line(durations=durations))
+        )
+
+    def count(self) -> int:
+        """Number of rhythms, divisions are counted without enumerating them.
+
+        Divisions repeating a shorter pattern are subtracted by Möbius inversion
+        over the number of repetitions.
+        """
+
+        num_divisions = sum(
+            _mobius(num_repetitions)
+            * _num_compositions(
+                self._length / num_repetitions,
+                num_parts // num_repetitions,
+                self.note_values,
+            )
+            for num_parts in range(1, self.max_num_spacements + 1)
+            for num_repetitions in range(1, num_parts + 1)
+            if num_parts % num_repetitions == 0
+        )
+        extra_durations = {
+            durations
+            for durations in self.extra_durations
+            if len(durations) <= self.max_num_spacements
+            and _is_canonical(durations=durations)
+            and not self._is_division(durations)
+        }
+        return num_divisions + len(extra_durations)
+
+    def _all_durations(self) -> Iterator[Durations]:
+        yield from self.extra_durations
+        for num_parts in range(1, self.max_num_spacements + 1):
+            yield from _compositions(self._length, num_parts, self.note_values)
+
+    @property
+    def _length(self) -> Fraction:
+        # Meters keep their denominator, e.g. 6/8, arithmetic needs normalized ones
+        return Fraction(self.meter.numerator, self.meter.denominator)
+
+    def _is_division(self, durations: Durations) -> bool:
+        return sum(durations) == self._length and all(
+            duration in self.note_values for duration in durations
+        )
+
+
+RHYTHM_SPACE_4_4 = RhythmSpace(
+    meter=METER_4_4,
+    extra_durations=(
+        (WHOLE,),
+        (SEMI,),
+        (QUARTER,),
+        (EIGHTH,),
+        (SIXTEENTH,),
+        (EIGHTH_TRIPLET,),
+        *sorted(set(permutations((QUARTER, QUARTER, SEMI)))),
+        # swing
+        (QUARTER_TRIPLET, EIGHTH_TRIPLET),
+        # bossa nova
+        (QUARTER, dot(QUARTER), dot(QUARTER)),
+    ),
+)
+RHYTHM_SPACE_3_4 = RhythmSpace(meter=METER_3_4)
+RHYTHM_SPACE_5_4 = RhythmSpace(meter=meter(5, 4))
+RHYTHM_SPACE_6_8 = RhythmSpace(
+    meter=meter(6, 8), note_values=(dot(SEMI), dot(QUARTER), QUARTER, EIGHTH)
 )
 
+# Order of the 4/4 catalog rhythms from when their durations were collected in a
+# hash set, as positions in the sorted durations. Exercises are chosen, and hand
+# coordination pieces generated, in the order of the catalog, so it is kept.
+# fmt: off
+_CATALOG_ORDER_4_4 = (
+    83, 9, 41, 35, 19, 85, 78, 43, 5, 62, 53, 28, 20, 66, 67, 47, 75, 24, 71, 37,
+    39, 56, 58, 4, 18, 96, 80, 2, 55, 76, 36, 48, 92, 81, 45, 64, 90, 11, 91, 7,
+    69, 29, 93, 73, 16, 60, 63, 10, 95, 25, 70, 65, 84, 97, 15, 1, 12, 38, 86, 34,
+    61, 40, 74, 23, 13, 8, 68, 46, 22, 44, 49, 17, 6, 33, 0, 54, 26, 79, 87, 89,
+    57, 31, 42, 72, 88, 50, 27, 82, 77, 30, 52, 3, 59, 51, 32, 21, 14, 94,
+)
+# fmt: on
+
+# Rhythm spaces of the exercise catalogs, with the order of their rhythms.
+CATALOG_RHYTHM_SPACES = ((RHYTHM_SPACE_4_4, _CATALOG_ORDER_4_4),)
+
+
+@lru_cache(maxsize=None)
+def get_rhythms() -> Tuple[Rhythm, ...]:
+    """All rhythms of the catalog rhythm spaces, enumerated on the first call."""
 
-RHYTHMS = (*RHYTHMS_4_4,)
+    rhythms: List[Rhythm] = []
+    for rhythm_space, order in CATALOG_RHYTHM_SPACES:
+        durations = sorted(rhythm_space.durations())
+        if len(order) != len(durations):
+            raise ValueError("Catalog order doesn't match the rhythms of the space")
+        rhythms.extend(rhythm_space.rhythm(durations[position]) for position in order)
+    return tuple(rhythms)
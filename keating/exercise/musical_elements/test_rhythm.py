@@ -0,0 +1,62 @@
+from fractions import Fraction
+from typing import Iterator, Tuple
+
+from exercise.musical_elements.rhythm import (
+    MAX_NUM_SPACEMENTS,
+    NOTE_VALUES,
+    RHYTHM_SPACE_3_4,
+    RHYTHM_SPACE_4_4,
+    RHYTHM_SPACE_5_4,
+    RHYTHM_SPACE_6_8,
+    RhythmSpace,
+    _is_canonical,
+)
+from exercise.music_representation.rhythm import METER_4_4
+from exercise.music_representation.utils.spacements import EIGHTH_TRIPLET
+
+
+def _all_divisions(
+    length: Fraction, note_values: Tuple[Fraction, ...]
+) -> Iterator[Tuple[Fraction, ...]]:
+    if length == 0:
+        yield ()
+    elif length < 0:
+        return
+    for note_value in note_values:
+        for durations in _all_divisions(length - note_value, note_values):
+            yield (note_value, *durations)
+
+
+def test_rhythm_space_prunes_only_long_and_repeating_divisions():
+    expected = {
+        durations
+        for durations in (
+            *RHYTHM_SPACE_4_4.extra_durations,
+            *_all_divisions(Fraction(1), NOTE_VALUES),
+        )
+        if len(durations) <= MAX_NUM_SPACEMENTS and _is_canonical(durations)
+    }
+    durations = list(RHYTHM_SPACE_4_4.durations())
+
+    assert len(durations) == len(expected)
+    assert set(durations) == expected
+
+
+def test_rhythms_are_counted_without_enumerating():
+    for rhythm_space in (
+        RHYTHM_SPACE_4_4,
+        RHYTHM_SPACE_3_4,
+        RHYTHM_SPACE_5_4,
+        RHYTHM_SPACE_6_8,
+        RhythmSpace(
+            meter=METER_4_4,
+            note_values=(*NOTE_VALUES, EIGHTH_TRIPLET),
+            max_num_spacements=8,
+        ),
+    ):
+        assert rhythm_space.count() == len(list(rhythm_space.durations()))
+
+    rhythms = list(RHYTHM_SPACE_6_8.rhythms())
+    assert {
+        (rhythm.meter.numerator, rhythm.meter.denominator) for rhythm in rhythms
+    } == {(6, 8)}
@@ -1,12 +1,26 @@
+import math
 from collections import defaultdict
 from fractions import Fraction
-from typing import Dict, Iterator, List, Optional, Tuple
-from exercise.music_representation.base import Key, RelativeNote
-from exercise.music_representation.utils.spacements import (
-    extract_pulse_length_and_onsets,
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+from exercise import config
+from exercise.music_representation.base import (
+    Key,
+    RelativeNote,
+    RelativePitch,
+    SpelledNote,
 )
+from exercise.music_representation.note_buffer import NoteBuffer
+from exercise.music_representation.piece import Piece
+from exercise.music_representation.utils.spacements import get_resolution, to_ticks
+
+# Bump when rendered scores change, cached scores of other versions aren't used.
+SCORE_RENDERER_VERSION = 1
 
 UNIT_LENGTH = Fraction(1, 16)
+
+# Notes of a hand as a tuple or a buffer
+Notes = Union[Tuple[RelativeNote, ...], NoteBuffer]
 ACCIDENTAL_STR = {
     -1: "_",
     0: "=",
@@ -14,13 +28,6 @@ ACCIDENTAL_STR = {
 }
 
 
-def _display_duration(duration: Fraction) -> str:
-    _duration = duration / UNIT_LENGTH
-    if _duration.denominator == 1:
-        return str(_duration.numerator)
-    return f"{_duration.numerator}/{_duration.denominator}"
-
-
 def _octave_str(octave: int) -> str:
     octave -= 4
     if octave == 0:
@@ -39,167 +46,313 @@ def _get_header(key: Key, tempo: int, meter: Fraction) -> List[str]:
     ]
 
 
-def _group_into_bars(
-    meter: Fraction, relative_notes: Tuple[RelativeNote, ...]
-) -> Iterator[Tuple[RelativeNote, ...]]:
-    """Groups notes into bars based on their spacement position and duration + the meter."""
+class BarEvent(NamedTuple):
+    """Pitches sounding together for a duration (in ticks), optionally tied
+    to the next event."""
 
-    bar_to_notes = defaultdict(list)
-    max_bar_number = 0
-    for relative_note in relative_notes:
-        bar_number = int(relative_note.spacement.position / meter)
-        bar_to_notes[bar_number].append(relative_note)
-        max_bar_number = max(max_bar_number, bar_number)
+    duration: int
+    relative_pitches: Tuple[RelativePitch, ...]
+    add_tie: bool
 
-    for bar_number in range(max_bar_number + 1):
-        yield tuple(
-            relative_note.shift_by(duration=-bar_number * meter)
-            for relative_note in bar_to_notes[bar_number]
-        )
 
+class Bar(NamedTuple):
+    events: Tuple[BarEvent, ...]
+    # Some notes continue in the next bar
+    tied_to_next: bool
 
-def _iterate_notes_in_bar(
-    meter: Fraction,
-    relative_notes: Tuple[RelativeNote, ...],
-) -> Iterator[Tuple[Fraction, Tuple[RelativeNote, ...], bool]]:
-    pulse_length, onsets = extract_pulse_length_and_onsets(
-        spacements=tuple(note.spacement for note in relative_notes)
-    )
 
-    onsets = sorted(list(set(onsets).union({0, int(meter / pulse_length)})))
-    onset_to_idx = {onset: idx for idx, onset in enumerate(onsets)}
-    onset_to_note = defaultdict(list)
-    onset_to_tie = {onset: False for onset in onsets}
-
-    for relative_note in relative_notes:
-        start_onset_idx = onset_to_idx[
-            int(relative_note.spacement.position / pulse_length)
-        ]
-        end_onset_idx = onset_to_idx[
-            int(
-                (relative_note.spacement.position + relative_note.spacement.duration)
-                / pulse_length
-            )
-        ]
-        for onset_idx in range(start_onset_idx, end_onset_idx):
-            onset = onsets[onset_idx]
-            onset_to_note[onset].append(relative_note)
-            if onset_idx != start_onset_idx:
-                onset_to_tie[onsets[onset_idx - 1]] = True
-
-    for onset, next_onset in zip(onsets, onsets[1:]):
-        yield (
-            (next_onset - onset) * pulse_length,
-            tuple(onset_to_note[onset]),
-            onset_to_tie[onset],
-        )
+# Sounding note in a bar: relative pitch, position and duration in ticks, staccato
+_BarNote = Tuple[RelativePitch, int, int, bool]
 
 
-def _convert_into_bar(
-    key: Key,
-    meter: Fraction,
-    relative_notes: Tuple[RelativeNote, ...],
-) -> Tuple[str, Tuple[RelativeNote, ...]]:
-    """Converts a bar into a string representation of the notes in the bar."""
-
-    letter_to_accidental: Dict[str, int] = {}
-
-    def _get_note(relative_pitch: int) -> str:
-        letter, octave, accidental = key.get_note(relative_pitch=relative_pitch)
-        accidental_str = ""
-        if accidental is not None and letter_to_accidental.get(letter) != accidental:
-            letter_to_accidental[letter] = accidental
-            accidental_str = ACCIDENTAL_STR[accidental]
-        return accidental_str + letter + _octave_str(octave)
-
-    def _convert_notes(relative_pitches: List[int]) -> str:
-        if len(relative_pitches) == 0:
-            return "z"
-        if len(relative_pitches) == 1:
-            return _get_note(relative_pitches[0])
-        return "[" + "".join(_get_note(pitch) for pitch in relative_pitches) + "]"
-
-    remaining_relative_notes: List[RelativeNote] = []
-    bar_relative_notes: List[RelativeNote] = []
-    for relative_note in relative_notes:
-        if relative_note.spacement.position + relative_note.spacement.duration <= meter:
-            bar_relative_notes.append(relative_note)
-            continue
-        bar_relative_notes.append(
-            relative_note._replace(
-                spacement=relative_note.spacement._replace(
-                    duration=meter - relative_note.spacement.position,
-                ),
-            )
+def _layout_bar(meter: int, notes: List[_BarNote]) -> Tuple[Bar, List[_BarNote]]:
+    """Lays out the notes of a bar, returns the bar and the notes continuing
+    in the next bar.
+
+    Events are cut at every start and end of a note. They are timed in the longest
+    pulse the starts and ends fall on, so when no note ends with the bar, its last
+    event ends with the last whole pulse.
+    """
+
+    remaining_notes: List[_BarNote] = []
+    bar_notes: List[Tuple[RelativePitch, int, int]] = []
+    boundaries = {0}
+    for relative_pitch, position, duration, is_staccato in notes:
+        end = position + duration
+        if end > meter:
+            if not is_staccato:
+                remaining_notes.append((relative_pitch, 0, end - meter, is_staccato))
+            end = meter
+        bar_notes.append((relative_pitch, position, end))
+        boundaries.add(position)
+        boundaries.add(end)
+
+    pulse = math.gcd(*boundaries)
+    boundaries.add(meter // pulse * pulse)
+    sorted_boundaries = sorted(boundaries)
+    boundary_to_idx = {boundary: idx for idx, boundary in enumerate(sorted_boundaries)}
+    event_pitches: List[List[RelativePitch]] = [[] for _ in sorted_boundaries]
+    event_ties = [False] * len(sorted_boundaries)
+    for relative_pitch, position, end in bar_notes:
+        start_idx = boundary_to_idx[position]
+        end_idx = boundary_to_idx[end]
+        for idx in range(start_idx, end_idx):
+            event_pitches[idx].append(relative_pitch)
+        for idx in range(start_idx, end_idx - 1):
+            event_ties[idx] = True
+
+    events = tuple(
+        BarEvent(
+            duration=next_boundary - boundary,
+            relative_pitches=tuple(event_pitches[idx]),
+            add_tie=event_ties[idx],
         )
-        if not relative_note.spacement.is_staccato:
-            relative_note = relative_note._replace(
-                spacement=relative_note.spacement._replace(
-                    position=Fraction(0),
-                    duration=(
-                        relative_note.spacement.duration
-                        - meter
-                        + relative_note.spacement.position
-                    ),
-                ),
-            )
-            remaining_relative_notes.append(relative_note)
+        for idx, (boundary, next_boundary) in enumerate(
+            zip(sorted_boundaries, sorted_boundaries[1:])
+        )
+    )
+    return Bar(events=events, tied_to_next=bool(remaining_notes)), remaining_notes
+
+
+def layout_bars(meter: Fraction, notes: NoteBuffer) -> Tuple[Bar, ...]:
+    """Splits notes into bars of events, timed in ticks of the notes.
+    The layout doesn't depend on the key, it can be spelled in any key and octave.
 
-    result: str = ""
-    for duration, _relative_notes, add_tie in _iterate_notes_in_bar(
-        meter=meter, relative_notes=tuple(bar_relative_notes)
+    Notes are read once, in the order of the bar they start in, and the part of a
+    note continuing past the bar line is carried into the next bar.
+    """
+
+    meter_ticks = to_ticks(meter, resolution=notes.resolution)
+    sounding = ~notes.is_rest
+    positions = notes.positions[sounding].tolist()
+    notes_by_bar: Dict[int, List[_BarNote]] = defaultdict(list)
+    for relative_pitch, position, duration, is_staccato in zip(
+        notes.relative_pitches[sounding].tolist(),
+        positions,
+        notes.durations[sounding].tolist(),
+        notes.is_staccato[sounding].tolist(),
     ):
-        result += _convert_notes(
-            relative_pitches=[
-                relative_note.relative_pitch for relative_note in _relative_notes
-            ],
-        ) + _display_duration(duration)
-        if add_tie:
-            result += "-"
+        bar_number, bar_position = divmod(position, meter_ticks)
+        notes_by_bar[bar_number].append(
+            (relative_pitch, bar_position, duration, is_staccato)
+        )
+
+    remaining_notes: List[_BarNote] = []
+    bars: List[Bar] = []
+    for bar_number in range(max(positions) // meter_ticks + 1 if positions else 0):
+        bar, remaining_notes = _layout_bar(
+            meter=meter_ticks, notes=remaining_notes + notes_by_bar[bar_number]
+        )
+        bars.append(bar)
+    return tuple(bars)
+
+
+# Letter, accidental id and the ABC note without accidental by relative pitch, for
+# every key. Built from the spelling table of the key, other pitches are added when
+# first rendered.
+_ABC_NOTES: Dict[Key, Dict[RelativePitch, Tuple[str, Optional[int], str]]] = {}
+
+
+def _to_abc_note(spelled_note: SpelledNote) -> Tuple[str, Optional[int], str]:
+    letter, octave, accidental = spelled_note
+    return letter, accidental, letter + _octave_str(octave)
+
+
+def _get_abc_notes(key: Key) -> Dict[RelativePitch, Tuple[str, Optional[int], str]]:
+    if key not in _ABC_NOTES:
+        spelling_table = key.spelling_table
+        _ABC_NOTES[key] = {
+            spelling_table.lowest_relative_pitch + idx: _to_abc_note(spelled_note)
+            for idx, spelled_note in enumerate(spelling_table.notes)
+        }
+    return _ABC_NOTES[key]
+
 
-    if remaining_relative_notes:
-        result += "-"
+@lru_cache(maxsize=None)
+def _display_duration(duration: int, resolution: int) -> str:
+    """Duration given in ticks (`resolution` per whole note) in unit lengths."""
 
-    return result, tuple(remaining_relative_notes)
+    numerator = duration * UNIT_LENGTH.denominator
+    denominator = resolution * UNIT_LENGTH.numerator
+    divisor = math.gcd(numerator, denominator)
+    numerator, denominator = numerator // divisor, denominator // divisor
+    if denominator == 1:
+        return str(numerator)
+    return f"{numerator}/{denominator}"
 
 
 def _get_notes(
-    key: Key, meter: Fraction, relative_notes: Tuple[RelativeNote, ...]
+    key: Key, bars: Tuple[Bar, ...], resolution: int, pitch_shift: int = 0
 ) -> str:
-    relative_notes = tuple(
-        filter(lambda note: not note.spacement.is_rest, relative_notes)
-    )
-    remaining_relative_notes: Tuple[RelativeNote, ...] = ()
-    bars: List[str] = []
-    for relative_bar in _group_into_bars(meter=meter, relative_notes=relative_notes):
-        bar, remaining_relative_notes = _convert_into_bar(
-            key=key,
+    """Spells the bars in the key into a single buffer, bar by bar."""
+
+    abc_notes = _get_abc_notes(key)
+    buffer: List[str] = []
+    for bar in bars:
+        # Accidentals hold until the end of the bar
+        letter_to_accidental: Dict[str, int] = {}
+        for event in bar.events:
+            if len(event.relative_pitches) > 1:
+                buffer.append("[")
+            for relative_pitch in event.relative_pitches:
+                relative_pitch += pitch_shift
+                abc_note = abc_notes.get(relative_pitch)
+                if abc_note is None:
+                    abc_note = abc_notes[relative_pitch] = _to_abc_note(
+                        key.spell(relative_pitch)
+                    )
+                letter, accidental, note = abc_note
+                if (
+                    accidental is not None
+                    and letter_to_accidental.get(letter) != accidental
+                ):
+                    letter_to_accidental[letter] = accidental
+                    buffer.append(ACCIDENTAL_STR[accidental])
+                buffer.append(note)
+            if len(event.relative_pitches) > 1:
+                buffer.append("]")
+            elif not event.relative_pitches:
+                buffer.append("z")
+            buffer.append(_display_duration(event.duration, resolution))
+            if event.add_tie:
+                buffer.append("-")
+        if bar.tied_to_next:
+            buffer.append("-")
+        buffer.append("|")
+    return "".join(buffer)
+
+
+class ScoreLayout(NamedTuple):
+    """Key independent part of a score: the notes of both hands laid out in bars."""
+
+    meter: Fraction
+    # Ticks per whole note of bar events
+    resolution: int
+    left_hand_bars: Optional[Tuple[Bar, ...]]
+    right_hand_bars: Optional[Tuple[Bar, ...]]
+
+    @classmethod
+    def from_notes(
+        cls,
+        meter: Fraction,
+        left_hand_notes: Optional[Notes],
+        right_hand_notes: Optional[Notes],
+    ) -> "ScoreLayout":
+        buffers = {
+            hand: notes
+            if isinstance(notes, NoteBuffer)
+            else NoteBuffer.from_notes(notes)
+            for hand, notes in (("left", left_hand_notes), ("right", right_hand_notes))
+            if notes
+        }
+        resolution = math.lcm(
+            get_resolution([meter]),
+            *(buffer.resolution for buffer in buffers.values()),
+        )
+        left_hand_bars, right_hand_bars = (
+            layout_bars(meter=meter, notes=buffers[hand].with_resolution(resolution))
+            if hand in buffers
+            else None
+            for hand in ("left", "right")
+        )
+        return cls(
             meter=meter,
-            relative_notes=remaining_relative_notes + relative_bar,
+            resolution=resolution,
+            left_hand_bars=left_hand_bars,
+            right_hand_bars=right_hand_bars,
         )
-        bars.append(bar)
 
-    return "|".join(bars) + "|"
+    def render(
+        self,
+        key: Key,
+        tempo: int,
+        left_hand_shift: int = 0,
+        right_hand_shift: int = 0,
+    ) -> str:
+        """Spells the layout in the key, with hands shifted by given intervals."""
+
+        return add_header(
+            body=self.render_body(
+                key=key,
+                left_hand_shift=left_hand_shift,
+                right_hand_shift=right_hand_shift,
+            ),
+            key=key,
+            tempo=tempo,
+            meter=self.meter,
+        )
+
+    def render_body(
+        self,
+        key: Key,
+        left_hand_shift: int = 0,
+        right_hand_shift: int = 0,
+    ) -> str:
+        """Voices of the score, which don't depend on the tempo."""
+
+        elements: List[str] = []
+        if self.right_hand_bars:
+            elements.append("V:1 clef=treble")
+            elements.append(
+                _get_notes(
+                    key=key,
+                    bars=self.right_hand_bars,
+                    resolution=self.resolution,
+                    pitch_shift=right_hand_shift,
+                )
+            )
+        if self.left_hand_bars:
+            elements.append("V:2 clef=bass")
+            elements.append(
+                _get_notes(
+                    key=key,
+                    bars=self.left_hand_bars,
+                    resolution=self.resolution,
+                    pitch_shift=left_hand_shift,
+                )
+            )
+        return "\n".join(elements)
+
+
+@lru_cache(maxsize=config.SCORE_LAYOUT_CACHE_SIZE)
+def get_score_layout(piece: Piece) -> ScoreLayout:
+    """Bars of both hands of the piece, shared by its scores in every key."""
+
+    left_hand_notes, right_hand_notes = piece.get_note_buffers(
+        key=Key.C, shift_if_needed=False
+    )
+    return ScoreLayout.from_notes(
+        meter=piece.meter,
+        left_hand_notes=left_hand_notes,
+        right_hand_notes=right_hand_notes,
+    )
+
+
+def render_piece_body(piece: Piece, key: Key) -> str:
+    """Body of the score of the piece in the key, with hands placed for the key."""
+
+    left_hand_shift, right_hand_shift = piece.get_octave_shifts(key=key)
+    return get_score_layout(piece).render_body(
+        key=key, left_hand_shift=left_hand_shift, right_hand_shift=right_hand_shift
+    )
+
+
+def add_header(body: str, key: Key, tempo: int, meter: Fraction) -> str:
+    """Score of the body rendered by `ScoreLayout.render_body` at the tempo."""
+
+    header = "\n".join(_get_header(key=key, tempo=tempo, meter=meter))
+    return f"{header}\n{body}" if body else header
 
 
 def create_score(
     key: Key,
     tempo: int,
     meter: Fraction,
-    left_hand_notes: Optional[Tuple[RelativeNote, ...]],
-    right_hand_notes: Optional[Tuple[RelativeNote, ...]],
+    left_hand_notes: Optional[Notes],
+    right_hand_notes: Optional[Notes],
 ) -> str:
-
-    elements: List[str] = []
-    elements.extend(_get_header(key=key, tempo=tempo, meter=meter))
-    if right_hand_notes:
-        elements.append("V:1 clef=treble")
-        elements.append(
-            _get_notes(key=key, meter=meter, relative_notes=right_hand_notes)
-        )
-    if left_hand_notes:
-        elements.append("V:2 clef=bass")
-        elements.append(
-            _get_notes(key=key, meter=meter, relative_notes=left_hand_notes)
-        )
-    return "\n".join(elements)
+    return ScoreLayout.from_notes(
+        meter=meter,
+        left_hand_notes=left_hand_notes,
+        right_hand_notes=right_hand_notes,
+    ).render(key=key, tempo=tempo)
@@ -1,6 +1,7 @@
-from typing import Optional, Tuple
+from typing import Optional, Tuple, TypeVar, Union
 
 from exercise.music_representation.base import Key, RelativeNote
+from exercise.music_representation.note_buffer import NoteBuffer
 from exercise.music_representation.pitch import C8, G4, E3
 
 MIN_LEFT_HAND_PITCH = 0
@@ -9,27 +10,40 @@ MIN_RIGHT_HAND_PITCH = E3
 MAX_RIGHT_HAND_PITCH = C8
 
 
-def _shift_notes(
-    notes: Tuple[RelativeNote, ...],
-    shift: int,
-) -> Tuple[RelativeNote, ...]:
+# Notes as a tuple or a buffer
+NotesT = TypeVar("NotesT", Tuple[RelativeNote, ...], NoteBuffer)
+
+
+def _shift_notes(notes: NotesT, shift: int) -> NotesT:
+    if isinstance(notes, NoteBuffer):
+        return notes.transpose(shift)
     return tuple(note.shift_by(pitch_interval=shift) for note in notes)
 
 
-def _highest(notes: Tuple[RelativeNote, ...]) -> int:
+def _highest(notes: Union[Tuple[RelativeNote, ...], NoteBuffer]) -> int:
+    if isinstance(notes, NoteBuffer):
+        return notes.max_pitch
     return max(note.relative_pitch for note in notes)
 
 
-def _lowest(notes: Tuple[RelativeNote, ...]) -> int:
+def _lowest(notes: Union[Tuple[RelativeNote, ...], NoteBuffer]) -> int:
+    if isinstance(notes, NoteBuffer):
+        return notes.min_pitch
     return min(note.relative_pitch for note in notes)
 
 
+def get_pitch_range(
+    notes: Union[Tuple[RelativeNote, ...], NoteBuffer]
+) -> Tuple[int, int]:
+    return _lowest(notes), _highest(notes)
+
+
 def _fit_into_range(
-    notes: Tuple[RelativeNote, ...], min_pitch: int, max_pitch: int
-) -> Tuple[RelativeNote, ...]:
+    pitch_range: Tuple[int, int], min_pitch: int, max_pitch: int
+) -> int:
+    """Octave shift (in pitches) fitting the pitch range into the given range."""
 
-    lowest_pitch = _lowest(notes)
-    highest_pitch = _highest(notes)
+    lowest_pitch, highest_pitch = pitch_range
 
     octave_shift = 0
     if highest_pitch > max_pitch:
@@ -37,62 +51,77 @@ def _fit_into_range(
     elif lowest_pitch < min_pitch:
         octave_shift = 1 + (min_pitch - lowest_pitch - 1) // 12
 
-    if octave_shift:
-        notes = _shift_notes(notes, octave_shift * 12)
-    if _highest(notes) > max_pitch or _lowest(notes) < min_pitch:
+    shift = octave_shift * 12
+    if highest_pitch + shift > max_pitch or lowest_pitch + shift < min_pitch:
         raise ValueError(
             f"notes do not fit into range\n"
-            f"Range: ({min_pitch}, {max_pitch})\nNote range: {_lowest(notes)}, {_highest(notes)}\n"
+            f"Range: ({min_pitch}, {max_pitch})\n"
+            f"Note range: {lowest_pitch + shift}, {highest_pitch + shift}\n"
             f"Original notes: {lowest_pitch}, {highest_pitch}"
         )
-    return notes
+    return shift
 
 
-def shift_notes_if_needed(
+def get_octave_shifts(
     key: Key,
-    left_hand_notes: Optional[Tuple[RelativeNote, ...]],
-    right_hand_notes: Optional[Tuple[RelativeNote, ...]],
-) -> Tuple[Optional[Tuple[RelativeNote, ...]], Optional[Tuple[RelativeNote, ...]]]:
+    left_hand_range: Optional[Tuple[int, int]],
+    right_hand_range: Optional[Tuple[int, int]],
+) -> Tuple[int, int]:
+    """Shifts (in whole octaves) placing notes of both hands in comfortable ranges
+    for the key. Hands are given by the (lowest, highest) relative pitch of their notes.
+    """
 
     min_left_hand_pitch = MIN_LEFT_HAND_PITCH - key.center
     max_left_hand_pitch = MAX_LEFT_HAND_PITCH - key.center
     min_right_hand_pitch = MIN_RIGHT_HAND_PITCH - key.center
     max_right_hand_pitch = MAX_RIGHT_HAND_PITCH - key.center
 
-    if left_hand_notes:
-        left_hand_notes = _fit_into_range(
-            left_hand_notes, min_left_hand_pitch, max_left_hand_pitch
+    left_hand_shift = 0
+    right_hand_shift = 0
+    if left_hand_range:
+        left_hand_shift = _fit_into_range(
+            left_hand_range, min_left_hand_pitch, max_left_hand_pitch
         )
-    if right_hand_notes:
-        right_hand_notes = _fit_into_range(
-            right_hand_notes, min_right_hand_pitch, max_right_hand_pitch
+    if right_hand_range:
+        right_hand_shift = _fit_into_range(
+            right_hand_range, min_right_hand_pitch, max_right_hand_pitch
         )
 
-    if right_hand_notes is None and left_hand_notes is not None:
-        highest_left_pitch = _highest(left_hand_notes)
+    if right_hand_range is None and left_hand_range is not None:
+        highest_left_pitch = left_hand_range[1] + left_hand_shift
         if highest_left_pitch <= max_left_hand_pitch - 12:
-            left_hand_notes = _shift_notes(
-                left_hand_notes,
-                (max_left_hand_pitch - highest_left_pitch) // 12 * 12,
-            )
-    elif left_hand_notes is None and right_hand_notes is not None:
-        lowest_right_pitch = _lowest(right_hand_notes)
+            left_hand_shift += (max_left_hand_pitch - highest_left_pitch) // 12 * 12
+    elif left_hand_range is None and right_hand_range is not None:
+        lowest_right_pitch = right_hand_range[0] + right_hand_shift
         if lowest_right_pitch >= min_right_hand_pitch + 12:
-            right_hand_notes = _shift_notes(
-                right_hand_notes,
-                (min_right_hand_pitch - lowest_right_pitch) // 12 * 12,
-            )
-    elif left_hand_notes is not None and right_hand_notes is not None:
-        lowest_right_pitch = _lowest(right_hand_notes)
-        highest_left_pitch = _highest(left_hand_notes)
+            right_hand_shift += (min_right_hand_pitch - lowest_right_pitch) // 12 * 12
+    elif left_hand_range is not None and right_hand_range is not None:
+        lowest_right_pitch = right_hand_range[0] + right_hand_shift
+        highest_left_pitch = left_hand_range[1] + left_hand_shift
         if lowest_right_pitch - highest_left_pitch > 12:
-            left_hand_notes = _shift_notes(
-                left_hand_notes,
-                (lowest_right_pitch - highest_left_pitch) // 12 * 12,
-            )
+            left_hand_shift += (lowest_right_pitch - highest_left_pitch) // 12 * 12
         elif highest_left_pitch - lowest_right_pitch > 12:
-            right_hand_notes = _shift_notes(
-                right_hand_notes,
-                (highest_left_pitch - lowest_right_pitch) // 12 * 12,
-            )
+            right_hand_shift += (highest_left_pitch - lowest_right_pitch) // 12 * 12
+    return left_hand_shift, right_hand_shift
+
+
+def shift_notes_if_needed(
+    key: Key,
+    left_hand_notes: Optional[NotesT],
+    right_hand_notes: Optional[NotesT],
+) -> Tuple[Optional[NotesT], Optional[NotesT]]:
+
+    left_hand_shift, right_hand_shift = get_octave_shifts(
+        key=key,
+        left_hand_range=(
+            None if left_hand_notes is None else get_pitch_range(left_hand_notes)
+        ),
+        right_hand_range=(
+            None if right_hand_notes is None else get_pitch_range(right_hand_notes)
+        ),
+    )
+    if left_hand_notes and left_hand_shift:
+        left_hand_notes = _shift_notes(left_hand_notes, left_hand_shift)
+    if right_hand_notes and right_hand_shift:
+        right_hand_notes = _shift_notes(right_hand_notes, right_hand_shift)
     return left_hand_notes, right_hand_notes
@@ -0,0 +1,193 @@
+""" Plans exercises of many users at once, e.g. every night for the next day.
+
+Users are split into chunks planned by a pool of worker processes. Catalogs and
+difficulty indexes are built before the pool starts, so forked workers share them
+with the main process instead of building their own. Plans with rendered scores
+are written by the main process, in bulk for each chunk.
+"""
+
+import itertools
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from logging import exception
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+from django.db import connections, transaction
+
+from exercise import config
+from exercise.generators.catalog import get_catalog
+from exercise.generators.exercise_factory import ExerciseFactory
+from exercise.generators.exercise_generator import get_difficulty_index
+from exercise.generators.registry import PIECE_GENERATORS, get_generator_id
+from exercise.models import ExercisePlanEntry
+from exercise.practice_log import PracticeLog
+
+
+class PlannedPractice(NamedTuple):
+    user_id: str
+    position: int
+    exercise_id: str
+    key: str
+    tempo: int
+    score: str
+
+
+class ChunkPlans(NamedTuple):
+    planned_practices: List[PlannedPractice]
+    # Users planned, without the users that failed
+    user_ids: List[str]
+
+
+class PlanningReport(NamedTuple):
+    num_users: int
+    num_practices: int
+    num_failed_users: int
+    seconds: float
+
+    @property
+    def users_per_second(self) -> float:
+        return self.num_users / self.seconds if self.seconds else 0.0
+
+
+def _warm_catalogs() -> None:
+    for piece_generator in PIECE_GENERATORS.values():
+        get_catalog(piece_generator)
+        get_difficulty_index(piece_generator)
+
+
+def _init_worker() -> None:
+    """Initializes a worker that doesn't inherit the main process, e.g. spawned."""
+
+    import django
+
+    django.setup()
+    _warm_catalogs()
+
+
+def _plan_user(user_id: str, plan_date: date) -> List[PlannedPractice]:
+    factory = ExerciseFactory(
+        user_id=user_id, practice_log=PracticeLog.get_for_user(user_id=user_id)
+    )
+    return [
+        PlannedPractice(
+            user_id=user_id,
+            position=position,
+            exercise_id=exercise_practice.exercise.exercise_id,
+            key=exercise_practice.key.name,
+            tempo=exercise_practice.tempo,
+            score=exercise_practice.score,
+        )
+        for position, exercise_practice in enumerate(
+            factory.generate_exercises(today=plan_date)
+        )
+    ]
+
+
+def _plan_chunk(user_ids: Sequence[str], plan_date: date) -> ChunkPlans:
+    """Plans of the users, users that fail are logged and left out."""
+
+    chunk_plans = ChunkPlans(planned_practices=[], user_ids=[])
+    for user_id in user_ids:
+        try:
+            planned_practices = _plan_user(user_id, plan_date)
+        except Exception:
+            exception(f"Planning exercises of user {user_id} failed")
+            continue
+        chunk_plans.planned_practices.extend(planned_practices)
+        chunk_plans.user_ids.append(user_id)
+    return chunk_plans
+
+
+def _chunks(user_ids: Sequence[str], chunk_size: int) -> Iterator[Sequence[str]]:
+    for start in range(0, len(user_ids), chunk_size):
+        yield user_ids[start : start + chunk_size]
+
+
+def _save_plans(
+    user_ids: Sequence[str],
+    plan_date: date,
+    planned_practices: Iterable[PlannedPractice],
+) -> None:
+    """Replaces plans of the users for the day."""
+
+    with transaction.atomic():
+        ExercisePlanEntry.objects.filter(
+            user_id__in=user_ids, plan_date=plan_date
+        ).delete()
+        ExercisePlanEntry.objects.bulk_create(
+            [
+                ExercisePlanEntry(
+                    user_id=planned_practice.user_id,
+                    plan_date=plan_date,
+                    position=planned_practice.position,
+                    generator_id=get_generator_id(planned_practice.exercise_id),
+                    exercise_id=planned_practice.exercise_id,
+                    key=planned_practice.key,
+                    tempo=planned_practice.tempo,
+                    score=planned_practice.score,
+                )
+                for planned_practice in planned_practices
+            ],
+            batch_size=config.PRACTICE_LOG_WRITE_BATCH_SIZE,
+        )
+
+
+def plan_users(
+    user_ids: Sequence[str],
+    plan_date: Optional[date] = None,
+    max_workers: Optional[int] = None,
+    chunk_size: int = config.PLANNER_CHUNK_SIZE,
+) -> PlanningReport:
+    """Plans exercises of the users for the day, tomorrow by default.
+
+    Plans of users that fail are left as they were, the failures are logged and
+    counted in the report.
+
+    Args:
+        max_workers: Worker processes, one per CPU by default. With 0 the users are
+            planned in the main process.
+    """
+
+    plan_date = plan_date or date.today() + timedelta(days=1)
+    user_ids = list(user_ids)
+    chunks = list(_chunks(user_ids, chunk_size))
+    start = time.perf_counter()
+    _warm_catalogs()
+    num_practices = 0
+    num_planned_users = 0
+
+    if max_workers == 0:
+        for chunk in chunks:
+            chunk_plans = _plan_chunk(chunk, plan_date)
+            _save_plans(chunk_plans.user_ids, plan_date, chunk_plans.planned_practices)
+            num_practices += len(chunk_plans.planned_practices)
+            num_planned_users += len(chunk_plans.user_ids)
+    else:
+        # Forked workers must open their own database connections
+        connections.close_all()
+        if "fork" in multiprocessing.get_all_start_methods():
+            mp_context = multiprocessing.get_context("fork")
+            initializer = None
+        else:
+            mp_context = multiprocessing.get_context()
+            initializer = _init_worker
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=mp_context, initializer=initializer
+        ) as executor:
+            for chunk_plans in executor.map(
+                _plan_chunk, chunks, itertools.repeat(plan_date)
+            ):
+                _save_plans(
+                    chunk_plans.user_ids, plan_date, chunk_plans.planned_practices
+                )
+                num_practices += len(chunk_plans.planned_practices)
+                num_planned_users += len(chunk_plans.user_ids)
+
+    return PlanningReport(
+        num_users=len(user_ids),
+        num_practices=num_practices,
+        num_failed_users=len(user_ids) - num_planned_users,
+        seconds=time.perf_counter() - start,
+    )
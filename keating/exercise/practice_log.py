@@ -1,10 +1,19 @@
 from datetime import date
 from enum import Enum
-from typing import List
+from typing import TYPE_CHECKING, Collection, Dict, List, Optional, Set
+
+from django.db import transaction
 
 from attrs import frozen
 
-from exercise.base import ExercisePractice
+from exercise import config
+from exercise.base import Exercise, ExercisePractice
+from exercise.music_representation.base import Key
+
+if TYPE_CHECKING:
+    from exercise.learning import LearningParameters
+    from exercise.learning_state import LearningState
+    from exercise.models import LearningStateEntry
 
 
 class PracticeResult(Enum):
@@ -22,39 +31,388 @@ class ExercisePracticeLog:
     result: PracticeResult
 
 
+def _get_generator_id(exercise_id: str) -> str:
+    # Imported when needed, so that in memory logs don't load all the generators
+    from exercise.generators.registry import get_generator_id
+
+    generator_id = get_generator_id(exercise_id)
+    if generator_id is None:
+        raise ValueError(f"Exercise {exercise_id} doesn't come from a known generator")
+    return generator_id
+
+
+def _get_exercises(
+    generator_to_exercise_ids: Dict[str, Set[str]]
+) -> Dict[str, Exercise]:
+    """Exercises by id, exercises removed from their generator are left out."""
+
+    from exercise.generators.catalog import get_catalog
+    from exercise.generators.registry import PIECE_GENERATORS
+
+    exercises: Dict[str, Exercise] = {}
+    for generator_id, exercise_ids in generator_to_exercise_ids.items():
+        exercises.update(
+            get_catalog(PIECE_GENERATORS[generator_id]).get_many(exercise_ids)
+        )
+    return exercises
+
+
 class PracticeLog:
-    """A log of user's practice sessions."""
+    """A log of user's practice sessions.
+
+    A log loaded for a user is stored in the database: new practices are written
+    when logged and queries read only the practices they ask for. Within a `with`
+    block the practices are written in batches instead, the rest of them when the
+    block exits:
+
+        with PracticeLog.get_for_user(user_id) as practice_log:
+            for exercise_practice, result in practices:
+                practice_log.log_practice(exercise_practice, result)
+
+    Logs created directly stay in memory until saved.
+    """
+
+    def __init__(
+        self,
+        user_id: str,
+        learning_parameters: Optional["LearningParameters"] = None,
+    ) -> None:
+        """
+        Args:
+            learning_parameters: Parameters of the learning state, the default ones
+                by default.
+        """
 
-    def __init__(self, user_id: str) -> None:
         self._user_id = user_id
+        self._learning_parameters = learning_parameters
+        # Practices not stored in the database (all of them if the log isn't stored)
         self._practice_logs: List[ExercisePracticeLog] = []
+        self._is_stored = False
+        self._is_batching = False
+        self._learning_state: Optional["LearningState"] = None
+
+    def __enter__(self) -> "PracticeLog":
+        self._is_batching = True
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._is_batching = False
+        # Logged practices were practiced, they are written even after an error
+        if self._is_stored and self._practice_logs:
+            self.save()
+
+    @property
+    def user_id(self) -> str:
+        return self._user_id
+
+    @property
+    def learning_state(self) -> "LearningState":
+        """Learning state of the user, including all logged practices."""
+
+        if self._learning_state is None:
+            self._learning_state = self._load_learning_state()
+        return self._learning_state
 
     @classmethod
     def get_for_user(cls, user_id: str) -> "PracticeLog":
         """Get the practice log for the user."""
         return cls(user_id=user_id).load()
 
-    # TODO
     def save(self) -> None:
-        """Save the practice log to the database."""
-        raise NotImplementedError
+        """Save the practice log and the learning state to the database.
+
+        Only the stored states of the exercises practiced since the last save are
+        read and written, while the user's stored state is locked, so that logs of
+        the same user saved concurrently don't lose each other's practices.
+        """
+
+        from exercise.learning_state import LearningState
+        from exercise.models import LearningStateEntry, PracticeLogEntry
+
+        self._is_stored = True
+        with transaction.atomic():
+            entry = (
+                LearningStateEntry.objects.select_for_update()
+                .filter(user_id=self._user_id)
+                .first()
+            )
+            if entry is None:
+                # Not stored yet, it is built from the whole log once
+                self._create_learning_state(
+                    LearningState.from_practice_logs(
+                        self.get_practice_logs(), parameters=self._parameters
+                    )
+                )
+            else:
+                self._update_learning_state(entry)
+            PracticeLogEntry.objects.bulk_create(
+                [
+                    PracticeLogEntry(
+                        user_id=self._user_id,
+                        generator_id=_get_generator_id(
+                            practice_log.exercise_practice.exercise.exercise_id
+                        ),
+                        exercise_id=practice_log.exercise_practice.exercise.exercise_id,
+                        key=practice_log.exercise_practice.key.name,
+                        tempo=practice_log.exercise_practice.tempo,
+                        practice_date=practice_log.practice_date,
+                        result=practice_log.result.value,
+                    )
+                    for practice_log in self._practice_logs
+                ],
+                batch_size=config.PRACTICE_LOG_WRITE_BATCH_SIZE,
+            )
+        self._practice_logs = []
 
-    # TODO
     def load(self) -> "PracticeLog":
-        """Load the practice log from the database."""
-        raise NotImplementedError
+        """Load the practice log from the database.
+
+        Practices are read by `get_practice_logs` when needed.
+        """
+        self._is_stored = True
+        return self
 
     def log_practice(
-        self, exercise_practice: ExercisePractice, result: PracticeResult
+        self,
+        exercise_practice: ExercisePractice,
+        result: PracticeResult,
+        practice_date: Optional[date] = None,
     ) -> None:
-        self._practice_logs.append(
+        """Log a practice, by default practiced today.
+
+        Stored logs write the practice right away, or in batches within a `with`
+        block.
+        """
+
+        practice_log = ExercisePracticeLog(
+            exercise_practice=exercise_practice,
+            practice_date=practice_date or date.today(),
+            result=result,
+        )
+        self._practice_logs.append(practice_log)
+        if self._learning_state is not None:
+            self._learning_state.log_practice(practice_log)
+        if self._is_stored and (
+            not self._is_batching
+            or len(self._practice_logs) >= config.PRACTICE_LOG_WRITE_BATCH_SIZE
+        ):
+            self.save()
+
+    def get_practice_logs(
+        self,
+        generator_id: Optional[str] = None,
+        exercise_ids: Optional[Collection[str]] = None,
+        since: Optional[date] = None,
+    ) -> List[ExercisePracticeLog]:
+        """Get exercise practice logs, oldest first.
+
+        Args:
+            generator_id: Only practices of exercises of the generator.
+            exercise_ids: Only practices of the exercises.
+            since: Only practices from the date on.
+        """
+
+        practice_logs = (
+            self._get_stored_practice_logs(
+                generator_id=generator_id, exercise_ids=exercise_ids, since=since
+            )
+            if self._is_stored
+            else []
+        )
+        practice_logs.extend(
+            practice_log
+            for practice_log in self._practice_logs
+            if (
+                generator_id is None
+                or practice_log.exercise_practice.exercise.exercise_id.startswith(
+                    f"{generator_id}_"
+                )
+            )
+            and (
+                exercise_ids is None
+                or practice_log.exercise_practice.exercise.exercise_id in exercise_ids
+            )
+            and (since is None or practice_log.practice_date >= since)
+        )
+        return practice_logs
+
+    def _get_stored_practice_logs(
+        self,
+        generator_id: Optional[str],
+        exercise_ids: Optional[Collection[str]],
+        since: Optional[date],
+    ) -> List[ExercisePracticeLog]:
+        from exercise.models import PracticeLogEntry
+
+        entries = PracticeLogEntry.objects.filter(user_id=self._user_id)
+        if generator_id is not None:
+            entries = entries.filter(generator_id=generator_id)
+        if exercise_ids is not None:
+            entries = entries.filter(exercise_id__in=exercise_ids)
+        if since is not None:
+            entries = entries.filter(practice_date__gte=since)
+        rows = list(
+            entries.order_by("practice_date", "id").values_list(
+                "generator_id", "exercise_id", "key", "tempo", "practice_date", "result"
+            )
+        )
+
+        generator_to_exercise_ids: Dict[str, Set[str]] = {}
+        for row_generator_id, exercise_id, *_ in rows:
+            generator_to_exercise_ids.setdefault(row_generator_id, set()).add(
+                exercise_id
+            )
+        exercises = _get_exercises(generator_to_exercise_ids)
+
+        return [
             ExercisePracticeLog(
-                exercise_practice=exercise_practice,
-                practice_date=date.today(),
-                result=result,
+                exercise_practice=ExercisePractice(
+                    exercise=exercises[exercise_id], key=Key[key], tempo=tempo
+                ),
+                practice_date=practice_date,
+                result=PracticeResult(result),
+            )
+            for _, exercise_id, key, tempo, practice_date, result in rows
+            # Exercises removed from their generator are not practiced anymore
+            if exercise_id in exercises
+        ]
+
+    @property
+    def _parameters(self) -> "LearningParameters":
+        from exercise.learning import DEFAULT_LEARNING_PARAMETERS
+
+        return self._learning_parameters or DEFAULT_LEARNING_PARAMETERS
+
+    def _load_learning_state(self) -> "LearningState":
+        """Learning state of the stored log and the practices not stored yet."""
+
+        from exercise.learning_state import LearningState
+
+        entry = None
+        if self._is_stored:
+            from exercise.models import LearningStateEntry
+
+            entry = LearningStateEntry.objects.filter(user_id=self._user_id).first()
+        if entry is None:
+            # Not stored yet, it is built from the whole log once
+            return LearningState.from_practice_logs(
+                self.get_practice_logs(), parameters=self._parameters
             )
+
+        from exercise.models import ExerciseStateEntry
+
+        exercise_states = list(
+            ExerciseStateEntry.objects.filter(user_id=self._user_id)
+            .order_by("order")
+            .values_list("exercise_id", "state")
+        )
+        generator_to_exercise_ids: Dict[str, Set[str]] = {}
+        for exercise_id, _ in exercise_states:
+            generator_to_exercise_ids.setdefault(
+                _get_generator_id(exercise_id), set()
+            ).add(exercise_id)
+        learning_state = LearningState.from_json(
+            {
+                "exercises": [state for _, state in exercise_states],
+                "key_to_practice_dates": entry.state["key_to_practice_dates"],
+            },
+            exercises=_get_exercises(generator_to_exercise_ids),
+            parameters=self._parameters,
+        )
+        for practice_log in self._practice_logs:
+            learning_state.log_practice(practice_log)
+        return learning_state
+
+    def _create_learning_state(self, learning_state: "LearningState") -> None:
+        from exercise.models import ExerciseStateEntry, LearningStateEntry
+
+        state = learning_state.to_json()
+        ExerciseStateEntry.objects.bulk_create(
+            [
+                ExerciseStateEntry(
+                    user_id=self._user_id,
+                    exercise_id=exercise_state["exercise_id"],
+                    order=order,
+                    state=exercise_state,
+                )
+                for order, exercise_state in enumerate(state["exercises"])
+            ],
+            batch_size=config.PRACTICE_LOG_WRITE_BATCH_SIZE,
+        )
+        LearningStateEntry.objects.create(
+            user_id=self._user_id,
+            state={
+                "key_to_practice_dates": state["key_to_practice_dates"],
+                "num_exercises": len(state["exercises"]),
+            },
+        )
+
+    def _update_learning_state(self, entry: "LearningStateEntry") -> None:
+        """Apply the practices not stored yet to the stored learning state, reading
+        and writing only the states of their exercises.
+
+        Args:
+            entry: The user's locked `LearningStateEntry`.
+        """
+
+        from exercise.learning_state import LearningState
+        from exercise.models import ExerciseStateEntry
+
+        exercises = {
+            practice_log.exercise_practice.exercise.exercise_id: (
+                practice_log.exercise_practice.exercise
+            )
+            for practice_log in self._practice_logs
+        }
+        stored_exercise_states = {
+            exercise_state.exercise_id: exercise_state
+            for exercise_state in ExerciseStateEntry.objects.filter(
+                user_id=self._user_id, exercise_id__in=exercises
+            ).order_by("order")
+        }
+        learning_state = LearningState.from_json(
+            {
+                "exercises": [
+                    exercise_state.state
+                    for exercise_state in stored_exercise_states.values()
+                ],
+                "key_to_practice_dates": entry.state["key_to_practice_dates"],
+            },
+            exercises=exercises,
+            parameters=self._parameters,
         )
+        for practice_log in self._practice_logs:
+            learning_state.log_practice(practice_log)
 
-    def get_practice_logs(self) -> List[ExercisePracticeLog]:
-        """Get exercise practice logs for the generator."""
-        return self._practice_logs
+        state = learning_state.to_json()
+        num_exercises = entry.state["num_exercises"]
+        new_exercise_states = []
+        for exercise_state in state["exercises"]:
+            stored_exercise_state = stored_exercise_states.get(
+                exercise_state["exercise_id"]
+            )
+            if stored_exercise_state is None:
+                new_exercise_states.append(
+                    ExerciseStateEntry(
+                        user_id=self._user_id,
+                        exercise_id=exercise_state["exercise_id"],
+                        order=num_exercises,
+                        state=exercise_state,
+                    )
+                )
+                num_exercises += 1
+            else:
+                stored_exercise_state.state = exercise_state
+        ExerciseStateEntry.objects.bulk_update(
+            stored_exercise_states.values(),
+            ["state"],
+            batch_size=config.PRACTICE_LOG_WRITE_BATCH_SIZE,
+        )
+        ExerciseStateEntry.objects.bulk_create(
+            new_exercise_states, batch_size=config.PRACTICE_LOG_WRITE_BATCH_SIZE
+        )
+        entry.state = {
+            "key_to_practice_dates": state["key_to_practice_dates"],
+            "num_exercises": num_exercises,
+        }
+        entry.save(update_fields=["state"])
@@ -0,0 +1,180 @@
+""" Lazy catalogs of elements combined from other sequences.
+
+Elements are built when accessed: `catalog[i]` finds the items combined into the
+i-th element (unranking) and `catalog.index(element)` finds its position from
+its items (ranking), without enumerating the elements before it.
+"""
+
+import bisect
+import itertools
+import math
+from abc import abstractmethod
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    overload,
+)
+
+T = TypeVar("T")
+
+
+def _index(sequence: Sequence, item: Any, item_to_index: Dict[Any, int]) -> int:
+    if isinstance(sequence, _Catalog):
+        return sequence.index(item)
+    if not item_to_index:
+        for idx, sequence_item in enumerate(sequence):
+            item_to_index.setdefault(sequence_item, idx)
+    try:
+        return item_to_index[item]
+    except KeyError:
+        raise ValueError(f"{item} is not in the catalog") from None
+
+
+class _Catalog(Sequence[T], Generic[T]):
+    """Sequence of elements built by `_get` when accessed."""
+
+    @overload
+    def __getitem__(self, idx: int) -> T:
+        ...
+
+    @overload
+    def __getitem__(self, idx: slice) -> Tuple[T, ...]:
+        ...
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union[T, Tuple[T, ...]]:
+        """Element at the position, or elements of a slice, built when accessed."""
+
+        if isinstance(idx, slice):
+            return tuple(
+                self._get(position) for position in range(*idx.indices(len(self)))
+            )
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(f"Catalog index {idx} out of range")
+        return self._get(idx)
+
+    def __contains__(self, element: Any) -> bool:
+        try:
+            self.index(element)
+        except ValueError:
+            return False
+        return True
+
+    @abstractmethod
+    def _get(self, position: int) -> T:
+        """Element at the position, which is within the catalog."""
+
+
+class ProductCatalog(_Catalog[T]):
+    """Elements combined from every combination of items of the factors, ordered
+    like nested loops over the factors, the last factor varying the fastest."""
+
+    def __init__(
+        self,
+        factors: Sequence[Sequence],
+        combine: Callable[..., T],
+        decompose: Callable[[T], Tuple],
+    ) -> None:
+        """
+        Args:
+            factors: Sequences of items, catalogs themselves or any sequence.
+            combine: Builds an element from one item of each factor.
+            decompose: Items of the factors an element was combined from.
+        """
+
+        self._factors = tuple(factors)
+        self._combine = combine
+        self._decompose = decompose
+        self._len = math.prod(len(factor) for factor in self._factors)
+        # Item positions in factors that aren't catalogs, built on the first ranking
+        self._item_to_index: Tuple[Dict[Any, int], ...] = tuple(
+            {} for _ in self._factors
+        )
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[T]:
+        for items in itertools.product(*self._factors):
+            yield self._combine(*items)
+
+    def index(self, element: Any, start: int = 0, stop: Optional[int] = None) -> int:
+        position = 0
+        for factor, item, item_to_index in zip(
+            self._factors, self._decompose(element), self._item_to_index
+        ):
+            position = position * len(factor) + _index(factor, item, item_to_index)
+        if not start <= position < (self._len if stop is None else stop):
+            raise ValueError(f"{element} is not in the catalog range")
+        return position
+
+    def _get(self, position: int) -> T:
+        items: List[Any] = []
+        for factor in reversed(self._factors):
+            position, factor_position = divmod(position, len(factor))
+            items.append(factor[factor_position])
+        return self._combine(*reversed(items))
+
+
+class ChainedCatalog(_Catalog[T]):
+    """Elements of catalogs one after another, e.g. products of an item with
+    sequences depending on the item."""
+
+    def __init__(
+        self, catalogs: Sequence[Sequence[T]], locate: Callable[[T], int]
+    ) -> None:
+        """
+        Args:
+            catalogs: Catalogs of the elements.
+            locate: Position of the catalog an element comes from, raises
+                `LookupError` for elements of none.
+        """
+
+        self._catalogs = tuple(catalogs)
+        self._locate = locate
+        # Positions of the first elements of the catalogs, and the length of all
+        self._offsets = list(
+            itertools.accumulate(
+                (len(catalog) for catalog in self._catalogs), initial=0
+            )
+        )
+        self._item_to_index: Tuple[Dict[Any, int], ...] = tuple(
+            {} for _ in self._catalogs
+        )
+
+    def __len__(self) -> int:
+        return self._offsets[-1]
+
+    def __iter__(self) -> Iterator[T]:
+        for catalog in self._catalogs:
+            yield from catalog
+
+    def index(self, element: Any, start: int = 0, stop: Optional[int] = None) -> int:
+        try:
+            catalog_position = self._locate(element)
+        except LookupError:
+            raise ValueError(f"{element} is not in the catalog") from None
+        position = self._offsets[catalog_position] + _index(
+            self._catalogs[catalog_position],
+            element,
+            self._item_to_index[catalog_position],
+        )
+        if not start <= position < (len(self) if stop is None else stop):
+            raise ValueError(f"{element} is not in the catalog range")
+        return position
+
+    def _get(self, position: int) -> T:
+        catalog_position = bisect.bisect_right(self._offsets, position) - 1
+        return self._catalogs[catalog_position][
+            position - self._offsets[catalog_position]
+        ]
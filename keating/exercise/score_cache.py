@@ -0,0 +1,268 @@
+""" Cache of rendered scores."""
+
+import hashlib
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from exercise import config
+
+
+# Seconds blobs are kept after they were last written, even if no ref refers to them.
+BLOB_GRACE_PERIOD = 60
+
+_TEMPORARY_SUFFIX = ".tmp"
+
+
+def _write_atomically(path: Path, data: bytes) -> None:
+    """Readers in other processes see either no file or all of it."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent, suffix=_TEMPORARY_SUFFIX, delete=False
+    ) as file:
+        file.write(data)
+    os.replace(file.name, path)
+
+
+class BlobCache(BaseCache):
+    """Django cache of texts in a local directory, e.g. rendered scores.
+
+    Texts are stored zlib compressed as blobs named by the digest of their
+    content, keys only refer to the digest (refs). Texts shared by many keys, like
+    scores of pieces with the same hand parts, are stored once.
+
+    Like the file based cache, refs expire after their timeout and a random
+    fraction of them is culled when a set finds `MAX_ENTRIES` of them. The cull
+    also removes blobs no ref refers to, except recently written ones, which a ref
+    being set in another process may be about to refer to.
+    """
+
+    def __init__(self, location: str, params: Dict) -> None:
+        super().__init__(params)
+        self._path = Path(location)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None) -> bool:
+        if self.has_key(key, version=version):
+            return False
+        self.set(key, value, timeout=timeout, version=version)
+        return True
+
+    def get(self, key, default=None, version=None) -> Any:
+        digest = self._read_ref(self._ref_path(key, version=version))
+        if digest is None:
+            return default
+        try:
+            return zlib.decompress(self._blob_path(digest).read_bytes()).decode()
+        except FileNotFoundError:
+            return default
+
+    def set(self, key, value: str, timeout=DEFAULT_TIMEOUT, version=None) -> None:
+        ref_path = self._ref_path(key, version=version)
+        if not ref_path.exists():
+            self._cull()
+        data = value.encode()
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(digest)
+        try:
+            # Recently written blobs are kept by culls of other processes
+            os.utime(blob_path)
+        except FileNotFoundError:
+            _write_atomically(blob_path, zlib.compress(data))
+        self._write_ref(ref_path, digest=digest, timeout=timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None) -> bool:
+        ref_path = self._ref_path(key, version=version)
+        digest = self._read_ref(ref_path)
+        if digest is None:
+            return False
+        self._write_ref(ref_path, digest=digest, timeout=timeout)
+        return True
+
+    def delete(self, key, version=None) -> bool:
+        try:
+            self._ref_path(key, version=version).unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+    def has_key(self, key, version=None) -> bool:
+        return self._read_ref(self._ref_path(key, version=version)) is not None
+
+    def clear(self) -> None:
+        shutil.rmtree(self._path, ignore_errors=True)
+
+    def num_entries(self) -> int:
+        return len(self._ref_paths())
+
+    def num_blobs(self) -> int:
+        return sum(1 for path in self._blob_paths() if path.suffix != _TEMPORARY_SUFFIX)
+
+    def collect_garbage(self) -> None:
+        """Remove expired refs and blobs no ref refers to."""
+
+        start = time.time()
+        digests = set()
+        for ref_path in self._ref_paths():
+            digest = self._read_ref(ref_path)
+            if digest is not None:
+                digests.add(digest)
+        for blob_path in self._blob_paths():
+            try:
+                if (
+                    blob_path.name not in digests
+                    and blob_path.stat().st_mtime < start - BLOB_GRACE_PERIOD
+                ):
+                    blob_path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _cull(self) -> None:
+        ref_paths = self._ref_paths()
+        if len(ref_paths) < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            self.clear()
+            return
+        for ref_path in random.sample(
+            ref_paths, len(ref_paths) // self._cull_frequency
+        ):
+            ref_path.unlink(missing_ok=True)
+        self.collect_garbage()
+
+    def _read_ref(self, ref_path: Path) -> Optional[str]:
+        """Digest of the blob the ref refers to, None for missing or expired refs."""
+
+        try:
+            expiry, digest = ref_path.read_text().split()
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # Written by an older version
+            expiry, digest = "0", ""
+        if expiry != "never" and float(expiry) < time.time():
+            ref_path.unlink(missing_ok=True)
+            return None
+        return digest
+
+    def _write_ref(self, ref_path: Path, digest: str, timeout) -> None:
+        expiry = self.get_backend_timeout(timeout)
+        _write_atomically(
+            ref_path,
+            f"{'never' if expiry is None else repr(expiry)} {digest}".encode(),
+        )
+
+    def _ref_paths(self) -> List[Path]:
+        return [
+            path
+            for path in (self._path / "refs").glob("*")
+            if path.suffix != _TEMPORARY_SUFFIX
+        ]
+
+    def _blob_paths(self) -> List[Path]:
+        """Blobs and temporary files of blobs being written, e.g. left by crashes."""
+
+        return list((self._path / "blobs").glob("*/*"))
+
+    def _ref_path(self, key, version=None) -> Path:
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._path / "refs" / hashlib.sha1(key.encode()).hexdigest()
+
+    def _blob_path(self, digest: str) -> Path:
+        return self._path / "blobs" / digest[:2] / digest
+
+
+class ScoreCache:
+    """Bounded in-process LRU of rendered scores.
+
+    Misses of the in-process cache fall back to an optional shared backend
+    (any Django cache), so scores rendered by other processes are reused too.
+    """
+
+    def __init__(
+        self,
+        max_size: int = config.SCORE_CACHE_SIZE,
+        backend: Optional[BaseCache] = None,
+    ) -> None:
+        self._max_size = max_size
+        self._backend = backend
+        self._scores: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    @staticmethod
+    def make_key(*parts: object) -> str:
+        """Short key for the parts defining a score, valid for any cache backend."""
+
+        return "score:" + hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    def get_or_render(self, key: str, render: Callable[[], str]) -> str:
+        with self._lock:
+            score = self._scores.get(key)
+            if score is not None:
+                self._scores.move_to_end(key)
+                self.hits += 1
+                return score
+
+        score = self._backend.get(key) if self._backend is not None else None
+        if score is not None:
+            self.backend_hits += 1
+        else:
+            self.misses += 1
+            score = render()
+            if self._backend is not None:
+                self._backend.set(key, score)
+
+        with self._lock:
+            self._scores[key] = score
+            if len(self._scores) > self._max_size:
+                self._scores.popitem(last=False)
+        return score
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scores.clear()
+            self.hits = self.backend_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._scores),
+            "hits": self.hits,
+            "backend_hits": self.backend_hits,
+            "misses": self.misses,
+        }
+
+
+_SCORE_CACHE: Optional[ScoreCache] = None
+
+
+def _get_backend() -> Optional[BaseCache]:
+    """Shared backend configured in Django settings, if running within Django."""
+
+    if not settings.configured or config.SCORE_CACHE_ALIAS not in settings.CACHES:
+        return None
+    return caches[config.SCORE_CACHE_ALIAS]
+
+
+def get_score_cache() -> ScoreCache:
+    global _SCORE_CACHE
+    if _SCORE_CACHE is None:
+        _SCORE_CACHE = ScoreCache(backend=_get_backend())
+    return _SCORE_CACHE
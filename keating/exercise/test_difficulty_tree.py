@@ -0,0 +1,71 @@
+import numpy as np
+
+from exercise.base import Exercise
+from exercise.difficulty_index import DifficultyIndex
+from exercise.difficulty_tree import DifficultyTree
+from exercise.generators.rhythms import RhythmsPieceGenerator
+
+
+def test_queries_match_brute_force():
+    rng = np.random.default_rng(0)
+    # Clustered points with duplicates, like difficulty points of a catalog
+    points = np.round(rng.normal(size=(2000, 6)) * rng.random(6), 1)
+    tree = DifficultyTree(points, leaf_size=8)
+    mask = rng.random(len(points)) < 0.5
+    for point in rng.normal(size=(50, 6)):
+        distances = np.sqrt(np.square(points - point).sum(axis=1))
+
+        for k in (1, 10, 3000):
+            rows, nearest_distances = tree.nearest(point=point, k=k)
+            assert np.allclose(nearest_distances, np.sort(distances)[:k])
+            assert np.allclose(distances[rows], nearest_distances)
+        rows, nearest_distances = tree.nearest(point=point, k=5, mask=mask)
+        assert mask[rows].all()
+        assert np.allclose(nearest_distances, np.sort(distances[mask])[:5])
+
+        radius = np.median(distances)
+        rows, within_distances = tree.within(point=point, radius=radius, mask=mask)
+        assert sorted(rows) == list(np.flatnonzero(mask & (distances <= radius)))
+        assert list(within_distances) == sorted(within_distances)
+
+    empty_tree = DifficultyTree(np.empty((0, 6)))
+    assert len(empty_tree.nearest(point=np.zeros(6), k=3)[0]) == 0
+    assert len(empty_tree.within(point=np.zeros(6), radius=1.0)[0]) == 0
+
+
+def test_difficulty_index_variations():
+    exercises = [
+        Exercise(exercise_id=piece.piece_id, piece=piece)
+        for piece in RhythmsPieceGenerator().pieces()
+    ]
+    difficulty_index = DifficultyIndex.from_exercises(exercises)
+    exercise = exercises[len(exercises) // 2]
+
+    def _distance(other: Exercise) -> float:
+        return float(
+            np.linalg.norm(
+                np.subtract(other.difficulty.point, exercise.difficulty.point)
+            )
+        )
+
+    nearest = difficulty_index.nearest(exercise=exercise, k=5)
+    assert len(nearest) == 5 and exercise not in nearest
+    assert [_distance(other) for other in nearest] == sorted(
+        _distance(other) for other in exercises if other is not exercise
+    )[:5]
+
+    harder = difficulty_index.nearest(exercise=exercise, k=5, harder=True)
+    assert all(other.difficulty.level > exercise.difficulty.level for other in harder)
+    easier = difficulty_index.within(exercise=exercise, radius=1.0, harder=False)
+    assert all(
+        other.difficulty.level < exercise.difficulty.level and _distance(other) <= 1.0
+        for other in easier
+    )
+
+    # Levels are compared as `Difficulty` computes them
+    all_harder = difficulty_index.within(exercise=exercise, radius=np.inf, harder=True)
+    assert {other.exercise_id for other in all_harder} == {
+        other.exercise_id
+        for other in exercises
+        if other.difficulty.level > exercise.difficulty.level
+    }
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Modules imported by `manage.py` commands, tests and workers.
+MODULES = ("exercise.generators.registry", "exercise.views", "keating.views")
+
+# Import time budget of a single module of the project, in microseconds. Modules
+# enumerating musical elements at import took hundreds of milliseconds.
+MODULE_IMPORT_BUDGET_US = 100_000
+
+PROJECT_PACKAGES = ("exercise", "keating")
+
+
+def _run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=Path(__file__).resolve().parent.parent,
+        env={**os.environ, "DJANGO_SETTINGS_MODULE": "keating.settings"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def _import_times(module: str) -> dict:
+    """Self import time of every module imported with `module`, see `-X importtime`."""
+
+    stderr = _run_python("-X", "importtime", "-c", f"import {module}").stderr
+    import_times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _, name = line[len("import time:") :].split("|")
+        import_times[name.strip()] = int(self_time)
+    return import_times
+
+
+def test_import_time_budget():
+    for module in MODULES:
+        slow_modules = {
+            name: import_time
+            for name, import_time in _import_times(module).items()
+            if name.split(".")[0] in PROJECT_PACKAGES
+            and import_time > MODULE_IMPORT_BUDGET_US
+        }
+        assert not slow_modules, f"Slow imports with {module}: {slow_modules}"
+
+
+def test_imports_dont_build_catalogs():
+    code = (
+        "import exercise.generators.registry, keating.views\n"
+        "from exercise.musical_elements.melody import get_melodies\n"
+        "from exercise.musical_elements.rhythm import get_rhythms\n"
+        "assert get_rhythms.cache_info().currsize == 0\n"
+        "assert get_melodies.cache_info().currsize == 0\n"
+    )
+    _run_python("-c", code)
@@ -0,0 +1,63 @@
+import random
+from typing import List
+
+from exercise.base import Exercise
+from exercise.difficulty_index import DifficultyIndex
+from exercise.generators.pitch_progressions import PitchProgressionsPieceGenerator
+from exercise.generators.rhythms import RhythmsPieceGenerator
+from exercise.music_representation.element_ids import count_elements, get_element_keys
+from exercise.learning import (
+    get_new_exercise_pool,
+    get_new_exercise_pool_indexed,
+)
+
+
+def _exercises(piece_generator) -> List[Exercise]:
+    return [
+        Exercise(exercise_id=piece.piece_id, piece=piece)
+        for piece in piece_generator.pieces()
+    ]
+
+
+def test_get_new_exercise_pool_indexed():
+    """The indexed selection builds the same pool as the sequential one."""
+
+    rng = random.Random(0)
+    for piece_generator in (RhythmsPieceGenerator(), PitchProgressionsPieceGenerator()):
+        exercises = _exercises(piece_generator)
+        difficulty_index = DifficultyIndex.from_exercises(exercises)
+        familiar_sets = [set(exercises[:num]) for num in range(0, len(exercises), 7)]
+        familiar_sets += [
+            set(rng.sample(exercises, rng.randrange(len(exercises)))) for _ in range(20)
+        ]
+        for familiar_exercises in familiar_sets:
+            assert get_new_exercise_pool_indexed(
+                difficulty_index=difficulty_index,
+                familiar_exercises=familiar_exercises,
+            ) == get_new_exercise_pool(
+                exercises=iter(exercises), familiar_exercises=familiar_exercises
+            )
+
+
+def test_musical_element_ids():
+    """Bitsets of musical elements count new elements like sets of the elements."""
+
+    rng = random.Random(0)
+    for piece_generator in (RhythmsPieceGenerator(), PitchProgressionsPieceGenerator()):
+        exercises = _exercises(piece_generator)
+        for exercise in exercises:
+            assert set(get_element_keys(exercise.musical_element_ids)) == {
+                element.key for element in exercise.musical_elements
+            }
+        for _ in range(20):
+            familiar_exercises = rng.sample(exercises, rng.randrange(len(exercises)))
+            familiar_elements = set().union(
+                *(exercise.musical_elements for exercise in familiar_exercises)
+            )
+            familiar_element_ids = 0
+            for exercise in familiar_exercises:
+                familiar_element_ids |= exercise.musical_element_ids
+            for exercise in exercises:
+                assert count_elements(
+                    exercise.musical_element_ids & ~familiar_element_ids
+                ) == len(set(exercise.musical_elements) - familiar_elements)
@@ -0,0 +1,105 @@
+import random
+from datetime import date, timedelta
+from typing import List
+
+from exercise.base import Exercise, ExercisePractice
+from exercise.familiarity import Familiarity, Level
+from exercise.generators.catalog import get_exercise_id
+from exercise.generators.pitch_progressions import PitchProgressionsPieceGenerator
+from exercise.generators.rhythms import RhythmsPieceGenerator
+from exercise.learning import (
+    get_exercise_to_improve,
+    get_key_practice_order,
+    is_ready_for_new_exercise,
+)
+from exercise.learning_state import LearningState
+from exercise.music_representation.base import Key
+from exercise.practice_log import ExercisePracticeLog, PracticeResult
+from exercise.utils import group_by
+
+
+def _exercises(piece_generator, num_exercises: int) -> List[Exercise]:
+    return [
+        Exercise(
+            exercise_id=get_exercise_id(piece_generator.generator_id, piece),
+            piece=piece,
+        )
+        for piece, _ in zip(piece_generator.pieces(), range(num_exercises))
+    ]
+
+
+def test_learning_state_matches_practice_logs():
+    """The incremental state agrees with the state recomputed from the logs."""
+
+    rng = random.Random(0)
+    generators = (RhythmsPieceGenerator(), PitchProgressionsPieceGenerator())
+    generator_exercises = {
+        piece_generator.generator_id: _exercises(piece_generator, num_exercises=6)
+        for piece_generator in generators
+    }
+    learning_state = LearningState()
+    practice_logs: List[ExercisePracticeLog] = []
+    today = date(2024, 3, 1)
+    for _ in range(300):
+        practice_log = ExercisePracticeLog(
+            exercise_practice=ExercisePractice(
+                exercise=rng.choice(rng.choice(list(generator_exercises.values()))),
+                key=rng.choice(list(Key)),
+                tempo=rng.randrange(50, 80, 5),
+            ),
+            practice_date=today - timedelta(days=rng.randrange(40)),
+            result=rng.choice(list(PracticeResult)),
+        )
+        practice_logs.append(practice_log)
+        learning_state.log_practice(practice_log)
+
+        assert learning_state.key_practice_order(today=today) == get_key_practice_order(
+            practice_logs, today=today
+        )
+        for generator_id, exercises in generator_exercises.items():
+            generator_logs = [
+                log
+                for log in practice_logs
+                if log.exercise_practice.exercise in exercises
+            ]
+            exercise_to_familiarity = {
+                exercise: Familiarity.from_practice_logs(practice_logs=logs)
+                for exercise, logs in group_by(
+                    generator_logs, key=lambda log: log.exercise_practice.exercise
+                ).items()
+            }
+            assert learning_state.is_ready_for_new_exercise(
+                generator_id
+            ) == is_ready_for_new_exercise(generator_logs)
+            assert learning_state.familiar_exercises(generator_id) == {
+                exercise
+                for exercise, familiarity in exercise_to_familiarity.items()
+                if familiarity.level.value >= Level.ADVANCED.value
+            }
+            familiarity = learning_state.familiarity_to_improve(generator_id)
+            if familiarity is None:
+                assert all(
+                    familiarity.level == Level.EXPERT
+                    for familiarity in exercise_to_familiarity.values()
+                )
+            else:
+                assert familiarity == exercise_to_familiarity[familiarity.exercise]
+                assert (
+                    get_exercise_to_improve(
+                        exercise_to_familiarity=exercise_to_familiarity,
+                        key_practice_order=tuple(Key),
+                    ).exercise
+                    == familiarity.exercise
+                )
+
+    exercises = {
+        exercise.exercise_id: exercise
+        for exercises in generator_exercises.values()
+        for exercise in exercises
+    }
+    restored = LearningState.from_json(learning_state.to_json(), exercises=exercises)
+    assert restored.to_json() == learning_state.to_json()
+    for generator_id in generator_exercises:
+        assert restored.familiarity_to_improve(
+            generator_id
+        ) == learning_state.familiarity_to_improve(generator_id)
@@ -0,0 +1,92 @@
+import hashlib
+from itertools import islice
+
+from exercise.generators.registry import PIECE_GENERATORS
+from exercise.music_representation.base import Key
+from exercise.notation_abcjs import add_header, create_score, render_piece_body
+
+
+# Scores of pieces (by generator and position) in a key at tempo 60, as rendered
+# by the original string building `create_score`.
+EXPECTED_SCORES = {
+    ("hand_coordination", 0, Key.C): (
+        "M:4/4\nK:C\nQ:60\nL:1/16\nV:1 clef=treble\nC8C1C2C4C1|\n"
+        "V:2 clef=bass\nC8C1C2C4C1|"
+    ),
+    ("hand_coordination", 20, Key.Gb): (
+        "M:4/4\nK:Gb\nQ:60\nL:1/16\nV:1 clef=treble\nG8G1G2G4G1|\n"
+        "V:2 clef=bass\nG1G4G2G1G8|"
+    ),
+    ("hand_coordination", 31, Key.B): (
+        "M:4/4\nK:B\nQ:60\nL:1/16\nV:1 clef=treble\n"
+        "B,1B,2B,4B,1B,8|B,1B,2B,4B,1B,8|B,1B,2B,4B,1B,8|B,1B,2B,4B,1B,8|\n"
+        "V:2 clef=bass\nB,,4C,1C,8D,1D,2|E,4E,1F,8F,1G,2|G,4A,1F,8G,1E,2|F,4D,1E,8C,1D,2|"
+    ),
+    ("melodies", 2500, Key.Eb): (
+        "M:4/4\nK:Eb\nQ:60\nL:1/16\nV:1 clef=treble\nE4B2G2D'4E4|B4G2D'2z8|"
+    ),
+}
+
+
+def test_piece_scores_match_expected_scores():
+    """Pieces laid out once and spelled per key give the scores rendered from
+    their notes in the key."""
+
+    for (generator_id, position, key), expected_score in EXPECTED_SCORES.items():
+        piece = next(islice(PIECE_GENERATORS[generator_id].pieces(), position, None))
+        score = add_header(
+            body=render_piece_body(piece=piece, key=key),
+            key=key,
+            tempo=60,
+            meter=piece.meter,
+        )
+        assert score == expected_score
+
+
+# Number of scores and digest of all scores of each generator in every key, at tempo
+# 60, as rendered by the original string building `create_score`.
+GOLDEN_SCORE_DIGESTS = {
+    "hand_coordination": (
+        384,
+        "3e8c20ff0147f0dae87c4dc626165069956f93bd48ca71ade4d220290264f280",
+    ),
+    "rhythms": (
+        1176,
+        "5703997b0d14b6004a50a6c110a9a389018df7704b7c327fca765b54bad90322",
+    ),
+    "pitch_progressions": (
+        648,
+        "20f826a7f8d7dd7e494a4145a3d3179d09e11ef783222bad50a85651451126fa",
+    ),
+    "melodies": (
+        63504,
+        "0a0cd247a655534fb1795fcd6591da96cc9e944e96ef1551e2f62c615c1ca867",
+    ),
+}
+
+
+def test_scores_of_the_catalog_match_golden_digests():
+    for generator_id, piece_generator in PIECE_GENERATORS.items():
+        scores = []
+        for piece in piece_generator.pieces():
+            for key in Key:
+                left_hand_notes, right_hand_notes = piece.get_notes(key=key)
+                scores.append(
+                    (
+                        piece.piece_id,
+                        key.name,
+                        create_score(
+                            key=key,
+                            tempo=60,
+                            meter=piece.meter,
+                            left_hand_notes=left_hand_notes,
+                            right_hand_notes=right_hand_notes,
+                        ),
+                    )
+                )
+        digest = hashlib.sha256()
+        for score in sorted(scores):
+            digest.update("\n".join(score).encode())
+            digest.update(b"\0")
+
+        assert (len(scores), digest.hexdigest()) == GOLDEN_SCORE_DIGESTS[generator_id]
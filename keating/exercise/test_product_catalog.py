@@ -0,0 +1,47 @@
+import pytest
+
+from exercise.product_catalog import ChainedCatalog, ProductCatalog
+
+
+def _product():
+    return ProductCatalog(
+        factors=("ab", (1, 2, 3)),
+        combine=lambda letter, number: f"{letter}{number}",
+        decompose=lambda element: (element[0], int(element[1:])),
+    )
+
+
+def test_product_catalog_is_ordered_like_nested_loops():
+    catalog = _product()
+
+    assert list(catalog) == ["a1", "a2", "a3", "b1", "b2", "b3"]
+    assert len(catalog) == 6
+    assert [catalog[idx] for idx in range(len(catalog))] == list(catalog)
+    assert [catalog.index(element) for element in catalog] == list(range(6))
+    assert catalog[-1] == "b3"
+    assert catalog[1:5:2] == ("a2", "b1")
+    assert "c1" not in catalog
+    with pytest.raises(IndexError):
+        catalog[6]
+    with pytest.raises(ValueError):
+        catalog.index("a4")
+
+
+def test_chained_catalog_ranks_and_unranks_across_catalogs():
+    nested = ProductCatalog(
+        factors=(_product(), "xy"),
+        combine=lambda element, letter: f"{element}{letter}",
+        decompose=lambda element: (element[:2], element[2]),
+    )
+    catalog = ChainedCatalog(
+        catalogs=(_product(), nested),
+        locate=lambda element: {2: 0, 3: 1}[len(element)],
+    )
+
+    elements = list(catalog)
+    assert len(catalog) == len(elements) == 18
+    assert elements[6:8] == ["a1x", "a1y"]
+    assert [catalog[idx] for idx in range(len(catalog))] == elements
+    assert [catalog.index(element) for element in elements] == list(range(18))
+    assert catalog[4:9] == tuple(elements[4:9])
+    assert "a1xy" not in catalog
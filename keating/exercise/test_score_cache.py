@@ -0,0 +1,107 @@
+from django.core.cache.backends.locmem import LocMemCache
+
+from exercise.base import Exercise, ExercisePractice
+from exercise.generators.hand_coordination import HandCoordinationPieceGenerator
+from exercise.music_representation.base import Key
+from exercise.notation_abcjs import create_score
+from exercise import score_cache as score_cache_module
+from exercise.score_cache import BlobCache, ScoreCache
+
+
+def test_score_cache():
+    """Scores are rendered once, evicted least recently used first and shared
+    through the backend."""
+
+    backend = LocMemCache("scores", {})
+    score_cache = ScoreCache(max_size=2, backend=backend)
+    renders = []
+
+    def _render(score: str):
+        return lambda: renders.append(score) or score
+
+    keys = [ScoreCache.make_key("piece", key) for key in ("C", "D", "E")]
+    assert score_cache.get_or_render(keys[0], _render("C")) == "C"
+    assert score_cache.get_or_render(keys[0], _render("C")) == "C"
+    assert score_cache.get_or_render(keys[1], _render("D")) == "D"
+    assert score_cache.get_or_render(keys[2], _render("E")) == "E"
+    assert len(score_cache) == 2
+    assert renders == ["C", "D", "E"]
+    assert score_cache.stats() == {
+        "size": 2,
+        "hits": 1,
+        "backend_hits": 0,
+        "misses": 3,
+    }
+
+    # Evicted in process, but still in the shared backend
+    assert score_cache.get_or_render(keys[0], _render("C")) == "C"
+    assert renders == ["C", "D", "E"]
+    assert score_cache.backend_hits == 1
+
+    other_process_cache = ScoreCache(backend=backend)
+    assert other_process_cache.get_or_render(keys[1], _render("D")) == "D"
+    assert renders == ["C", "D", "E"]
+
+
+def test_blob_cache_stores_shared_texts_once(tmp_path):
+    blob_cache = BlobCache(tmp_path, {})
+
+    blob_cache.set("first", "V:1 clef=treble\nC4|")
+    blob_cache.set("second", "V:1 clef=treble\nC4|")
+    blob_cache.set("third", "V:2 clef=bass\nC,4|")
+    assert blob_cache.get("first") == blob_cache.get("second") == "V:1 clef=treble\nC4|"
+    assert blob_cache.get("missing", default="") == ""
+    assert blob_cache.num_blobs() == 2
+    assert not blob_cache.add("third", "")
+    assert blob_cache.delete("third")
+    assert blob_cache.get("third") is None
+
+    # Shared with other processes through the directory
+    assert BlobCache(tmp_path, {}).get("first") == "V:1 clef=treble\nC4|"
+
+
+def test_blob_cache_expires_culls_and_collects_entries(tmp_path, monkeypatch):
+    # Blobs are collected as soon as no ref refers to them
+    monkeypatch.setattr(score_cache_module, "BLOB_GRACE_PERIOD", -1)
+    blob_cache = BlobCache(
+        tmp_path, {"TIMEOUT": None, "OPTIONS": {"MAX_ENTRIES": 4, "CULL_FREQUENCY": 2}}
+    )
+
+    blob_cache.set("expired", "text", timeout=0)
+    assert blob_cache.get("expired") is None
+    blob_cache.set("touched", "text")
+    assert blob_cache.touch("touched", timeout=0)
+    assert not blob_cache.has_key("touched")
+
+    for idx in range(4):
+        blob_cache.set(f"key_{idx}", f"text {idx}")
+    assert blob_cache.num_entries() == 4
+    blob_cache.set("key_4", "text 4")
+    assert blob_cache.num_entries() == 3
+    assert blob_cache.get("key_4") == "text 4"
+    assert blob_cache.num_blobs() == 3
+
+    blob_cache.delete("key_4")
+    blob_cache.collect_garbage()
+    assert blob_cache.num_blobs() == 2
+
+
+def test_score_bodies_are_rendered_once_for_all_tempos(monkeypatch):
+    score_cache = ScoreCache()
+    monkeypatch.setattr("exercise.base.get_score_cache", lambda: score_cache)
+    piece = next(HandCoordinationPieceGenerator().pieces())
+    exercise = Exercise(exercise_id="exercise", piece=piece)
+
+    for tempo in (60, 65, 70):
+        left_hand_notes, right_hand_notes = piece.get_notes(key=Key.Eb)
+        assert ExercisePractice(
+            exercise=exercise, key=Key.Eb, tempo=tempo
+        ).score == create_score(
+            key=Key.Eb,
+            tempo=tempo,
+            meter=piece.meter,
+            left_hand_notes=left_hand_notes,
+            right_hand_notes=right_hand_notes,
+        )
+    assert score_cache.misses == 1
+    assert score_cache.hits == 2
@@ -1,3 +1,293 @@
+from datetime import date, timedelta
+from unittest import mock
+
 from django.test import TestCase
 
-# Create your tests here.
+from exercise import config
+from exercise.base import ExercisePractice
+from exercise.familiarity import Familiarity
+from exercise.generators.catalog import get_catalog
+from exercise.generators.registry import PIECE_GENERATORS
+from exercise.learning_state import LearningState
+from exercise.models import ExercisePlanEntry, PracticeLogEntry
+from exercise.music_representation.base import Key
+from exercise.planner import plan_users
+from exercise.practice_log import ExercisePracticeLog, PracticeLog, PracticeResult
+
+
+def _exercise_practice(generator_id: str, position: int = 0) -> ExercisePractice:
+    return ExercisePractice(
+        exercise=get_catalog(PIECE_GENERATORS[generator_id]).get_by_position(position),
+        key=Key.D,
+        tempo=60,
+    )
+
+
+def _practice_ids(practice_logs):
+    return [
+        practice_log.exercise_practice.exercise.exercise_id
+        for practice_log in practice_logs
+    ]
+
+
+class PracticeLogTest(TestCase):
+    def test_saved_practices_are_loaded(self):
+        practice_log = PracticeLog(user_id="user")
+        practice_log.log_practice(
+            exercise_practice=_exercise_practice("rhythms"),
+            result=PracticeResult.HARD,
+        )
+        practice_log.log_practice(
+            exercise_practice=_exercise_practice("pitch_progressions"),
+            result=PracticeResult.COMPLETED,
+        )
+        practice_log.save()
+
+        loaded = PracticeLog.get_for_user("user").get_practice_logs()
+        self.assertEqual(loaded, practice_log.get_practice_logs())
+        self.assertEqual(len(loaded), 2)
+        self.assertEqual(loaded[0].exercise_practice, _exercise_practice("rhythms"))
+        self.assertEqual(loaded[0].result, PracticeResult.HARD)
+        self.assertEqual(PracticeLog.get_for_user("other").get_practice_logs(), [])
+
+    def test_queries_filter_practices(self):
+        today = date.today()
+        PracticeLogEntry.objects.bulk_create(
+            [
+                PracticeLogEntry(
+                    user_id="user",
+                    generator_id=generator_id,
+                    exercise_id=_exercise_practice(
+                        generator_id, position
+                    ).exercise.exercise_id,
+                    key="D",
+                    tempo=60,
+                    practice_date=today - timedelta(days=days_ago),
+                    result=PracticeResult.COMPLETED.value,
+                )
+                for generator_id, position, days_ago in [
+                    ("rhythms", 0, 10),
+                    ("rhythms", 1, 1),
+                    ("pitch_progressions", 0, 5),
+                ]
+            ]
+        )
+        practice_log = PracticeLog.get_for_user("user")
+        rhythm_ids = [
+            _exercise_practice("rhythms", position).exercise.exercise_id
+            for position in range(2)
+        ]
+        pitch_progression_id = _exercise_practice(
+            "pitch_progressions"
+        ).exercise.exercise_id
+
+        self.assertEqual(
+            _practice_ids(practice_log.get_practice_logs()),
+            [rhythm_ids[0], pitch_progression_id, rhythm_ids[1]],
+        )
+        self.assertEqual(
+            _practice_ids(practice_log.get_practice_logs(generator_id="rhythms")),
+            rhythm_ids,
+        )
+        self.assertEqual(
+            _practice_ids(practice_log.get_practice_logs(exercise_ids=rhythm_ids[1:])),
+            rhythm_ids[1:],
+        )
+        self.assertEqual(
+            _practice_ids(
+                practice_log.get_practice_logs(since=today - timedelta(days=5))
+            ),
+            [pitch_progression_id, rhythm_ids[1]],
+        )
+
+    def test_stored_log_writes_practices_in_batches(self):
+        with mock.patch.object(config, "PRACTICE_LOG_WRITE_BATCH_SIZE", 3):
+            with PracticeLog.get_for_user("user") as practice_log:
+                for _ in range(4):
+                    practice_log.log_practice(
+                        exercise_practice=_exercise_practice("rhythms"),
+                        result=PracticeResult.COMPLETED,
+                    )
+
+                self.assertEqual(PracticeLogEntry.objects.count(), 3)
+                self.assertEqual(len(practice_log.get_practice_logs()), 4)
+                self.assertEqual(
+                    len(practice_log.get_practice_logs(generator_id="rhythms")), 4
+                )
+
+        self.assertEqual(PracticeLogEntry.objects.count(), 4)
+        self.assertEqual(len(PracticeLog.get_for_user("user").get_practice_logs()), 4)
+
+    def test_stored_log_writes_practices_when_logged(self):
+        practice_log = PracticeLog.get_for_user("user")
+        practice_log.log_practice(
+            exercise_practice=_exercise_practice("rhythms"),
+            result=PracticeResult.COMPLETED,
+        )
+
+        self.assertEqual(PracticeLogEntry.objects.count(), 1)
+
+    def test_logs_of_the_same_user_keep_each_others_practices(self):
+        practice_logs = [PracticeLog.get_for_user("user") for _ in range(2)]
+        for practice_log in practice_logs:
+            # Both logs read the learning state before the other one saves
+            self.assertEqual(practice_log.learning_state.to_json()["exercises"], [])
+        for practice_log, generator_id in zip(
+            practice_logs, ["rhythms", "pitch_progressions"]
+        ):
+            practice_log.log_practice(
+                exercise_practice=_exercise_practice(generator_id),
+                result=PracticeResult.HARD,
+            )
+
+        loaded = PracticeLog.get_for_user("user")
+        self.assertEqual(
+            loaded.learning_state.to_json(),
+            LearningState.from_practice_logs(loaded.get_practice_logs()).to_json(),
+        )
+        self.assertEqual(len(loaded.learning_state.to_json()["exercises"]), 2)
+
+    def test_saving_a_practice_reads_only_the_state_of_its_exercise(self):
+        practice_log = PracticeLog.get_for_user("user")
+        for position in range(3):
+            practice_log.log_practice(
+                exercise_practice=_exercise_practice("rhythms", position),
+                result=PracticeResult.COMPLETED,
+            )
+
+        # Practiced exercises aren't read from the catalog to save a practice
+        with mock.patch("exercise.practice_log._get_exercises") as get_exercises:
+            practice_log.log_practice(
+                exercise_practice=_exercise_practice("rhythms", 1),
+                result=PracticeResult.HARD,
+            )
+        get_exercises.assert_not_called()
+
+        loaded = PracticeLog.get_for_user("user")
+        self.assertEqual(
+            loaded.learning_state.to_json(),
+            LearningState.from_practice_logs(loaded.get_practice_logs()).to_json(),
+        )
+
+    def test_log_stays_in_memory_until_saved(self):
+        practice_log = PracticeLog(user_id="user")
+        with mock.patch.object(config, "PRACTICE_LOG_WRITE_BATCH_SIZE", 1):
+            practice_log.log_practice(
+                exercise_practice=_exercise_practice("rhythms"),
+                result=PracticeResult.COMPLETED,
+            )
+
+        self.assertEqual(PracticeLogEntry.objects.count(), 0)
+        self.assertEqual(
+            practice_log.get_practice_logs(generator_id="rhythms"),
+            [
+                ExercisePracticeLog(
+                    exercise_practice=_exercise_practice("rhythms"),
+                    practice_date=date.today(),
+                    result=PracticeResult.COMPLETED,
+                )
+            ],
+        )
+        self.assertEqual(
+            practice_log.get_practice_logs(generator_id="pitch_progressions"), []
+        )
+
+    def test_learning_state_is_stored_with_the_log(self):
+        practice_log = PracticeLog.get_for_user("user")
+        for generator_id, result in [
+            ("rhythms", PracticeResult.COMPLETED),
+            ("pitch_progressions", PracticeResult.HARD),
+            ("rhythms", PracticeResult.ALMOST_COMPLETED),
+        ]:
+            practice_log.log_practice(
+                exercise_practice=_exercise_practice(generator_id), result=result
+            )
+        practice_log.save()
+
+        loaded = PracticeLog.get_for_user("user")
+        self.assertEqual(
+            loaded.learning_state.to_json(), practice_log.learning_state.to_json()
+        )
+        self.assertFalse(
+            loaded.learning_state.is_ready_for_new_exercise("pitch_progressions")
+        )
+        self.assertTrue(loaded.learning_state.is_ready_for_new_exercise("rhythms"))
+
+        # Practices logged after loading update the loaded state
+        loaded.log_practice(
+            exercise_practice=_exercise_practice("pitch_progressions"),
+            result=PracticeResult.COMPLETED,
+        )
+        self.assertEqual(
+            loaded.learning_state.familiarity_to_improve("pitch_progressions"),
+            Familiarity.from_practice_logs(
+                loaded.get_practice_logs(generator_id="pitch_progressions")
+            ),
+        )
+
+
+class PlannerTest(TestCase):
+    def test_plans_are_replaced_for_the_day(self):
+        practice_log = PracticeLog.get_for_user("user")
+        practice_log.log_practice(
+            exercise_practice=_exercise_practice("rhythms"),
+            result=PracticeResult.COMPLETED,
+        )
+        practice_log.save()
+        plan_date = date.today() + timedelta(days=1)
+
+        for _ in range(2):
+            report = plan_users(
+                ["user", "new_user"], plan_date=plan_date, max_workers=0, chunk_size=1
+            )
+
+        self.assertEqual(report.num_users, 2)
+        self.assertEqual(report.num_practices, 2 * len(PIECE_GENERATORS))
+        plans = ExercisePlanEntry.objects.filter(user_id="user", plan_date=plan_date)
+        self.assertEqual(
+            [plan.generator_id for plan in plans.order_by("position")],
+            list(PIECE_GENERATORS),
+        )
+        self.assertEqual(ExercisePlanEntry.objects.count(), report.num_practices)
+        self.assertTrue(all(f"K:{plan.key}" in plan.score for plan in plans))
+
+    def test_users_without_exercises_to_improve_are_planned(self):
+        # The first melody rated too hard and then hard is an expert level melody,
+        # the user isn't ready for a new melody and has none to improve
+        practice_log = PracticeLog.get_for_user("user")
+        for days_ago, result in [
+            (1, PracticeResult.TOO_HARD),
+            (0, PracticeResult.HARD),
+        ]:
+            practice_log.log_practice(
+                exercise_practice=_exercise_practice("melodies"),
+                result=result,
+                practice_date=date.today() - timedelta(days=days_ago),
+            )
+        plan_date = date.today() + timedelta(days=1)
+
+        report = plan_users(["user"], plan_date=plan_date, max_workers=0)
+
+        self.assertEqual(report.num_failed_users, 0)
+        self.assertEqual(
+            list(
+                ExercisePlanEntry.objects.filter(user_id="user", plan_date=plan_date)
+                .order_by("position")
+                .values_list("generator_id", flat=True)
+            ),
+            [
+                generator_id
+                for generator_id in PIECE_GENERATORS
+                if generator_id != "melodies"
+            ],
+        )
+
+    def test_failed_users_are_reported(self):
+        plan_date = date.today() + timedelta(days=1)
+        with mock.patch(
+            "exercise.planner.ExerciseFactory", side_effect=RuntimeError
+        ), self.assertLogs(level="ERROR"):
+            report = plan_users(["user"], plan_date=plan_date, max_workers=0)
+
+        self.assertEqual(report.num_failed_users, 1)
+        self.assertEqual(report.num_practices, 0)
@@ -1,9 +1,14 @@
+import heapq
 import math
 from collections import defaultdict
 
 from fractions import Fraction
 from functools import reduce
-from typing import Callable, Dict, Iterable, Sequence, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
 
 
 def group_by(data: Iterable, key: Callable) -> Dict:
@@ -65,3 +70,68 @@ def discretize(floats: Sequence[float], precision: int = 2) -> Tuple[Fraction, .
         return Fraction(round(float_, precision)).limit_denominator()
 
     return tuple(map(_discretize, floats))
+
+
+def pad(
+    sequences: Sequence[Sequence[int]], fill_value: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Stack integer sequences of different lengths into a matrix.
+
+    Args:
+        sequences (list): Sequences of integers.
+        fill_value (int): Value filling rows after the end of their sequence.
+
+    Returns:
+        tuple: The (sequences x longest sequence) matrix and the sequence lengths.
+    """
+
+    lengths = np.array([len(sequence) for sequence in sequences], dtype=np.int64)
+    matrix = np.full(
+        (len(sequences), int(lengths.max(initial=0))), fill_value, dtype=np.int64
+    )
+    for row, sequence in enumerate(sequences):
+        matrix[row, : len(sequence)] = sequence
+    return matrix, lengths
+
+
+def merge_sorted(
+    bounded_iterables: Iterable[Tuple[float, Iterable[T]]],
+    key: Callable[[T], float],
+) -> Iterator[T]:
+    """Merge iterables sorted by the key into a single sorted iterator.
+
+    Args:
+        bounded_iterables (iterable): Pairs of a lower bound of the keys in an
+            iterable and the iterable itself, ordered by the lower bound.
+        key (callable): The key the iterables are sorted by.
+
+    Returns:
+        iterator: Items of all the iterables ordered by the key. An iterable is
+            started only once the merge reaches its lower bound, so producing
+            the first items doesn't touch the rest of the iterables.
+    """
+
+    heap: List[Tuple[float, int, T, Iterator[T]]] = []
+    bounded_iterators = (
+        (bound, iter(iterable)) for bound, iterable in bounded_iterables
+    )
+    next_bounded = next(bounded_iterators, None)
+    iterator_idx = 0
+    while heap or next_bounded is not None:
+        while next_bounded is not None and (not heap or next_bounded[0] <= heap[0][0]):
+            _, iterator = next_bounded
+            for item in iterator:
+                heapq.heappush(heap, (key(item), iterator_idx, item, iterator))
+                break
+            iterator_idx += 1
+            next_bounded = next(bounded_iterators, None)
+        if not heap:
+            return
+
+        _, idx, item, iterator = heap[0]
+        yield item
+        for next_item in iterator:
+            heapq.heapreplace(heap, (key(next_item), idx, next_item, iterator))
+            break
+        else:
+            heapq.heappop(heap)
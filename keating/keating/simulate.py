@@ -1,15 +1,370 @@
-# Create user
+""" Simulated users practicing exercises, to tune learning parameters.
 
+Every simulated user practices one exercise of each generator per session, a
+session a day, and a learner model decides the result of each practice. Scores are
+never rendered. Results of all users are summed into aggregate curves:
+- number of exercises at each level after every session,
+- sessions it takes an exercise to reach each level since its first practice,
+- number of keys practiced by every session,
+- stalls, sessions a generator was ready for a new exercise but had none,
+- sessions a generator had nothing to practice, no new exercise and none to improve.
 
-# Create empty practice log
+    python -m keating.simulate --users 1000 --sessions 200 --learner skill \\
+        --param tempo_step=10 --output curves.json
+"""
 
-# Create exercise generator
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import random
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
+import attrs
+import numpy as np
+from attrs import frozen
 
-from exercise.generators.exercise_generator import ExerciseGenerator
+from exercise import learning
+from exercise.base import ExercisePractice
+from exercise.familiarity import Level
+from exercise.generators.exercise_generator import (
+    ExerciseGenerator,
+    preload_difficulty_index,
+)
 from exercise.generators.hand_coordination import HandCoordinationPieceGenerator
+from exercise.generators.registry import PIECE_GENERATORS
+from exercise.learning import DEFAULT_LEARNING_PARAMETERS, LearningParameters
+from exercise.music_representation.base import Key
 from exercise.practice_log import PracticeLog, PracticeResult
 
+# Learning parameters that simulations can override.
+LEARNING_PARAMETERS = tuple(
+    attribute.name for attribute in attrs.fields(LearningParameters)
+)
+# Users simulated by a worker process at once.
+SIMULATION_CHUNK_SIZE = 20
+
+
+class Learner(ABC):
+    """A simulated user deciding how their practices went."""
+
+    @abstractmethod
+    def practice(
+        self, generator_id: str, exercise_practice: ExercisePractice
+    ) -> PracticeResult:
+        pass
+
+
+class LearnerModel(ABC):
+    @abstractmethod
+    def new_learner(self, rng: random.Random) -> Learner:
+        pass
+
+
+class _PerfectLearner(Learner):
+    def practice(
+        self, generator_id: str, exercise_practice: ExercisePractice
+    ) -> PracticeResult:
+        return PracticeResult.COMPLETED
+
+
+@frozen
+class PerfectLearnerModel(LearnerModel):
+    """Learners completing every practice."""
+
+    def new_learner(self, rng: random.Random) -> Learner:
+        return _PerfectLearner()
+
+
+class _SkillLearner(Learner):
+    def __init__(self, model: "SkillLearnerModel", rng: random.Random) -> None:
+        self._model = model
+        self._rng = rng
+        # Skill of the learner in exercises of each generator, in difficulty levels
+        self._generator_to_skill: Dict[str, float] = {}
+        self._key_to_num_practices: Dict[Key, int] = {}
+
+    def practice(
+        self, generator_id: str, exercise_practice: ExercisePractice
+    ) -> PracticeResult:
+        model = self._model
+        difficulty = exercise_practice.exercise.difficulty.level
+        # The first exercise of a generator is at the edge of the learner's skill
+        skill = self._generator_to_skill.setdefault(
+            generator_id, difficulty * self._rng.uniform(*model.initial_skill_range)
+        )
+        key_practices = self._key_to_num_practices.get(exercise_practice.key, 0)
+        challenge = (
+            difficulty
+            - skill
+            + model.tempo_weight
+            * (exercise_practice.tempo - learning.START_TEMPO)
+            / learning.START_TEMPO
+            + model.key_weight / (1 + key_practices)
+        )
+
+        # Practices close to the skill of the learner teach them the most
+        self._generator_to_skill[generator_id] = skill + model.learning_rate * math.exp(
+            -((challenge / model.result_margin) ** 2)
+        )
+        self._key_to_num_practices[exercise_practice.key] = key_practices + 1
+
+        margin = -challenge + self._rng.gauss(0.0, model.noise)
+        if margin > model.result_margin:
+            return PracticeResult.TOO_EASY
+        if margin > 0:
+            return PracticeResult.COMPLETED
+        if margin > -model.result_margin:
+            return PracticeResult.ALMOST_COMPLETED
+        if margin > -2 * model.result_margin:
+            return PracticeResult.HARD
+        return PracticeResult.TOO_HARD
+
+
+@frozen
+class SkillLearnerModel(LearnerModel):
+    """Learners whose results depend on exercise difficulty compared to their skill.
+
+    An exercise is harder the more its difficulty level exceeds the skill of the
+    learner, the faster it is played and the less the key was practiced. Every
+    practice improves the skill, the more the closer the exercise is to it.
+    """
+
+    # Initial skill as fractions of the level of the first exercise of a generator.
+    initial_skill_range: Tuple[float, float] = (0.9, 1.1)
+    learning_rate: float = 0.02
+    tempo_weight: float = 0.1
+    key_weight: float = 0.1
+    # Challenge ranges corresponding to results.
+    result_margin: float = 0.1
+    noise: float = 0.05
+
+    def new_learner(self, rng: random.Random) -> Learner:
+        return _SkillLearner(model=self, rng=rng)
+
+
+LEARNER_MODELS: Dict[str, LearnerModel] = {
+    "perfect": PerfectLearnerModel(),
+    "skill": SkillLearnerModel(),
+}
+
+
+class SimulationResult:
+    """Sums of statistics over simulated users, see `curves` for their means."""
+
+    def __init__(self, num_sessions: int, generator_ids: Sequence[str]) -> None:
+        self.generator_ids = tuple(generator_ids)
+        self.num_users = 0
+        # Practiced exercises by level after every session
+        self.level_counts = np.zeros((num_sessions, len(Level)), dtype=np.int64)
+        # Sessions exercises took to reach a level since their first practice
+        self.sessions_to_level = np.zeros(len(Level), dtype=np.int64)
+        self.num_reached_level = np.zeros(len(Level), dtype=np.int64)
+        # Keys practiced by every session
+        self.keys_covered = np.zeros(num_sessions, dtype=np.int64)
+        # Users a generator had no new exercise for, by session
+        self.stalls = np.zeros((len(generator_ids), num_sessions), dtype=np.int64)
+        # Users a generator had nothing to practice for, by session
+        self.nothing_to_practice = np.zeros(
+            (len(generator_ids), num_sessions), dtype=np.int64
+        )
+
+    def merge(self, other: "SimulationResult") -> None:
+        self.num_users += other.num_users
+        self.level_counts += other.level_counts
+        self.sessions_to_level += other.sessions_to_level
+        self.num_reached_level += other.num_reached_level
+        self.keys_covered += other.keys_covered
+        self.stalls += other.stalls
+        self.nothing_to_practice += other.nothing_to_practice
+
+    def curves(self) -> Dict:
+        num_users = max(self.num_users, 1)
+        return {
+            "num_users": self.num_users,
+            "exercises_by_level": {
+                level.name: (self.level_counts[:, level.value] / num_users).tolist()
+                for level in Level
+            },
+            "sessions_to_level": {
+                level.name: (
+                    self.sessions_to_level[level.value]
+                    / self.num_reached_level[level.value]
+                    if self.num_reached_level[level.value]
+                    else None
+                )
+                for level in Level
+            },
+            "keys_covered": (self.keys_covered / num_users).tolist(),
+            "stalls": {
+                generator_id: (stalls / num_users).tolist()
+                for generator_id, stalls in zip(self.generator_ids, self.stalls)
+            },
+            "nothing_to_practice": {
+                generator_id: (nothing_to_practice / num_users).tolist()
+                for generator_id, nothing_to_practice in zip(
+                    self.generator_ids, self.nothing_to_practice
+                )
+            },
+        }
+
+
+class _SimulatedExerciseGenerator(ExerciseGenerator):
+    """Exercise generator recording when it had no new exercise."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stalled = False
+
+    def _get_new_exercise(
+        self, today: Optional[date] = None
+    ) -> Optional[ExercisePractice]:
+        new_exercise = super()._get_new_exercise(today=today)
+        self.stalled = new_exercise is None
+        return new_exercise
+
+
+def _simulate_user(
+    user_seed: int,
+    learner_model: LearnerModel,
+    result: SimulationResult,
+    num_sessions: int,
+    parameters: LearningParameters,
+) -> None:
+    rng = random.Random(user_seed)
+    learner = learner_model.new_learner(rng)
+    practice_log = PracticeLog(
+        user_id=f"simulated_user_{user_seed}", learning_parameters=parameters
+    )
+    learning_state = practice_log.learning_state
+    exercise_generators = [
+        _SimulatedExerciseGenerator(
+            practice_log=practice_log, piece_generator=PIECE_GENERATORS[generator_id]
+        )
+        for generator_id in result.generator_ids
+    ]
+    level_counts = np.zeros(len(Level), dtype=np.int64)
+    exercise_to_first_session: Dict[str, int] = {}
+    exercise_levels_reached: Set[Tuple[str, Level]] = set()
+    keys_covered: Set[Key] = set()
+    first_date = date.today()
+
+    for session in range(num_sessions):
+        practice_date = first_date + timedelta(days=session)
+        for generator_idx, exercise_generator in enumerate(exercise_generators):
+            exercise_generator.stalled = False
+            try:
+                exercise_practice = exercise_generator.generate(today=practice_date)
+            except ValueError:
+                # Nothing new and nothing to improve
+                result.nothing_to_practice[generator_idx, session] += 1
+                continue
+            finally:
+                result.stalls[generator_idx, session] += exercise_generator.stalled
+
+            exercise_id = exercise_practice.exercise.exercise_id
+            practice_result = learner.practice(
+                generator_id=exercise_generator.generator_id,
+                exercise_practice=exercise_practice,
+            )
+            old_level = learning_state.exercise_level(exercise_id)
+            practice_log.log_practice(
+                exercise_practice=exercise_practice,
+                result=practice_result,
+                practice_date=practice_date,
+            )
+            new_level = learning_state.exercise_level(exercise_id)
+            assert new_level is not None
+            if old_level is not None:
+                level_counts[old_level.value] -= 1
+            level_counts[new_level.value] += 1
+            first_session = exercise_to_first_session.setdefault(exercise_id, session)
+            if (exercise_id, new_level) not in exercise_levels_reached:
+                exercise_levels_reached.add((exercise_id, new_level))
+                result.sessions_to_level[new_level.value] += session - first_session
+                result.num_reached_level[new_level.value] += 1
+            keys_covered.add(exercise_practice.key)
+
+        result.level_counts[session] += level_counts
+        result.keys_covered[session] += len(keys_covered)
+    result.num_users += 1
+
+
+def _simulate_chunk(
+    user_seeds: Sequence[int],
+    learner_model: LearnerModel,
+    num_sessions: int,
+    generator_ids: Sequence[str],
+    parameters: LearningParameters,
+) -> SimulationResult:
+    result = SimulationResult(num_sessions=num_sessions, generator_ids=generator_ids)
+    for user_seed in user_seeds:
+        _simulate_user(
+            user_seed=user_seed,
+            learner_model=learner_model,
+            result=result,
+            num_sessions=num_sessions,
+            parameters=parameters,
+        )
+    return result
+
+
+def simulate_users(
+    num_users: int,
+    num_sessions: int,
+    learner_model: LearnerModel = SkillLearnerModel(),
+    generator_ids: Optional[Sequence[str]] = None,
+    parameters: LearningParameters = DEFAULT_LEARNING_PARAMETERS,
+    seed: int = 0,
+    max_workers: Optional[int] = None,
+    chunk_size: int = SIMULATION_CHUNK_SIZE,
+) -> SimulationResult:
+    """Simulate users practicing in a pool of worker processes.
+
+    Args:
+        generator_ids: Generators of the practiced exercises, all by default.
+        parameters: Learning parameters of the simulated users.
+        seed: Users get consecutive seeds from it, so results don't depend on workers.
+        max_workers: Worker processes, one per CPU by default. With 0 the users are
+            simulated in this process.
+    """
+
+    generator_ids = tuple(generator_ids or PIECE_GENERATORS)
+    user_seeds = list(range(seed, seed + num_users))
+    chunks = [
+        user_seeds[start : start + chunk_size]
+        for start in range(0, num_users, chunk_size)
+    ]
+    # Built before the pool starts, so forked workers share them
+    for generator_id in generator_ids:
+        preload_difficulty_index(PIECE_GENERATORS[generator_id])
+
+    result = SimulationResult(num_sessions=num_sessions, generator_ids=generator_ids)
+    chunk_args = [
+        (chunk, learner_model, num_sessions, generator_ids, parameters)
+        for chunk in chunks
+    ]
+    if max_workers == 0:
+        for args in chunk_args:
+            result.merge(_simulate_chunk(*args))
+        return result
+
+    mp_context = (
+        multiprocessing.get_context("fork")
+        if "fork" in multiprocessing.get_all_start_methods()
+        else None
+    )
+    with ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=mp_context
+    ) as executor:
+        for chunk_result in executor.map(_simulate_chunk, *zip(*chunk_args)):
+            result.merge(chunk_result)
+    return result
+
 
 def simulate_practice(steps: int = 10) -> None:
     practice_log = PracticeLog(user_id="simulation_test_user")
@@ -26,4 +381,73 @@ def simulate_practice(steps: int = 10) -> None:
         )
 
 
-simulate_practice()
+def _parse_parameter(value: str) -> Tuple[str, float]:
+    name, _, number = value.partition("=")
+    return name, float(number)
+
+
+def learning_parameters(overrides: Dict[str, float]) -> LearningParameters:
+    """Default learning parameters with the overrides, see `LEARNING_PARAMETERS`."""
+
+    unknown = set(overrides) - set(LEARNING_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown learning parameters: {', '.join(sorted(unknown))}")
+    return attrs.evolve(DEFAULT_LEARNING_PARAMETERS, **overrides)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--learner", choices=LEARNER_MODELS, default="skill")
+    parser.add_argument(
+        "--generator",
+        action="append",
+        choices=PIECE_GENERATORS,
+        help="Generator of practiced exercises, all by default",
+    )
+    parser.add_argument(
+        "--param",
+        action="append",
+        type=_parse_parameter,
+        default=[],
+        help=f"Learning parameter override NAME=VALUE, of {', '.join(LEARNING_PARAMETERS)}",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="Worker processes, 0 runs inline")
+    parser.add_argument("--output", help="JSON file for the curves")
+    args = parser.parse_args(argv)
+
+    # Generators warn about every stall, they are counted instead
+    logging.getLogger().setLevel(logging.ERROR)
+    result = simulate_users(
+        num_users=args.users,
+        num_sessions=args.sessions,
+        learner_model=LEARNER_MODELS[args.learner],
+        generator_ids=args.generator,
+        parameters=learning_parameters(dict(args.param)),
+        seed=args.seed,
+        max_workers=args.workers,
+    )
+    curves = result.curves()
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(curves, output, indent=2)
+    for level in Level:
+        print(
+            f"{level.name}: {curves['exercises_by_level'][level.name][-1]:.1f} "
+            f"exercises after the last session, "
+            f"reached in {curves['sessions_to_level'][level.name] or 0:.1f} sessions"
+        )
+    print(f"Keys covered: {curves['keys_covered'][-1]:.1f}")
+    for generator_id, stalls in curves["stalls"].items():
+        print(f"Stalls of {generator_id}: {sum(stalls):.2f} per user")
+    for generator_id, nothing_to_practice in curves["nothing_to_practice"].items():
+        print(
+            f"Sessions without practice of {generator_id}: "
+            f"{sum(nothing_to_practice):.2f} per user"
+        )
+
+
+if __name__ == "__main__":
+    main()
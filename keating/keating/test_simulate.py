@@ -0,0 +1,58 @@
+import numpy as np
+
+import pytest
+
+from exercise.familiarity import Level
+from exercise.learning import LearningParameters
+from keating.simulate import (
+    PerfectLearnerModel,
+    SkillLearnerModel,
+    learning_parameters,
+    simulate_users,
+)
+
+
+def test_simulation_does_not_depend_on_chunks():
+    results = [
+        simulate_users(
+            num_users=4,
+            num_sessions=15,
+            learner_model=SkillLearnerModel(),
+            generator_ids=["rhythms", "pitch_progressions"],
+            max_workers=0,
+            chunk_size=chunk_size,
+        )
+        for chunk_size in (1, 3)
+    ]
+
+    assert results[0].num_users == results[1].num_users == 4
+    assert np.array_equal(results[0].level_counts, results[1].level_counts)
+    assert np.array_equal(results[0].stalls, results[1].stalls)
+    assert np.array_equal(
+        results[0].nothing_to_practice, results[1].nothing_to_practice
+    )
+    assert results[0].curves() == results[1].curves()
+
+
+def test_perfect_learners_follow_learning_parameters():
+    result = simulate_users(
+        num_users=2,
+        num_sessions=10,
+        learner_model=PerfectLearnerModel(),
+        generator_ids=["rhythms"],
+        parameters=LearningParameters(tempo_step=20),
+        max_workers=0,
+    )
+
+    # Every session practices one exercise of the generator
+    assert result.level_counts.sum(axis=1)[-1] <= 2 * 10
+    assert result.curves()["keys_covered"] == sorted(result.curves()["keys_covered"])
+    assert result.curves()["exercises_by_level"][Level.ZERO.name][-1] == 0
+
+
+def test_learning_parameters_override_defaults():
+    assert learning_parameters({"tempo_step": 20.0}) == LearningParameters(
+        tempo_step=20
+    )
+    with pytest.raises(ValueError):
+        learning_parameters({"TEMPO_STEP": 20.0})
@@ -1,19 +1,25 @@
-from collections import defaultdict
-from typing import Iterator, NamedTuple, Optional
+from collections.abc import Sequence
+from itertools import islice
+from typing import Iterator, NamedTuple
 
-from django.shortcuts import render
 from django.core.paginator import Paginator
+from django.http import Http404
+from django.shortcuts import render
 
 from exercise.base import Exercise, ExercisePractice
 
+from exercise.generators.catalog import (
+    PieceGeneratorLike,
+    get_catalog,
+    get_exercise_id,
+)
 from exercise.generators.exercise_generator import ExerciseGenerator
 from exercise.generators.hand_coordination import HandCoordinationPieceGenerator
 from exercise.generators.melodies import MelodiesPieceGenerator
-from exercise.generators.pitch_progressions import PitchProgressionsPieceGenerator
-from exercise.generators.rhythms import RhythmsPieceGenerator
+from exercise.generators.registry import PIECE_GENERATORS
 from exercise.music_representation.base import Key
+from exercise.music_representation.piece import Piece
 from exercise.practice_log import PracticeLog, PracticeResult
-from exercise.utils import discretize
 
 
 class Score(NamedTuple):
@@ -37,42 +43,86 @@ def _get_simulated_score(steps: int = 10) -> Iterator[str]:
         )
 
 
-def _get_scores(piece_generator, num_pieces: Optional[int] = None) -> Iterator[Score]:
-    pieces = sorted(
-        list(piece_generator.pieces()), key=lambda piece: piece.difficulty.level
-    )
-    if num_pieces:
-        pieces = pieces[:num_pieces]
-
-    diff_point_to_pieces = defaultdict(list)
-    for piece in pieces:
-        diff_point_to_pieces[discretize(piece.difficulty.point)].append(piece)
-
-    for piece in pieces:
-        sheet = ExercisePractice(
-            key=Key.C,
-            tempo=60,
-            exercise=Exercise(piece=piece, exercise_id=""),
-        ).score
-        yield Score(
-            sheet=sheet,
-            difficulty=str(piece.difficulty),
+DEFAULT_GENERATOR_ID = MelodiesPieceGenerator.generator_id
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+SCORE_TEMPO = 60
+
+
+class _PieceScores(Sequence):
+    """Scores of generated pieces by increasing difficulty, rendered when accessed.
+
+    Pieces are taken from the generator's `pieces_by_difficulty` stream, so a page
+    only merges the pieces up to its end instead of sorting the whole catalog.
+    """
+
+    def __init__(
+        self, piece_generator: PieceGeneratorLike, key: Key, tempo: int
+    ) -> None:
+        self._piece_generator = piece_generator
+        self._key = key
+        self._tempo = tempo
+
+    def __len__(self) -> int:
+        return len(get_catalog(self._piece_generator))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            return [
+                self._render(piece)
+                for piece in islice(
+                    self._piece_generator.pieces_by_difficulty(), start, stop, step
+                )
+            ]
+
+        if index < 0:
+            index += len(self)
+        for piece in islice(self._piece_generator.pieces_by_difficulty(), index, None):
+            return self._render(piece)
+        raise IndexError("Score index out of range")
+
+    def _render(self, piece: Piece) -> Score:
+        exercise = Exercise(
+            exercise_id=get_exercise_id(
+                generator_id=self._piece_generator.generator_id, piece=piece
+            ),
+            piece=piece,
+        )
+        # Scores are cached by `ExercisePractice.score`
+        return Score(
+            sheet=ExercisePractice(
+                exercise=exercise, key=self._key, tempo=self._tempo
+            ).score,
+            difficulty=str(exercise.difficulty),
             musical_elements=piece.musical_elements_str,
         )
 
 
-# scores = list(_get_scores(piece_generator=HandCoordinationPieceGenerator()))
-# scores = list(_get_scores(piece_generator=RhythmsPieceGenerator()))
-# scores = list(_get_scores(piece_generator=PitchProgressionsPieceGenerator()))
-scores = list(_get_scores(piece_generator=MelodiesPieceGenerator()))
-
-
 def render_sheet_music(request):
-    paginator = Paginator(scores, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    generator_id = request.GET.get("generator", DEFAULT_GENERATOR_ID)
+    key_name = request.GET.get("key", Key.C.name)
+    if generator_id not in PIECE_GENERATORS:
+        raise Http404(f"Unknown generator {generator_id}")
+    if key_name not in Key.__members__:
+        raise Http404(f"Unknown key {key_name}")
+    try:
+        page_size = int(request.GET.get("page_size", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        page_size = DEFAULT_PAGE_SIZE
+    page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+
+    scores = _PieceScores(
+        piece_generator=PIECE_GENERATORS[generator_id],
+        key=Key[key_name],
+        tempo=SCORE_TEMPO,
+    )
+    paginator = Paginator(scores, page_size)
+    page_obj = paginator.get_page(request.GET.get("page"))
+    query_params = request.GET.copy()
+    query_params.pop("page", None)
     return render(
         request,
         "sheet_music.html",
-        {"scores": page_obj},
+        {"scores": page_obj, "query": query_params.urlencode()},
     )